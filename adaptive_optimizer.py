@@ -0,0 +1,208 @@
+﻿# =============================================================================
+# ADAPTIVE OPTIMIZER — Successive halving over de V4.2 params
+# =============================================================================
+# In plaats van elke combinatie op de volledige historie (grid) of met de
+# hand (V4.1 → V4.2) worden veel kandidaten eerst op een korte slice van de
+# meest recente data geëvalueerd; alleen de beste 1/eta gaat door naar een
+# eta keer zo lange slice, tot de laatste ronde op de volledige historie.
+# Evaluatie via inverse_batch (alle kandidaten van een ronde in één pass).
+# Budget in "volledige runs": som over rondes van kandidaten x slice fractie.
+# Na elke batch wordt de state naar JSON geschreven; een afgebroken run gaat
+# verder waar hij was (zelfde space, data en instellingen).
+# Ranking op net_pnl van inverse_batch: inclusief open_pnl (positie die aan
+# het eind van een slice nog open staat, tegen de laatste close), zodat een
+# kandidaat met een grote open verliespositie niet boven aan komt te staan.
+# =============================================================================
+import json
+import math
+import os
+import numpy as np
+import pandas as pd
+import config
+import indicator_cache
+import inverse_batch
+
+BATCH_SIZE = 256    # Kandidaten per run_batch call (= granulariteit van hervatten)
+STATE_FORMAT = 2    # Ophogen als inverse_batch resultaten wijzigen (2: net_pnl incl. open_pnl)
+
+def plan_rungs(n_bars, budget=None, eta=None, min_fraction=None, min_bars=None, n_space=None):
+    """
+    Rondes: [(aantal kandidaten, aantal bars)], laatste ronde = alle bars.
+    Het aantal start kandidaten is het grootste aantal dat binnen budget past
+    (begrensd door de grootte van de space).
+    """
+    budget = budget or config.ADAPTIVE_BUDGET
+    eta = eta or config.ADAPTIVE_ETA
+    min_fraction = min_fraction or config.ADAPTIVE_MIN_FRACTION
+    min_bars = min_bars or config.ADAPTIVE_MIN_BARS
+
+    n_rungs = int(math.floor(math.log(1 / min_fraction, eta) + 1e-9)) + 1
+    bars = [min(n_bars, max(min_bars, int(math.ceil(n_bars * eta ** (r - n_rungs + 1)))))
+            for r in range(n_rungs)]
+
+    # Kosten per start kandidaat (in volledige runs): sum_r bars_r / n_bars / eta^r
+    cost_per_candidate = sum(b / n_bars / eta ** r for r, b in enumerate(bars))
+    n0 = max(1, int(budget / cost_per_candidate))
+    if n_space is not None:
+        n0 = min(n0, n_space)
+
+    rungs = []
+    n = n0
+    for b in bars:
+        rungs.append((n, b))
+        n = max(1, n // eta)
+    return rungs
+
+def _state_key(space, n_bars, data_fp, budget, eta, min_fraction, min_bars, metric, seed):
+    return {
+        'format': STATE_FORMAT,
+        'space': {k: list(v) for k, v in space.items()},
+        'n_bars': n_bars,
+        'data': data_fp,
+        'budget': budget,
+        'eta': eta,
+        'min_fraction': min_fraction,
+        'min_bars': min_bars,
+        'metric': metric,
+        'seed': seed,
+    }
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Niet serialiseerbaar: {type(value)}")
+
+def _load_state(path, key):
+    """Eerdere state met dezelfde key, anders None."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('key') != json.loads(json.dumps(key, default=_json_default)):
+        print("⚠️  Optimizer state hoort bij andere data/instellingen, start opnieuw")
+        return None
+    return state
+
+def _save_state(path, state):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, default=_json_default)
+    os.replace(tmp, path)
+
+def run_successive_halving(df, space=None, budget=None, eta=None, min_fraction=None,
+                           min_bars=None, metric=None, seed=None, state_path=None):
+    """
+    df: OHLC DataFrame / rates array (volledige historie)
+    space: {param: [waarden]} (default config.V42_SEARCH_SPACE)
+    state_path: JSON voor hervatten (default RESULTS_DIR/ADAPTIVE_STATE_FILE, '' = geen)
+
+    Returns: dict met best (params), ranked (laatste ronde, gerankt op metric),
+    history (alle evaluaties met rung/bars/candidate) en full_runs (gebruikt
+    budget in volledige-historie runs)
+    """
+    space = space or config.V42_SEARCH_SPACE
+    budget = budget or config.ADAPTIVE_BUDGET
+    eta = eta or config.ADAPTIVE_ETA
+    min_fraction = min_fraction or config.ADAPTIVE_MIN_FRACTION
+    min_bars = min_bars or config.ADAPTIVE_MIN_BARS
+    metric = metric or config.ADAPTIVE_METRIC
+    seed = config.ADAPTIVE_SEED if seed is None else seed
+    if state_path is None:
+        state_path = os.path.join(config.RESULTS_DIR, config.ADAPTIVE_STATE_FILE)
+
+    open_ = np.asarray(df['open'], dtype=np.float64)
+    high = np.asarray(df['high'], dtype=np.float64)
+    low = np.asarray(df['low'], dtype=np.float64)
+    close = np.asarray(df['close'], dtype=np.float64)
+    n_bars = len(close)
+
+    grid = inverse_batch.expand_param_grid(space)
+    rungs = plan_rungs(n_bars, budget, eta, min_fraction, min_bars, len(grid))
+    key = _state_key(space, n_bars, indicator_cache.fingerprint(open_, high, low, close),
+                     budget, eta, min_fraction, min_bars, metric, seed)
+
+    state = _load_state(state_path, key)
+    if state is None:
+        rng = np.random.default_rng(seed)
+        first = np.sort(rng.choice(len(grid), rungs[0][0], replace=False)).tolist()
+        state = {'key': key, 'rungs': [{'candidates': first, 'rows': []}]}
+    else:
+        print(f"🔁 Hervat optimizer: ronde {len(state['rungs'])}/{len(rungs)}")
+
+    for r, (_, bars) in enumerate(rungs):
+        if r == len(state['rungs']):
+            # Promotie: beste 1/eta van de vorige ronde (tie → laagste id)
+            prev = state['rungs'][r - 1]['rows']
+            ranked = sorted(prev, key=lambda row: (-row[metric], row['candidate']))
+            state['rungs'].append({
+                'candidates': [row['candidate'] for row in ranked[:rungs[r][0]]],
+                'rows': []
+            })
+        rung = state['rungs'][r]
+        lo = n_bars - bars
+
+        done = {row['candidate'] for row in rung['rows']}
+        todo = [c for c in rung['candidates'] if c not in done]
+        for i in range(0, len(todo), BATCH_SIZE):
+            batch = todo[i:i + BATCH_SIZE]
+            results = inverse_batch.run_batch(
+                open_[lo:], high[lo:], low[lo:], close[lo:], [grid[c] for c in batch]
+            )
+            for c, row in zip(batch, results.to_dict('records')):
+                row.update(candidate=c, rung=r, bars=bars)
+                rung['rows'].append(row)
+            _save_state(state_path, state)
+        print(f"   Ronde {r + 1}/{len(rungs)}: {len(rung['candidates'])} kandidaten op {bars} bars")
+
+    history = pd.DataFrame([row for rung in state['rungs'] for row in rung['rows']])
+    final = pd.DataFrame(state['rungs'][-1]['rows'])
+    final = final.sort_values([metric, 'candidate'], ascending=[False, True]).reset_index(drop=True)
+    final.insert(0, 'rank', np.arange(1, len(final) + 1))
+
+    full_runs = sum(len(rung['candidates']) * b / n_bars
+                    for rung, (_, b) in zip(state['rungs'], rungs))
+    return {
+        'best': dict(grid[int(final['candidate'].iloc[0])]),
+        'ranked': final,
+        'history': history,
+        'full_runs': full_runs,
+    }
+
+# =============================================================================
+# MAIN
+# =============================================================================
+if __name__ == "__main__":
+    import sys
+    import time
+    from datetime import datetime
+    import MetaTrader5 as mt5
+    import bar_store
+
+    if not mt5.initialize():
+        print("❌ MT5 init failed")
+        sys.exit(1)
+    store = bar_store.BarStore(source=bar_store.MT5Source(mt5))
+    rates = store.get_rates("EURUSD", "M15", datetime(2024, 10, 1), datetime.now())
+    mt5.shutdown()
+    if rates is None or len(rates) == 0:
+        print("❌ No data")
+        sys.exit(1)
+
+    space_size = len(inverse_batch.expand_param_grid(config.V42_SEARCH_SPACE))
+    print(f"\n🔄 Successive halving: {space_size} combinaties, budget {config.ADAPTIVE_BUDGET} runs")
+    t0 = time.perf_counter()
+    result = run_successive_halving(rates)
+    print(f"✅ Klaar in {time.perf_counter() - t0:.1f}s ({result['full_runs']:.1f} volledige runs)\n")
+    print(result['ranked'].head(10).to_string(index=False))
+
+    baseline = inverse_batch.run_batch_frame(rates, [inverse_batch.DEFAULT_PARAMS])
+    best = result['ranked'].iloc[0]
+    print(f"\n📊 V4.2 handmatig: {baseline[config.ADAPTIVE_METRIC].iloc[0]:.2f} | "
+          f"beste gevonden: {best[config.ADAPTIVE_METRIC]:.2f}")
+    print(f"   {result['best']}")
@@ -0,0 +1,195 @@
+﻿# =============================================================================
+# ASYNC FETCHER — MT5 historie in maand chunks, parallel en met retries
+# =============================================================================
+# Lange ranges worden opgeknipt in kalendermaanden. De blokkerende
+# copy_rates_range calls draaien in een thread pool; een semaphore houdt het
+# aantal gelijktijdige requests binnen de limiet van de terminal. Mislukte
+# chunks worden opnieuw geprobeerd (met oplopende wachttijd). Resultaten
+# gaan in tijdsvolgorde de bar store in zodra alle eerdere chunks binnen zijn.
+# De MT5 module is injecteerbaar (fake terminal voor tests).
+# =============================================================================
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+import config
+import bar_store
+
+def month_chunks(start, end):
+    """
+    [start, end] → lijst (t0, t1) epoch seconds per kalendermaand (UTC).
+    Chunks sluiten op elkaar aan: t1 = begin volgende maand - 1 s.
+    """
+    t_start, t_end = bar_store.to_timestamp(start), bar_store.to_timestamp(end)
+    chunks = []
+    t0 = t_start
+    while t0 <= t_end:
+        d = datetime.fromtimestamp(t0, tz=timezone.utc)
+        year, month = (d.year + 1, 1) if d.month == 12 else (d.year, d.month + 1)
+        next_month = int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+        t1 = min(next_month - 1, t_end)
+        chunks.append((t0, t1))
+        t0 = t1 + 1
+    return chunks
+
+class AsyncFetcher:
+    """
+    mt5_module: MetaTrader5 (default) of een fake met copy_rates_range
+    max_concurrent: max gelijktijdige requests naar de terminal
+    retries: extra pogingen per chunk; retry_delay: eerste wachttijd (verdubbelt)
+    """
+
+    def __init__(self, mt5_module=None, max_concurrent=None, retries=None, retry_delay=None):
+        self.source = bar_store.MT5Source(mt5_module)
+        self.max_concurrent = max_concurrent or config.FETCH_MAX_CONCURRENT
+        self.retries = config.FETCH_RETRIES if retries is None else retries
+        self.retry_delay = config.FETCH_RETRY_DELAY if retry_delay is None else retry_delay
+        self._executor = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                            thread_name_prefix='mt5-fetch')
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._semaphore = None
+        return False
+
+    async def fetch_chunk(self, symbol, timeframe_str, t0, t1):
+        """
+        Eén chunk met retries. Returns: rates array (mogelijk leeg) of None
+        als alle pogingen mislukt zijn.
+        """
+        loop = asyncio.get_running_loop()
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            async with self._semaphore:
+                try:
+                    rates = await loop.run_in_executor(
+                        self._executor, self.source.fetch, symbol, timeframe_str, t0, t1
+                    )
+                except Exception as e:
+                    print(f"⚠️  Fetch {symbol} {timeframe_str} chunk {t0} fout: {str(e)}")
+                    rates = None
+            if rates is not None:
+                return rates
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+                delay *= 2
+        return None
+
+    async def iter_chunks(self, symbol, timeframe_str, start, end):
+        """
+        Async generator: (t0, t1, rates) in tijdsvolgorde; alle chunks lopen
+        tegelijk, een chunk wordt pas opgeleverd als alle eerdere binnen zijn.
+        """
+        chunks = month_chunks(start, end)
+        tasks = [asyncio.ensure_future(self.fetch_chunk(symbol, timeframe_str, t0, t1))
+                 for t0, t1 in chunks]
+        try:
+            for (t0, t1), task in zip(chunks, tasks):
+                yield t0, t1, await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch_range(self, symbol, timeframe_str, start, end):
+        """Hele range als één rates array (None als een chunk definitief mislukt)."""
+        parts = []
+        async for _, _, rates in self.iter_chunks(symbol, timeframe_str, start, end):
+            if rates is None:
+                return None
+            parts.append(rates)
+        if not parts:
+            return np.empty(0, dtype=bar_store.RATES_DTYPE)
+        return np.concatenate(parts)
+
+    async def fetch_into_store(self, store, symbol, timeframe_str, start, end=None):
+        """
+        Streaming variant van BarStore.refresh: chunks worden op volgorde
+        bijgeschreven zodra ze binnen zijn. Bij een definitief mislukte chunk
+        stopt het schrijven (geen gaten in de cache). Bij een volledige herlaad
+        blijft de bestaande partitie staan tot de eerste chunk met bars binnen
+        is; die vervangt dan de partitie.
+        Returns: aantal geschreven records
+        """
+        end = end or datetime.now(timezone.utc)
+        start_ts = bar_store.to_timestamp(start)
+        _, last_time = store.first_last_time(symbol, timeframe_str)
+        covered = store.covered_start(symbol, timeframe_str)
+
+        full_reload = last_time is None or covered is None or start_ts < covered
+        if not full_reload:
+            start = last_time
+        replaced = False
+
+        n = 0
+        async for t0, _, rates in self.iter_chunks(symbol, timeframe_str, start, end):
+            if rates is None:
+                print(f"❌ Fetch {symbol} {timeframe_str} gestopt bij chunk "
+                      f"{datetime.fromtimestamp(t0, tz=timezone.utc):%Y-%m}")
+                return n
+            if full_reload and not replaced:
+                if len(rates) == 0:
+                    continue
+                n += store.replace(symbol, timeframe_str, rates)
+                replaced = True
+            else:
+                n += store.append(symbol, timeframe_str, rates)
+
+        if replaced:
+            store.mark_covered(symbol, timeframe_str, start_ts)
+        return n
+
+    async def fetch_many(self, store, requests, start, end=None):
+        """
+        requests: lijst (symbol, timeframe_str); alle ranges tegelijk (de
+        semaphore begrenst het totaal). Returns: {(symbol, tf): aantal records}
+        """
+        counts = await asyncio.gather(*[
+            self.fetch_into_store(store, symbol, tf, start, end) for symbol, tf in requests
+        ])
+        return dict(zip(requests, counts))
+
+class ChunkedSource:
+    """
+    Synchrone bron voor BarStore (zelfde fetch() als MT5Source), maar intern
+    in parallelle maand chunks. Niet aanroepen vanuit een draaiende event loop.
+    """
+
+    def __init__(self, mt5_module=None, **fetcher_kwargs):
+        self.mt5_module = mt5_module
+        self.fetcher_kwargs = fetcher_kwargs
+
+    def fetch(self, symbol, timeframe_str, start, end):
+        async def _run():
+            async with AsyncFetcher(self.mt5_module, **self.fetcher_kwargs) as fetcher:
+                return await fetcher.fetch_range(symbol, timeframe_str, start, end)
+        return asyncio.run(_run())
+
+def fetch_into_store(store, requests, start, end=None, mt5_module=None, **fetcher_kwargs):
+    """Synchrone wrapper rond AsyncFetcher.fetch_many."""
+    async def _run():
+        async with AsyncFetcher(mt5_module, **fetcher_kwargs) as fetcher:
+            return await fetcher.fetch_many(store, requests, start, end)
+    return asyncio.run(_run())
+
+# =============================================================================
+# MAIN
+# =============================================================================
+if __name__ == "__main__":
+    import data_handler
+
+    if not data_handler.initialize_mt5():
+        raise SystemExit(1)
+
+    store = bar_store.BarStore()
+    counts = fetch_into_store(store, [(s, config.TIMEFRAME_MT5) for s in config.SYMBOLS],
+                              config.START_DATE, config.END_DATE, data_handler.mt5)
+    for (symbol, tf), n in counts.items():
+        print(f"✅ {symbol} {tf}: {n} bars in cache")
+    data_handler.shutdown_mt5()
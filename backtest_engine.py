@@ -2,25 +2,31 @@
 # BACKTEST ENGINE v3.0 — PROFESSIONAL AUDITED EDITION
 # Fixes: NoneType errors, dynamische sizing, SL/TP, trailing stop
 # =============================================================================
+import bisect
 import pandas as pd
 import numpy as np
 import config
 import indicators
+import metrics
+import profiling
+import records
 import strategy
 
-def calculate_trade_costs(lot_size, spread_pts, slippage_pts, commission_per_lot):
+def calculate_trade_costs(lot_size, spread_pts, slippage_pts, commission_per_lot,
+                          point_value_per_01lot=0.10):
     """
     Bereken totale kosten per trade.
     Voor XAUUSD: 1 point = 0.01 price move
+    point_value_per_01lot: USD per point per 0.1 lot (per symbool, zie SYMBOL_SPECS)
     """
-    point_value_per_01lot = 0.10  # USD per point
     spread_cost = spread_pts * point_value_per_01lot * (lot_size / 0.1)
     slippage_cost = slippage_pts * point_value_per_01lot * (lot_size / 0.1)
     commission = commission_per_lot * lot_size
     
     return spread_cost + slippage_cost + commission
 
-def run_backtest(df, params, initial_capital=None):
+def run_backtest(df, params, initial_capital=None, engine=None, abort_drawdown=None,
+                 intrabar_source=None, scalars_only=False, stats=None):
     """
     Volledige backtest met:
     - Kosten per trade (niet lineair!)
@@ -29,16 +35,97 @@ def run_backtest(df, params, initial_capital=None):
     - Trailing Stop
     - Proper equity tracking
     - Null-safe berekeningen
+    
+    engine: 'iterrows' (origineel, rij-voor-rij) of 'numpy' (state machine
+    over ndarrays, zelfde trades/equity/metrics). Default: config.BACKTEST_ENGINE
+    engine='sparse': zelfde resultaat als 'numpy', maar springt van signaal
+    naar signaal en zoekt de exit per positie gevectoriseerd (kosten schalen
+    met het aantal trades in plaats van het aantal bars)
+    abort_drawdown: stop vroegtijdig zodra drawdown dieper gaat dan deze fractie
+    (bv. 0.3 = -30%). Alleen voor engine='numpy'/'sparse'; result['aborted'] = True.
+    engine='intrabar': exits op M1 bars/ticks binnen bars met open positie
+    (intrabar_source, default M1 uit de BarStore); zie intrabar.py
+    scalars_only: alleen metrics teruggeven; equity_curve, trades en
+    df_with_signals worden niet opgebouwd (None). Alleen voor engine='numpy'/'sparse'.
+    stats: online_stats.OnlineStats die met de equity per bar en de trade
+    pnl's wordt bijgewerkt (bv. backtest als startpunt van een forward test)
     """
-    cap = initial_capital or config.INITIAL_CAPITAL
     df = df.copy()
     
     # Bereken indicatoren (geef params door voor dynamische EMA's)
-    df = indicators.calculate_all_indicators(df, params=params)
+    with profiling.get_profiler().stage('indicators'):
+        df = indicators.calculate_all_indicators(df, params=params)
     
     # Genereer signalen
     df = strategy.generate_final_signals(df, params)
     
+    return run_backtest_on_signals(df, params, initial_capital, engine, abort_drawdown,
+                                   intrabar_source, scalars_only, stats)
+
+def run_backtest_on_signals(df, params, initial_capital=None, engine=None, abort_drawdown=None,
+                            intrabar_source=None, scalars_only=False, stats=None):
+    """
+    Backtest loop + metrics op een frame dat al een 'signal' kolom heeft.
+    Gebruikt door walk-forward: signalen één keer op de volledige historie,
+    daarna alleen slicen per window.
+    """
+    cap = initial_capital or config.INITIAL_CAPITAL
+    engine = engine or config.BACKTEST_ENGINE
+    prof = profiling.get_profiler()
+    
+    aborted = False
+    intrabar_stats = None
+    trade_arr = None
+    if engine in ('numpy', 'sparse'):
+        kernel = _run_numpy_kernel if engine == 'numpy' else _run_sparse_kernel
+        with prof.stage('bar_loop'):
+            equity_arr, trade_log, equity, aborted = kernel(df, cap, abort_drawdown)
+        trade_arr = metrics.trade_arrays(trade_log)
+        if stats is not None:
+            stats.extend(equity_arr, trade_arr['pnl'])
+        if scalars_only:
+            with prof.stage('metrics'):
+                results = _build_scalar_results(params, cap, equity, equity_arr, trade_arr)
+            results['aborted'] = aborted
+            _count_run(prof, len(equity_arr), results['total_trades'])
+            return results
+        with prof.stage('build_outputs'):
+            trades, equity_df = _numpy_outputs(df, equity_arr, trade_log)
+    elif engine == 'iterrows':
+        if abort_drawdown is not None:
+            raise ValueError("abort_drawdown wordt alleen ondersteund door engine='numpy'/'sparse'")
+        with prof.stage('bar_loop'):
+            equity, trades, equity_df = _run_iterrows_loop(df, cap)
+    elif engine == 'intrabar':
+        if abort_drawdown is not None:
+            raise ValueError("abort_drawdown wordt alleen ondersteund door engine='numpy'/'sparse'")
+        import intrabar
+        source = intrabar_source or intrabar.default_source(df)
+        with prof.stage('bar_loop'):
+            equity, trades, equity_df, intrabar_stats = intrabar.run_intrabar_loop(df, cap, source)
+    else:
+        raise ValueError(f"Onbekende backtest engine: {engine}")
+    
+    if stats is not None and trade_arr is None:
+        stats.extend(equity_df['equity'].to_numpy() if len(equity_df) > 0 else [],
+                     [t['pnl'] for t in trades])
+    
+    with prof.stage('metrics'):
+        results = _build_results(params, cap, equity, trades, equity_df, df, trade_arr)
+    results['aborted'] = aborted
+    _count_run(prof, len(equity_df), results['total_trades'])
+    if intrabar_stats is not None:
+        results['intrabar'] = intrabar_stats
+    return results
+
+def _count_run(prof, bars, trades):
+    if prof.enabled:
+        prof.count('backtests')
+        prof.count('bars_processed', bars)
+        prof.count('trades_opened', trades)
+
+def _run_iterrows_loop(df, cap):
+    """Originele rij-voor-rij loop (referentie voor de numpy kernel)."""
     # ----- BACKTEST LOOP -----
     equity = cap
     position = 0  # 0 = flat, 1 = long, -1 = short
@@ -155,39 +242,445 @@ def run_backtest(df, params, initial_capital=None):
             'exit_reason': 'END_OF_TEST'
         })
     
-    # ----- METRICS BEREKENEN -----
     if len(equity_curve) > 0:
         equity_df = pd.DataFrame(equity_curve).set_index('time')
-        
-        # Drawdown
-        equity_df['peak'] = equity_df['equity'].cummax()
-        equity_df['drawdown'] = (equity_df['equity'] - equity_df['peak']) / equity_df['peak']
-        max_drawdown = equity_df['drawdown'].min()
     else:
         equity_df = pd.DataFrame()
-        max_drawdown = 0
     
-    # Trade metrics
-    if len(trades) > 0:
-        trade_df = pd.DataFrame(trades)
-        winning = trade_df[trade_df['pnl'] > 0]
-        losing = trade_df[trade_df['pnl'] <= 0]
+    return equity, trades, equity_df
+
+def _run_numpy_kernel(df, cap, abort_drawdown=None):
+    """_bar_loop_kernel op de kolommen van df."""
+    return _bar_loop_kernel(
+        df['high'].to_numpy(dtype=np.float64),
+        df['low'].to_numpy(dtype=np.float64),
+        df['close'].to_numpy(dtype=np.float64),
+        df['signal'].to_numpy(),
+        cap,
+        abort_drawdown
+    )
+
+def _numpy_outputs(df, equity_arr, trade_log):
+    """Kernel output → trades (lijst met dicts) en equity DataFrame."""
+    index = df.index[:len(equity_arr)]
+    trades = trade_log.to_dicts(index)
+    
+    if len(equity_arr) > 0:
+        equity_df = pd.DataFrame({'equity': equity_arr}, index=index.copy())
+        equity_df.index.name = 'time'
+    else:
+        equity_df = pd.DataFrame()
+    
+    return trades, equity_df
+
+def _bar_loop_kernel(high, low, close, signal, cap, abort_drawdown=None):
+    """
+    State machine over ndarrays: exact dezelfde volgorde en floating point
+    berekeningen als strategy.apply_trailing_stop / check_stop_loss_tp.
+    
+    Met abort_drawdown stopt de loop zodra (equity - peak) / peak daaronder
+    zakt; equity verandert alleen bij entry/exit, dus alleen daar checken.
+    
+    Returns: (equity per bar, records.TradeLog, eind equity, aborted)
+    """
+    n = len(close)
+    equity_arr = np.empty(n, dtype=np.float64)
+    trade_log = records.TradeLog()
+    
+    # Python floats zijn in een scalar loop veel sneller dan ndarray indexing
+    highs = high.tolist()
+    lows = low.tolist()
+    closes = close.tolist()
+    signals = signal.tolist()
+    
+    sl_dist = config.STOP_LOSS_POINTS * 0.00001
+    tp_dist = config.TAKE_PROFIT_POINTS * 0.00001
+    trail_on = config.TRAILING_STOP_ACTIVATION > 0
+    trail_activation = config.TRAILING_STOP_ACTIVATION
+    trail_dist = config.TRAILING_STOP_POINTS * 0.00001
+    entry_sl_dist = config.STOP_LOSS_POINTS * 0.01  # Zelfde initiele SL als iterrows loop
+    
+    equity = cap
+    position = 0
+    entry_price = 0.0
+    entry_i = 0
+    lot_size = config.LOT_SIZE_BASE
+    current_sl = 0.0
+    peak = cap
+    min_dd = -abort_drawdown if abort_drawdown is not None else None
+    trail_updates = 0
+    
+    for i in range(n):
+        prev_equity = equity
+        
+        # 1. Exit voorwaarden (SL/TP/Trailing)
+        if position != 0:
+            c = closes[i]
+            hi = highs[i]
+            lo = lows[i]
+            
+            if position == 1:
+                if trail_on and (c - entry_price) / 0.00001 >= trail_activation:
+                    trailed_sl = max(entry_price - sl_dist, c - trail_dist)
+                    current_sl = max(current_sl, trailed_sl)
+                    trail_updates += 1
+                
+                sl_price = entry_price - sl_dist
+                if lo <= sl_price:
+                    exit_reason, exit_price = 'SL', sl_price
+                elif hi >= entry_price + tp_dist:
+                    exit_reason, exit_price = 'TP', entry_price + tp_dist
+                else:
+                    exit_reason, exit_price = 'CONTINUE', None
+                hit = exit_reason != 'CONTINUE' or lo <= current_sl
+            else:
+                if trail_on and (entry_price - c) / 0.00001 >= trail_activation:
+                    trailed_sl = min(entry_price + sl_dist, c + trail_dist)
+                    current_sl = min(current_sl, trailed_sl)
+                    trail_updates += 1
+                
+                sl_price = entry_price + sl_dist
+                if hi >= sl_price:
+                    exit_reason, exit_price = 'SL', sl_price
+                elif lo <= entry_price - tp_dist:
+                    exit_reason, exit_price = 'TP', entry_price - tp_dist
+                else:
+                    exit_reason, exit_price = 'CONTINUE', None
+                hit = exit_reason != 'CONTINUE' or hi >= current_sl
+            
+            if hit:
+                if exit_price is not None:
+                    if position == 1:
+                        pnl = (exit_price - entry_price) * lot_size * 100
+                    else:
+                        pnl = (entry_price - exit_price) * lot_size * 100
+                else:
+                    pnl = 0  # Safety fallback (trailing SL zonder exit prijs)
+                
+                equity += pnl
+                trade_log.append(
+                    entry_i, i, position, entry_price, exit_price, lot_size, pnl,
+                    exit_reason if exit_reason in ('SL', 'TP') else 'SIGNAL'
+                )
+                position = 0
         
-        win_rate = len(winning) / len(trades)
-        avg_win = winning['pnl'].mean() if len(winning) > 0 else 0
-        avg_loss = losing['pnl'].mean() if len(losing) > 0 else 0
-        gross_wins = winning['pnl'].sum()
-        gross_losses = abs(losing['pnl'].sum())
-        profit_factor = gross_wins / gross_losses if gross_losses > 0 else 999
+        # 2. Entry signaal
+        sig = signals[i]
+        if sig != 0 and position == 0:
+            if equity <= 0:
+                equity = cap
+            
+            lot_size = strategy.calculate_dynamic_lot_size(
+                equity, config.RISK_PER_TRADE_PCT,
+                config.STOP_LOSS_POINTS, config.SYMBOL
+            )
+            equity -= calculate_trade_costs(
+                lot_size,
+                config.SPREAD_POINTS_AVG,
+                config.SLIPPAGE_POINTS_AVG,
+                config.COMMISSION_PER_LOT
+            )
+            
+            position = sig
+            entry_price = closes[i]
+            entry_i = i
+            current_sl = entry_price - entry_sl_dist if position == 1 else \
+                        entry_price + entry_sl_dist
+        
+        # 3. Equity
+        equity_arr[i] = equity
+        
+        if min_dd is not None and equity != prev_equity:
+            if equity > peak:
+                peak = equity
+            elif (equity - peak) / peak < min_dd:
+                profiling.get_profiler().count('trailing_updates', trail_updates)
+                return equity_arr[:i + 1], trade_log, equity, True
+    
+    # Sluit open positie aan einde (market close)
+    if position != 0 and n > 0:
+        exit_price = closes[-1]
+        if position == 1:
+            pnl = (exit_price - entry_price) * lot_size * 100
+        else:
+            pnl = (entry_price - exit_price) * lot_size * 100
+        equity += pnl
+        trade_log.append(entry_i, n - 1, position, entry_price, exit_price, lot_size, pnl, 'END_OF_TEST')
+    
+    profiling.get_profiler().count('trailing_updates', trail_updates)
+    return equity_arr, trade_log, equity, False
+
+# ----- SPARSE ENGINE -----
+
+SPARSE_SCALAR_BARS = 8  # Eerste bars na een entry scalar (de meeste trades zijn kort)
+SPARSE_WINDOW = 64      # Daarna zoekvensters (bars), verdubbelen tot de exit gevonden is
+
+def _run_sparse_kernel(df, cap, abort_drawdown=None):
+    """_sparse_kernel op de kolommen van df."""
+    return _sparse_kernel(
+        df['high'].to_numpy(dtype=np.float64),
+        df['low'].to_numpy(dtype=np.float64),
+        df['close'].to_numpy(dtype=np.float64),
+        df['signal'].to_numpy(),
+        cap,
+        abort_drawdown
+    )
+
+def _exit_spec():
+    """Exit constanten uit config (één keer per run)."""
+    return (
+        config.STOP_LOSS_POINTS * 0.00001,
+        config.TAKE_PROFIT_POINTS * 0.00001,
+        config.TRAILING_STOP_ACTIVATION > 0,
+        config.TRAILING_STOP_ACTIVATION,
+        config.TRAILING_STOP_POINTS * 0.00001,
+    )
+
+def _find_exit(high, low, close, spec, start, position, entry_price, current_sl):
+    """
+    Eerste bar >= start waarop _bar_loop_kernel de positie sluit. De eerste
+    SPARSE_SCALAR_BARS bars scalar (spec = _exit_spec()),
+    daarna in vensters met first-crossing over high/low tegen SL, TP en de
+    trailing stop (running max/min van de trailed levels, dezelfde float
+    expressies als de bar loop).
+    Returns: (exit bar of None, reden, exit prijs, trailing updates, current_sl)
+    """
+    n = len(close)
+    sl_dist, tp_dist, trail_on, trail_activation, trail_dist = spec
+    if position == 1:
+        sl_price = entry_price - sl_dist
+        tp_price = entry_price + tp_dist
     else:
-        win_rate = 0
-        avg_win = 0
-        avg_loss = 0
-        profit_factor = 0
+        sl_price = entry_price + sl_dist
+        tp_price = entry_price - tp_dist
+    
+    trail_updates = 0
+    high_at, low_at, close_at = high.item, low.item, close.item
+    lo_i = min(n, start + SPARSE_SCALAR_BARS)
+    for i in range(start, lo_i):
+        c = close_at(i)
+        if position == 1:
+            if trail_on and (c - entry_price) / 0.00001 >= trail_activation:
+                current_sl = max(current_sl, max(sl_price, c - trail_dist))
+                trail_updates += 1
+            if low_at(i) <= sl_price:
+                return i, 'SL', sl_price, trail_updates, current_sl
+            if high_at(i) >= tp_price:
+                return i, 'TP', tp_price, trail_updates, current_sl
+            if low_at(i) <= current_sl:
+                return i, 'SIGNAL', None, trail_updates, current_sl
+        else:
+            if trail_on and (entry_price - c) / 0.00001 >= trail_activation:
+                current_sl = min(current_sl, min(sl_price, c + trail_dist))
+                trail_updates += 1
+            if high_at(i) >= sl_price:
+                return i, 'SL', sl_price, trail_updates, current_sl
+            if low_at(i) <= tp_price:
+                return i, 'TP', tp_price, trail_updates, current_sl
+            if high_at(i) >= current_sl:
+                return i, 'SIGNAL', None, trail_updates, current_sl
+    
+    window = SPARSE_WINDOW
+    while lo_i < n:
+        hi_i = min(n, lo_i + window)
+        h = high[lo_i:hi_i]
+        l = low[lo_i:hi_i]
+        c = close[lo_i:hi_i]
+        
+        if position == 1:
+            if trail_on:
+                active = (c - entry_price) / 0.00001 >= trail_activation
+                levels = np.where(active, np.maximum(sl_price, c - trail_dist), -np.inf)
+                stops = np.maximum(np.maximum.accumulate(levels), current_sl)
+            else:
+                active = None
+                stops = np.full(len(c), current_sl)
+            sl_hit = l <= sl_price
+            tp_hit = h >= tp_price
+            trail_hit = l <= stops
+        else:
+            if trail_on:
+                active = (entry_price - c) / 0.00001 >= trail_activation
+                levels = np.where(active, np.minimum(sl_price, c + trail_dist), np.inf)
+                stops = np.minimum(np.minimum.accumulate(levels), current_sl)
+            else:
+                active = None
+                stops = np.full(len(c), current_sl)
+            sl_hit = h >= sl_price
+            tp_hit = l <= tp_price
+            trail_hit = h >= stops
+        
+        hits = np.flatnonzero(sl_hit | tp_hit | trail_hit)
+        if len(hits) > 0:
+            k = hits[0]
+            if active is not None:
+                trail_updates += int(np.count_nonzero(active[:k + 1]))
+            if sl_hit[k]:
+                return lo_i + k, 'SL', sl_price, trail_updates, current_sl
+            if tp_hit[k]:
+                return lo_i + k, 'TP', tp_price, trail_updates, current_sl
+            return lo_i + k, 'SIGNAL', None, trail_updates, current_sl
+        
+        if active is not None:
+            trail_updates += int(np.count_nonzero(active))
+        current_sl = float(stops[-1])
+        lo_i = hi_i
+        window *= 2
+    return None, None, None, trail_updates, current_sl
+
+def _sparse_kernel(high, low, close, signal, cap, abort_drawdown=None):
+    """
+    Event-gedreven variant van _bar_loop_kernel met identieke output.
+    Flat stukken zonder signaal worden overgeslagen (volgende entry via de
+    event index); per positie zoekt _find_exit de exit bar gevectoriseerd.
+    Equity wordt alleen op entry/exit bars bijgehouden en aan het eind in
+    één keer naar een array per bar uitgeschreven.
+    
+    Returns: (equity per bar, records.TradeLog, eind equity, aborted)
+    """
+    n = len(close)
+    trade_log = records.TradeLog()
+    events = np.flatnonzero(signal).tolist()
+    # Alleen event bars worden bekeken: scalar .item() i.p.v. hele kolommen naar lijsten
+    signal_at = signal.item
+    spec = _exit_spec()
+    entry_sl_dist = config.STOP_LOSS_POINTS * 0.01  # Zelfde initiele SL als iterrows loop
+    
+    equity = cap
+    peak = cap
+    min_dd = -abort_drawdown if abort_drawdown is not None else None
+    change_bars = [0]
+    change_equity = [cap]
+    trail_updates = 0
+    aborted = False
+    end = n
+    
+    position = 0
+    pending = None   # (exit bar, reden, exit prijs) van de open positie
+    i = events[0] if events else n
+    while i < n:
+        prev_equity = equity
+        
+        # 1. Exit op deze bar (gevonden door _find_exit)
+        if pending is not None:
+            _, exit_reason, exit_price = pending
+            if exit_price is not None:
+                if position == 1:
+                    pnl = (exit_price - entry_price) * lot_size * 100
+                else:
+                    pnl = (entry_price - exit_price) * lot_size * 100
+            else:
+                pnl = 0  # Safety fallback (trailing SL zonder exit prijs)
+            equity += pnl
+            trade_log.append(entry_i, i, position, entry_price, exit_price, lot_size, pnl, exit_reason)
+            position = 0
+            pending = None
+        
+        # 2. Entry signaal
+        sig = signal_at(i)
+        if sig != 0:
+            if equity <= 0:
+                equity = cap
+            
+            lot_size = strategy.calculate_dynamic_lot_size(
+                equity, config.RISK_PER_TRADE_PCT,
+                config.STOP_LOSS_POINTS, config.SYMBOL
+            )
+            equity -= calculate_trade_costs(
+                lot_size,
+                config.SPREAD_POINTS_AVG,
+                config.SLIPPAGE_POINTS_AVG,
+                config.COMMISSION_PER_LOT
+            )
+            
+            position = sig
+            entry_price = close.item(i)
+            entry_i = i
+            current_sl = entry_price - entry_sl_dist if position == 1 else \
+                        entry_price + entry_sl_dist
+        
+        # 3. Equity (alleen wijzigingen vastleggen)
+        if equity != prev_equity:
+            change_bars.append(i)
+            change_equity.append(equity)
+            if min_dd is not None:
+                if equity > peak:
+                    peak = equity
+                elif (equity - peak) / peak < min_dd:
+                    aborted = True
+                    end = i + 1
+                    position = 0
+                    break
+        
+        # 4. Volgende bar met iets te doen
+        if position != 0:
+            x, reason, price, updates, current_sl = _find_exit(
+                high, low, close, spec, i + 1, position, entry_price, current_sl
+            )
+            trail_updates += updates
+            if x is None:
+                break
+            pending = (x, reason, price)
+            i = x
+        else:
+            k = bisect.bisect_left(events, i + 1)
+            i = events[k] if k < len(events) else n
+    
+    # Equity per bar: elke waarde herhaald tot de volgende wijziging
+    change_bars.append(end)
+    equity_arr = np.repeat(np.asarray(change_equity, dtype=np.float64), np.diff(change_bars))
+    
+    # Sluit open positie aan einde (market close)
+    if position != 0 and n > 0:
+        exit_price = float(close[-1])
+        if position == 1:
+            pnl = (exit_price - entry_price) * lot_size * 100
+        else:
+            pnl = (entry_price - exit_price) * lot_size * 100
+        equity += pnl
+        trade_log.append(entry_i, n - 1, position, entry_price, exit_price, lot_size, pnl, 'END_OF_TEST')
+    
+    profiling.get_profiler().count('trailing_updates', trail_updates)
+    return equity_arr, trade_log, equity, aborted
+
+def _build_results(params, cap, equity, trades, equity_df, df, trade_arr=None):
+    """Metrics + result dict (gedeeld door alle engines)."""
+    if len(equity_df) > 0:
+        equity_arr = equity_df['equity'].to_numpy(dtype=np.float64)
+    else:
+        equity_arr = np.empty(0, dtype=np.float64)
+    
+    if trade_arr is None:
+        # Trades als dicts (iterrows/intrabar) → compacte arrays
+        index = equity_df.index if len(equity_df) > 0 else pd.Index([])
+        trade_arr = {
+            'entry_idx': index.searchsorted([t['entry_time'] for t in trades]).astype(np.int64),
+            'exit_idx': index.searchsorted([t['exit_time'] for t in trades]).astype(np.int64),
+            'pnl': np.array([t['pnl'] for t in trades], dtype=np.float64),
+            'lot_size': np.array([t['lot_size'] for t in trades], dtype=np.float64),
+        }
+    
+    results = _build_scalar_results(params, cap, equity, equity_arr, trade_arr)
+    
+    # Drawdown kolommen voor rapportage
+    if len(equity_df) > 0:
+        equity_df['peak'] = equity_df['equity'].cummax()
+        equity_df['drawdown'] = (equity_df['equity'] - equity_df['peak']) / equity_df['peak']
+    
+    results.update({
+        'equity_curve': equity_df,
+        'trades': trades,
+        'df_with_signals': df
+    })
+    return results
+
+def _build_scalar_results(params, cap, equity, equity_arr, trade_arr):
+    """Alleen scalars: metrics.compute op de equity array + trade arrays."""
+    stats = metrics.compute(equity_arr, trade_arr)
     
     # Totale kosten
-    total_trades = len(trades)
-    avg_lot = np.mean([t['lot_size'] for t in trades]) if trades else config.LOT_SIZE_BASE
+    total_trades = len(trade_arr['pnl'])
+    avg_lot = trade_arr['lot_size'].mean() if total_trades else config.LOT_SIZE_BASE
     avg_cost = calculate_trade_costs(avg_lot, config.SPREAD_POINTS_AVG, 
                                      config.SLIPPAGE_POINTS_AVG, config.COMMISSION_PER_LOT)
     total_costs = total_trades * avg_cost
@@ -200,13 +693,45 @@ def run_backtest(df, params, initial_capital=None):
         'net_profit': net_profit,
         'final_equity': equity,
         'total_trades': total_trades,
-        'win_rate': win_rate,
-        'profit_factor': profit_factor,
-        'max_drawdown': max_drawdown,
+        'win_rate': stats['win_rate'],
+        'profit_factor': stats['profit_factor'],
+        'max_drawdown': stats['max_drawdown'],
         'total_costs': total_costs,
-        'avg_win': avg_win,
-        'avg_loss': avg_loss,
-        'equity_curve': equity_df,
-        'trades': trades,
-        'df_with_signals': df
-    }
\ No newline at end of file
+        'avg_win': stats['avg_win'],
+        'avg_loss': stats['avg_loss'],
+        'sharpe': stats['sharpe'],
+        'sortino': stats['sortino'],
+        'expectancy': stats['expectancy'],
+        'exposure': stats['exposure'],
+        'equity_curve': None,
+        'trades': None,
+        'df_with_signals': None
+    }
+
+def compare_engines(df, params, initial_capital=None, engine='numpy', reference='iterrows',
+                    abort_drawdown=None):
+    """
+    Pariteitscheck: draai reference (default 'iterrows') en engine ('numpy' of
+    'sparse') op dezelfde data. abort_drawdown gaat naar beide engines, dus
+    alleen met reference='numpy'/'sparse'.
+    Returns: lijst met verschillen (leeg = identiek)
+    """
+    ref = run_backtest(df, params, initial_capital, engine=reference, abort_drawdown=abort_drawdown)
+    new = run_backtest(df, params, initial_capital, engine=engine, abort_drawdown=abort_drawdown)
+    
+    diffs = []
+    for key in ['net_profit', 'final_equity', 'total_trades', 'win_rate', 'profit_factor',
+                'max_drawdown', 'total_costs', 'avg_win', 'avg_loss',
+                'sharpe', 'sortino', 'expectancy', 'exposure', 'aborted']:
+        if ref[key] != new[key] and not (pd.isna(ref[key]) and pd.isna(new[key])):
+            diffs.append(f"{key}: {ref[key]} != {new[key]}")
+    
+    if ref['trades'] != new['trades']:
+        diffs.append(f"trades: {len(ref['trades'])} vs {len(new['trades'])} (inhoud verschilt)")
+    
+    ref_eq = ref['equity_curve']
+    new_eq = new['equity_curve']
+    if len(ref_eq) != len(new_eq) or (len(ref_eq) > 0 and not ref_eq.equals(new_eq)):
+        diffs.append("equity_curve verschilt")
+    
+    return diffs
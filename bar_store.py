@@ -0,0 +1,254 @@
+﻿# =============================================================================
+# BAR STORE — Lokale OHLC cache per symbool/timeframe (memory-mapped)
+# =============================================================================
+# Layout: <DATA_CACHE_DIR>/<SYMBOL>/<TIMEFRAME>.bin (+ .json met opgevraagde start)
+# Elk bestand is een platte array records in exact het copy_rates_range
+# formaat (RATES_DTYPE). Lezen via np.memmap, nieuwe bars worden achteraan
+# bijgeschreven. Alleen bars na de laatste gecachte timestamp worden gehaald.
+# =============================================================================
+import os
+import hashlib
+import json
+from datetime import datetime, timezone
+import numpy as np
+import config
+
+# Record layout van mt5.copy_rates_range / copy_rates_from_pos
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+TIMEFRAME_SECONDS = {
+    'M1': 60,
+    'M5': 300,
+    'M15': 900,
+    'M30': 1800,
+    'H1': 3600,
+    'H4': 14400,
+    'D1': 86400,
+}
+
+def as_rates(rates):
+    """Converteer een structured array naar RATES_DTYPE (ontbrekende velden = 0)."""
+    if rates is None:
+        return np.empty(0, dtype=RATES_DTYPE)
+    rates = np.asarray(rates)
+    if rates.dtype == RATES_DTYPE:
+        return rates
+    out = np.zeros(len(rates), dtype=RATES_DTYPE)
+    for name in RATES_DTYPE.names:
+        if rates.dtype.names and name in rates.dtype.names:
+            out[name] = rates[name]
+    return out
+
+def to_timestamp(value):
+    """datetime (naive = UTC) of epoch seconds → epoch seconds (int)."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return int(value)
+
+# ----- BRONNEN -----
+
+class MT5Source:
+    """Haalt bars via MetaTrader5.copy_rates_range (module injecteerbaar)."""
+
+    def __init__(self, mt5_module=None):
+        if mt5_module is None:
+            import MetaTrader5 as mt5_module
+        self.mt5 = mt5_module
+
+    def fetch(self, symbol, timeframe_str, start, end):
+        timeframe = getattr(self.mt5, f"TIMEFRAME_{timeframe_str}")
+        # Epoch seconds (uit de cache) → datetime; datetimes ongewijzigd doorgeven
+        if not isinstance(start, datetime):
+            start = datetime.fromtimestamp(to_timestamp(start), tz=timezone.utc)
+        if not isinstance(end, datetime):
+            end = datetime.fromtimestamp(to_timestamp(end), tz=timezone.utc)
+        rates = self.mt5.copy_rates_range(symbol, timeframe, start, end)
+        if rates is None:
+            return None
+        return as_rates(rates)
+
+class ArraySource:
+    """In-memory bron (stub voor tests / synthetische data)."""
+
+    def __init__(self, rates_by_key=None):
+        self.rates_by_key = {k: as_rates(v) for k, v in (rates_by_key or {}).items()}
+        self.fetch_count = 0
+
+    def fetch(self, symbol, timeframe_str, start, end):
+        self.fetch_count += 1
+        rates = self.rates_by_key.get((symbol, timeframe_str))
+        if rates is None:
+            return None
+        start, end = to_timestamp(start), to_timestamp(end)
+        mask = (rates['time'] >= start) & (rates['time'] <= end)
+        return rates[mask]
+
+# ----- STORE -----
+
+class BarStore:
+    """
+    Persistente bar cache.
+
+    source: object met fetch(symbol, timeframe_str, start, end) → rates array
+    (MT5Source, ArraySource of eigen implementatie). None = alleen lokaal lezen.
+    """
+
+    def __init__(self, root=None, source=None):
+        self.root = root or config.DATA_CACHE_DIR
+        self.source = source
+
+    def path(self, symbol, timeframe_str):
+        return os.path.join(self.root, symbol, f"{timeframe_str}.bin")
+
+    def _meta_path(self, symbol, timeframe_str):
+        return os.path.join(self.root, symbol, f"{timeframe_str}.json")
+
+    def _read_meta(self, symbol, timeframe_str):
+        try:
+            with open(self._meta_path(symbol, timeframe_str)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, symbol, timeframe_str, meta):
+        with open(self._meta_path(symbol, timeframe_str), 'w') as f:
+            json.dump(meta, f)
+
+    def load(self, symbol, timeframe_str):
+        """Alle gecachte bars als read-only memmap (leeg array als er niets is)."""
+        path = self.path(symbol, timeframe_str)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=RATES_DTYPE)
+        # Half geschreven record (crash) negeren
+        n = os.path.getsize(path) // RATES_DTYPE.itemsize
+        if n == 0:
+            return np.empty(0, dtype=RATES_DTYPE)
+        return np.memmap(path, dtype=RATES_DTYPE, mode='r', shape=(n,))
+
+    def first_last_time(self, symbol, timeframe_str):
+        rates = self.load(symbol, timeframe_str)
+        if len(rates) == 0:
+            return None, None
+        return int(rates['time'][0]), int(rates['time'][-1])
+
+    def data_version(self, symbol, timeframe_str):
+        """
+        Korte versie string: aantal bars + laatste timestamp + hash van het
+        eerste en laatste record. append() overschrijft een bar in opbouw met
+        dezelfde timestamp; de hash maakt dat zichtbaar in de versie.
+        """
+        rates = self.load(symbol, timeframe_str)
+        if len(rates) == 0:
+            return "empty"
+        h = hashlib.blake2b(rates[:1].tobytes() + rates[-1:].tobytes(), digest_size=6)
+        return f"{len(rates)}-{int(rates['time'][-1])}-{h.hexdigest()}"
+
+    def append(self, symbol, timeframe_str, rates):
+        """
+        Schrijf bars achteraan bij. Bars ouder dan de laatste gecachte bar
+        worden genegeerd; een bar met dezelfde timestamp overschrijft de
+        laatste (die kan nog in opbouw zijn geweest).
+        Returns: aantal geschreven records
+        """
+        rates = as_rates(rates)
+        if len(rates) == 0:
+            return 0
+
+        path = self.path(symbol, timeframe_str)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        n_cached = os.path.getsize(path) // RATES_DTYPE.itemsize if os.path.exists(path) else 0
+        _, last_time = self.first_last_time(symbol, timeframe_str)
+
+        offset = n_cached
+        if last_time is not None:
+            rates = rates[rates['time'] >= last_time]
+            if len(rates) > 0 and rates['time'][0] == last_time:
+                offset = n_cached - 1
+        if len(rates) == 0:
+            return 0
+
+        # Overschrijven in plaats van truncaten: werkt ook als een ander proces
+        # het bestand gemapt heeft (Windows)
+        mode = 'r+b' if os.path.exists(path) else 'wb'
+        with open(path, mode) as f:
+            f.seek(offset * RATES_DTYPE.itemsize)
+            f.write(np.ascontiguousarray(rates).tobytes())
+        return len(rates)
+
+    def replace(self, symbol, timeframe_str, rates):
+        """Vervang de volledige partitie (atomisch via tmp bestand)."""
+        rates = as_rates(rates)
+        path = self.path(symbol, timeframe_str)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(np.ascontiguousarray(rates).tobytes())
+        os.replace(tmp, path)
+        return len(rates)
+
+    def covered_start(self, symbol, timeframe_str):
+        """Vroegste start waarvoor de partitie volledig is opgehaald (epoch s)."""
+        return self._read_meta(symbol, timeframe_str).get('start')
+
+    def mark_covered(self, symbol, timeframe_str, start):
+        """Leg vast dat de partitie vanaf start volledig is opgehaald."""
+        meta = self._read_meta(symbol, timeframe_str)
+        meta['start'] = to_timestamp(start)
+        self._write_meta(symbol, timeframe_str, meta)
+
+    def refresh(self, symbol, timeframe_str, start, end=None):
+        """
+        Haal alleen ontbrekende bars op bij de source.
+        Ligt start vóór het eerder opgehaalde bereik, dan wordt de partitie
+        volledig herladen.
+        Returns: aantal nieuwe/bijgewerkte records (0 zonder source of bij fout)
+        """
+        if self.source is None:
+            return 0
+        end = end or datetime.now()
+        start_ts = to_timestamp(start)
+        _, last_time = self.first_last_time(symbol, timeframe_str)
+        covered = self.covered_start(symbol, timeframe_str)
+
+        if last_time is None or covered is None or start_ts < covered:
+            rates = self.source.fetch(symbol, timeframe_str, start, end)
+            if rates is None or len(rates) == 0:
+                return 0
+            n = self.replace(symbol, timeframe_str, rates)
+            self.mark_covered(symbol, timeframe_str, start_ts)
+            return n
+
+        rates = self.source.fetch(symbol, timeframe_str, last_time, end)
+        if rates is None:
+            return 0
+        return self.append(symbol, timeframe_str, rates)
+
+    def get_rates(self, symbol, timeframe_str, start, end=None, refresh=True):
+        """
+        Bars in [start, end] uit de lokale cache (na incrementele refresh).
+        Returns: structured array (view op de memmap)
+        """
+        if refresh:
+            try:
+                self.refresh(symbol, timeframe_str, start, end)
+            except Exception as e:
+                print(f"⚠️  Cache refresh mislukt, gebruik lokale data: {str(e)}")
+
+        rates = self.load(symbol, timeframe_str)
+        times = rates['time']
+        i0 = np.searchsorted(times, to_timestamp(start), side='left')
+        i1 = len(rates) if end is None else np.searchsorted(times, to_timestamp(end), side='right')
+        return rates[i0:i1]
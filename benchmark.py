@@ -0,0 +1,248 @@
+﻿# =============================================================================
+# BENCHMARK — Performance metingen zonder MT5 (synthetische EURUSD data)
+# =============================================================================
+# Deterministische random walk met realistische spread, intraday volatiliteit,
+# koers gaps, ontbrekende bars en weekend gaten. Meet per stage (data load,
+# indicatoren, signalen, bar loop, metrics en optioneel backtrader) op 10k,
+# 100k en 1M bars en schrijft de resultaten als JSON, zodat regressies per
+# commit te volgen zijn.
+#
+# Gebruik: python benchmark.py [--sizes 10000 100000] [--output bench.json]
+# =============================================================================
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import config
+import bar_store
+import backtest_engine
+import event_log
+import indicator_cache
+import indicators
+import metrics
+import strategy
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+BACKTRADER_MAX_BARS = 100_000   # Daarboven duurt één backtrader run minuten
+
+# ----- SYNTHETISCHE DATA -----
+
+def synthetic_rates(n_bars, timeframe_str='M15', seed=42, start=datetime(2020, 1, 6),
+                    start_price=1.10, daily_vol=0.006, gap_prob=0.001, missing_prob=0.0005):
+    """
+    EURUSD-achtige bars als RATES_DTYPE array (deterministisch per seed).
+    - Volatiliteit hoger tijdens Londen/New York dan in de Aziatische sessie
+    - Zaterdag/zondag bestaan niet; maandag opent met een weekend gap
+    - Af en toe een koers gap (nieuws) en af en toe een ontbrekende bar
+    """
+    rng = np.random.default_rng(seed)
+    step = bar_store.TIMEFRAME_SECONDS[timeframe_str]
+    bars_per_day = 86400 // step
+
+    # Timestamps: doorlopende slots, weekend eruit, los daarvan gaten
+    t0 = bar_store.to_timestamp(start)
+    n_slots = int(n_bars * 7 / 5 * (1 + 2 * missing_prob)) + 2 * bars_per_day * 7
+    slots = t0 + np.arange(n_slots, dtype=np.int64) * step
+    weekday = ((slots // 86400) + 3) % 7          # 1970-01-01 was een donderdag
+    keep = (weekday < 5) & (rng.random(n_slots) >= missing_prob)
+    times = slots[keep][:n_bars]
+    n = len(times)
+
+    # Intraday volatiliteit profiel (UTC uur)
+    hour = (times % 86400) // 3600
+    session = np.where((hour >= 7) & (hour < 17), 1.4, np.where(hour < 7, 0.6, 0.9))
+    bar_vol = daily_vol / np.sqrt(bars_per_day) * session
+
+    returns = rng.standard_normal(n) * bar_vol
+    jumps = rng.random(n) < gap_prob
+    returns[jumps] += rng.choice([-1.0, 1.0], jumps.sum()) * rng.uniform(0.001, 0.003, jumps.sum())
+
+    # Weekend gap: de open van de eerste bar na een sprong in de tijd
+    gaps = np.r_[False, np.diff(times) > step * 2]
+    gap_returns = np.zeros(n)
+    gap_returns[gaps] = rng.standard_normal(gaps.sum()) * daily_vol * 0.5
+
+    close = start_price * np.exp(np.cumsum(returns + gap_returns))
+    open_ = np.r_[start_price, close[:-1]] * np.exp(gap_returns)
+    wick = np.abs(rng.standard_normal((2, n))) * bar_vol * close * 0.5
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+
+    rates = np.zeros(n, dtype=bar_store.RATES_DTYPE)
+    rates['time'] = times
+    rates['open'] = np.round(open_, 5)
+    rates['high'] = np.round(high, 5)
+    rates['low'] = np.round(low, 5)
+    rates['close'] = np.round(close, 5)
+    rates['tick_volume'] = (rng.gamma(2.0, 150.0, n) * session).astype(np.uint64) + 1
+    rates['spread'] = np.maximum(1, np.round(rng.gamma(4.0, 2.5, n) / session)).astype(np.int32)
+    return rates
+
+def rates_to_frame(rates):
+    """Zelfde DataFrame als data_handler.get_data (zonder MT5)."""
+    df = pd.DataFrame(rates)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    df.set_index('time', inplace=True)
+    return df
+
+# ----- METINGEN -----
+
+def _best_of(func, repeats):
+    """Beste tijd over repeats runs. Returns: (seconden, resultaat laatste run)"""
+    best = None
+    result = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def bench_size(n_bars, repeats=3, seed=42, params=None, with_backtrader=False):
+    """Alle stages voor één data grootte. Returns: dict met bars, timings (stage → seconden)"""
+    params = params or {'ema_fast': config.EMA_FAST_DEFAULT, 'ema_slow': config.EMA_SLOW_DEFAULT}
+    rates = synthetic_rates(n_bars, seed=seed)
+    timings = {}
+
+    # 1. Data load: memmap uit de bar store + DataFrame (cache vooraf gevuld)
+    root = tempfile.mkdtemp(prefix='yave_bench_')
+    try:
+        store = bar_store.BarStore(root, bar_store.ArraySource({(config.SYMBOL, 'M15'): rates}))
+        start, end = int(rates['time'][0]), int(rates['time'][-1])
+        store.get_rates(config.SYMBOL, 'M15', start, end)
+        timings['data_load'], df = _best_of(
+            lambda: rates_to_frame(store.get_rates(config.SYMBOL, 'M15', start, end, refresh=False)),
+            repeats
+        )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    # 2. Indicatoren (koude cache per run, anders meten we alleen cache hits)
+    def compute_indicators():
+        previous = indicator_cache.set_cache(indicator_cache.IndicatorCache(disk_dir=None))
+        try:
+            return indicators.calculate_all_indicators(df.copy(), params=params)
+        finally:
+            indicator_cache.set_cache(previous)
+    timings['indicators'], df_ind = _best_of(compute_indicators, repeats)
+
+    # 3. Signalen
+    timings['signals'], df_sig = _best_of(
+        lambda: strategy.generate_final_signals(df_ind.copy(), params), repeats
+    )
+
+    # 4. Bar loop (numpy kernel)
+    cap = config.INITIAL_CAPITAL
+    timings['bar_loop'], (equity_arr, trade_log, equity, _) = _best_of(
+        lambda: backtest_engine._run_numpy_kernel(df_sig, cap), repeats
+    )
+
+    # 4b. Bar loop (sparse, event-gedreven)
+    timings['bar_loop_sparse'], _ = _best_of(
+        lambda: backtest_engine._run_sparse_kernel(df_sig, cap), repeats
+    )
+
+    # 5. Metrics (scalars uit arrays)
+    timings['metrics'], _ = _best_of(
+        lambda: backtest_engine._build_scalar_results(
+            params, cap, equity, equity_arr, metrics.trade_arrays(trade_log)
+        ),
+        repeats
+    )
+
+    # 6. End-to-end run_backtest (scalars_only, warme indicator cache)
+    timings['run_backtest'], result = _best_of(
+        lambda: backtest_engine.run_backtest(df, params, scalars_only=True), repeats
+    )
+
+    # 7. Backtrader strategie (optioneel, alleen kleinere sizes)
+    if with_backtrader and n_bars <= BACKTRADER_MAX_BARS:
+        seconds = bench_backtrader(rates)
+        if seconds is not None:
+            timings['backtrader'] = seconds
+
+    return {'bars': len(rates), 'timings': timings, 'total_trades': result['total_trades']}
+
+def bench_backtrader(rates):
+    """Eén cerebro run van InverseOptimizedV42Strategy (None als niet beschikbaar)."""
+    try:
+        import backtrader as bt
+        from rates_feed import NumpyRatesData
+        from inverse_optimized_v42 import InverseOptimizedV42Strategy
+    except ImportError:
+        return None
+
+    cerebro = bt.Cerebro()
+    cerebro.addstrategy(InverseOptimizedV42Strategy, sink=event_log.NullSink())
+    cerebro.adddata(NumpyRatesData(dataname=rates, timeframe=bt.TimeFrame.Minutes, compression=15))
+    cerebro.broker.setcash(10000.0)
+    cerebro.broker.setcommission(commission=0.0001)
+    cerebro.addsizer(bt.sizers.FixedSize, stake=10000)
+    t0 = time.perf_counter()
+    cerebro.run()
+    return time.perf_counter() - t0
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeats=3, seed=42, with_backtrader=False):
+    """Returns: dict met meta (commit, versies) en resultaten per size."""
+    results = []
+    with event_log.use_sink(event_log.NullSink()):
+        for n_bars in sizes:
+            # 1M bars: één run per stage is genoeg (en scheelt minuten)
+            reps = 1 if n_bars >= 1_000_000 else repeats
+            results.append(bench_size(n_bars, reps, seed, with_backtrader=with_backtrader))
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeats': repeats,
+        },
+        'results': results,
+    }
+
+# =============================================================================
+# MAIN
+# =============================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="YAVE performance benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--backtrader', action='store_true', help="ook de backtrader strategie meten")
+    parser.add_argument('--output', help="JSON bestand (default: stdout)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.repeats, args.seed, args.backtrader)
+
+    for row in report['results']:
+        stages = ' | '.join(f"{k} {v*1000:.1f}ms" for k, v in row['timings'].items())
+        print(f"⏱  {row['bars']:>9,} bars: {stages}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"💾 Benchmark opgeslagen: {args.output}", file=sys.stderr)
+    else:
+        print(text)
@@ -30,6 +30,30 @@ SPREAD_POINTS_AVG = 10              # 10 points = 1 pip gemiddeld voor EURUSD 
 SLIPPAGE_POINTS_AVG = 5             # 5 points = 0.5 pip slippage ✅
 COMMISSION_PER_LOT = 7.0            # USD per lot
 
+# ----- PORTFOLIO (MULTI-SYMBOL) -----
+SYMBOLS = ["EURUSD", "GBPUSD", "USDJPY", "AUDUSD", "USDCHF", "USDCAD", "NZDUSD"]
+# Per symbool: point grootte, USD per point per 0.1 lot, contract grootte (units per lot)
+# en kosten. Niet-USD quotes zijn benaderingen (wisselkoers afhankelijk).
+SYMBOL_SPECS = {
+    "EURUSD": {"point": 0.00001, "point_value": 0.10, "contract_size": 100000,
+               "spread_points": 10, "slippage_points": 5, "commission_per_lot": 7.0},
+    "GBPUSD": {"point": 0.00001, "point_value": 0.10, "contract_size": 100000,
+               "spread_points": 12, "slippage_points": 5, "commission_per_lot": 7.0},
+    "USDJPY": {"point": 0.001, "point_value": 0.067, "contract_size": 100000,
+               "spread_points": 12, "slippage_points": 5, "commission_per_lot": 7.0},
+    "AUDUSD": {"point": 0.00001, "point_value": 0.10, "contract_size": 100000,
+               "spread_points": 12, "slippage_points": 5, "commission_per_lot": 7.0},
+    "USDCHF": {"point": 0.00001, "point_value": 0.11, "contract_size": 100000,
+               "spread_points": 14, "slippage_points": 5, "commission_per_lot": 7.0},
+    "USDCAD": {"point": 0.00001, "point_value": 0.073, "contract_size": 100000,
+               "spread_points": 14, "slippage_points": 5, "commission_per_lot": 7.0},
+    "NZDUSD": {"point": 0.00001, "point_value": 0.10, "contract_size": 100000,
+               "spread_points": 16, "slippage_points": 5, "commission_per_lot": 7.0},
+}
+
+# ----- BACKTEST ENGINE -----
+BACKTEST_ENGINE = "numpy"           # "numpy" (array kernel), "sparse" (event-gedreven), "iterrows" (originele referentie loop) of "intrabar" (M1 exits)
+
 # ----- EMA PARAMETERS -----
 EMA_FAST_DEFAULT = 5                # EMA 5 voor snelle crossover
 EMA_SLOW_DEFAULT = 20               # EMA 20 voor langzame crossover
@@ -50,6 +74,30 @@ OPTIMIZE_RANGES = {
     'use_fvg_filter': [False]       # FVG uitlaten
 }
 
+# ----- ADAPTIVE OPTIMIZER (successive halving, V4.2 exit params) -----
+V42_SEARCH_SPACE = {
+    'lookback': [30, 40, 50, 60, 70],
+    'stop_loss_pips': [30, 35, 40, 45, 50],
+    'take_profit_pips': [70, 80, 90, 100, 110],
+    'max_candles': [20, 25, 28, 32, 36],
+    'trail_activation_pips': [35, 40, 45, 50],
+    'trail_distance_pips': [18, 20, 22, 25],
+}
+ADAPTIVE_BUDGET = 40                # Budget in volledige-historie runs (equivalent)
+ADAPTIVE_ETA = 3                    # Per ronde blijft 1/eta over, data x eta
+ADAPTIVE_MIN_FRACTION = 1 / 27      # Kleinste data slice (fractie van de historie)
+ADAPTIVE_MIN_BARS = 2000            # Slice nooit kleiner dan dit
+ADAPTIVE_METRIC = 'net_pnl'         # Kolom uit inverse_batch.RESULT_COLUMNS (hoger = beter, incl. open_pnl)
+ADAPTIVE_SEED = 42
+ADAPTIVE_STATE_FILE = "adaptive_optimizer_state.json"  # In RESULTS_DIR (hervatten)
+
+# ----- MONTE CARLO -----
+MC_SIMULATIONS = 100_000            # Aantal reshuffles/bootstrap paden
+MC_METHOD = "shuffle"               # "shuffle" (volgorde) of "bootstrap" (trekken met teruglegging)
+MC_RUIN_LEVEL = 0.5                 # Ruin = equity ooit onder (1 - 0.5) x startkapitaal
+MC_CHUNK_MB = 64                    # Geheugen per chunk (paden x trades matrix)
+MC_SEED = 42
+
 # ----- WALK-FORWARD -----
 WF_TRAIN_MONTHS = 3
 WF_TEST_MONTHS = 1
@@ -60,8 +108,36 @@ WF_MIN_TEST_CANDLES = 100
 FORWARD_TEST_MODE = False           # ❌ UIT (eerst backtesten)
 FORWARD_LOG_FILE = "yave_forward_test_log.json"
 FORWARD_COMPARE_REPORT = "yave_backtest_vs_forward.md"
+FORWARD_STATS_FILE = "yave_forward_stats.json"  # OnlineStats snapshot (herstart zonder replay)
+ONLINE_SHARPE_WINDOW = 960          # Bars voor de rolling Sharpe (10 dagen M15)
+
+# ----- DATA CACHE -----
+USE_DATA_CACHE = True               # Bars uit lokale store, alleen nieuwe bars van MT5
+DATA_CACHE_DIR = "yave_data_cache"  # <dir>/<SYMBOL>/<TIMEFRAME>.bin
+CLEAN_BLOCK_SIZE = 500_000          # Bars per blok bij streaming validatie/cleaning
+RESAMPLE_FROM_M1 = False            # Alle timeframes afleiden van één M1 partitie (resample.py)
+FETCH_CHUNKED = True                # Downloads in parallelle maand chunks (async_fetcher.py)
+FETCH_MAX_CONCURRENT = 4            # Max gelijktijdige copy_rates_range calls
+FETCH_RETRIES = 3                   # Extra pogingen per mislukte chunk
+FETCH_RETRY_DELAY = 0.5             # Seconden voor de eerste retry (verdubbelt)
+
+# ----- INDICATOR CACHE -----
+INDICATOR_CACHE_MB = 256            # Geheugen budget (LRU)
+INDICATOR_CACHE_DIR = None          # Map voor disk tier (None = uit), bv. "yave_indicator_cache"
+
+# ----- LOGGING -----
+LOG_SINK = "console"                # "console", "null", "ring" of "jsonl" (sweeps/walk-forward: altijd null)
+LOG_LEVEL = "debug"                 # "debug", "info", "warning", "error"
+EVENT_LOG_FILE = "yave_events.jsonl"
+
+# ----- PROFILING -----
+PROFILING = False                   # Stage timers + counters (uit = vrijwel geen overhead)
+PROFILE_CPROFILE_DIR = None         # Map voor cProfile dumps per proces (None = geen cProfile)
 
 # ----- OUTPUT -----
 SAVE_RESULTS = True
 RESULTS_DIR = "yave_results"
+JOURNAL_FILE = "results_journal.jsonl"  # In RESULTS_DIR: grid search/walk-forward resultaten (hervatten)
+JOURNAL_RESUME = False              # True = optimizer/walkforward main hervatten via het journal
+JOURNAL_SALT = ""                   # Wijzigen = alle journal resultaten ongeldig (code wijzigingen gaan vanzelf)
 PLOT_DPI = 150
\ No newline at end of file
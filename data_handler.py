@@ -1,11 +1,14 @@
 ﻿# =============================================================================
 # DATA HANDLER — MT5 Integration + Validation
 # =============================================================================
+import os
 import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import config
+import bar_store
+import profiling
 
 def initialize_mt5():
     """Initialiseer MT5 verbinding met error handling."""
@@ -19,22 +22,53 @@ def initialize_mt5():
         print(f"❌ MT5 init error: {str(e)}")
         return False
 
-def get_data(symbol, timeframe_str, start, end):
+def get_data(symbol, timeframe_str, start, end, store=None):
     """
     Haalt data op van MT5 met validatie.
+    Met config.USE_DATA_CACHE komt de data uit de lokale bar store en worden
+    alleen nieuwe bars bij MT5 opgehaald.
+    Met config.RESAMPLE_FROM_M1 wordt elke timeframe afgeleid van de M1 cache.
     Returns: DataFrame of None bij fout
     """
     try:
-        # Map timeframe string naar MT5 constant
-        tf_map = {
-            "M15": mt5.TIMEFRAME_M15,
-            "H1": mt5.TIMEFRAME_H1,
-            "H4": mt5.TIMEFRAME_H4,
-            "D1": mt5.TIMEFRAME_D1
-        }
-        timeframe = tf_map.get(timeframe_str, mt5.TIMEFRAME_M15)
-        
-        rates = mt5.copy_rates_range(symbol, timeframe, start, end)
+        if config.USE_DATA_CACHE or store is not None:
+            if store is None:
+                if config.FETCH_CHUNKED:
+                    import async_fetcher
+                    source = async_fetcher.ChunkedSource(mt5)
+                else:
+                    source = bar_store.MT5Source(mt5)
+                store = bar_store.BarStore(source=source)
+                if config.RESAMPLE_FROM_M1:
+                    import resample
+                    store = resample.ResampledStore(store)
+            rates = store.get_rates(symbol, timeframe_str, start, end)
+            if len(rates) == 0:
+                print(f"❌ Geen data voor {symbol}")
+                return None
+
+            # Streaming validatie direct op de memmap (geen tussenkopieën in pandas)
+            rates, gaps = clean_rates(rates, timeframe_str, symbol)
+            n_large = int(np.count_nonzero(gaps['large']))
+            if n_large > 0:
+                print(f"⚠️  Gedetecteerd {n_large} grote gaps in data")
+
+            df = pd.DataFrame(rates)
+            df['time'] = pd.to_datetime(df['time'], unit='s')
+            df.set_index('time', inplace=True)
+            print(f"✅ Data geladen: {len(df)} candles, {symbol} {timeframe_str}")
+            return df
+        else:
+            # Map timeframe string naar MT5 constant
+            tf_map = {
+                "M15": mt5.TIMEFRAME_M15,
+                "H1": mt5.TIMEFRAME_H1,
+                "H4": mt5.TIMEFRAME_H4,
+                "D1": mt5.TIMEFRAME_D1
+            }
+            timeframe = tf_map.get(timeframe_str, mt5.TIMEFRAME_M15)
+            
+            rates = mt5.copy_rates_range(symbol, timeframe, start, end)
         
         if rates is None or len(rates) == 0:
             print(f"❌ Geen data voor {symbol}")
@@ -61,6 +95,9 @@ def validate_and_clean_data(df, timeframe_str):
     - Vul gaps met forward-fill (conservatief)
     - Verwijder weekend candles voor XAUUSD
     """
+    prof = profiling.get_profiler()
+    prof.count('bars_loaded', len(df))
+    
     # Verwijder weekend data voor goud (gesloten markt)
     if config.SYMBOL == "XAUUSD":
         df = df[(df.index.dayofweek < 5)]  # Maandag-vrijdag alleen
@@ -70,11 +107,12 @@ def validate_and_clean_data(df, timeframe_str):
     freq = expected_freq.get(timeframe_str, '15min')
     
     # Detecteer grote gaps (>3x verwachte interval)
-    time_diff = df.index.to_series().diff()
-    median_diff = time_diff.median()
-    gap_threshold = median_diff * 3
-    
-    gaps = time_diff[time_diff > gap_threshold]
+    with prof.stage('detect_gaps'):
+        time_diff = df.index.to_series().diff()
+        median_diff = time_diff.median()
+        gap_threshold = median_diff * 3
+        
+        gaps = time_diff[time_diff > gap_threshold]
     if len(gaps) > 0:
         print(f"⚠️  Gedetecteerd {len(gaps)} grote gaps in data")
         # Optioneel: log details
@@ -82,12 +120,174 @@ def validate_and_clean_data(df, timeframe_str):
         #     print(f"   Gap bij {gap_time}: {gap_size}")
     
     # Forward-fill voor kleine gaps (max 2 missende candles)
-    df = df.asfreq(freq)
-    df = df.ffill(limit=2)
-    df = df.dropna()
+    with prof.stage('asfreq'):
+        df = df.asfreq(freq)
+    with prof.stage('ffill_dropna'):
+        df = df.ffill(limit=2)
+        df = df.dropna()
     
     return df
 
+# ----- STREAMING CLEANING -----
+
+FFILL_LIMIT = 2         # Max aantal opgevulde candles per gap (zoals ffill(limit=2))
+LARGE_GAP_FACTOR = 3    # Gap > 3x interval telt als "groot"
+
+# Compacte gap index: één record per gat in de data
+GAP_DTYPE = np.dtype([
+    ('start', '<i8'),     # Laatste bar vóór het gat (epoch s)
+    ('end', '<i8'),       # Eerste bar na het gat (epoch s)
+    ('missing', '<i8'),   # Aantal ontbrekende candles
+    ('filled', '<i4'),    # Daarvan forward-filled (max FFILL_LIMIT)
+    ('large', '?'),       # Gat > LARGE_GAP_FACTOR x interval
+])
+
+class StreamingCleaner:
+    """
+    Zelfde cleaning als validate_and_clean_data (weekend filter voor XAUUSD,
+    asfreq op het raster vanaf de eerste bar, ffill max 2, rest weg), maar
+    blok voor blok op RATES_DTYPE arrays. Over blokgrenzen wordt alleen de
+    laatste geldige bar meegenomen; daarmee worden gaps op de grens exact
+    hetzelfde behandeld als binnen een blok.
+
+    Verschil met de pandas versie: "groot" is > 3x het nominale interval
+    in plaats van 3x de mediaan (die is pas aan het eind bekend).
+    """
+
+    def __init__(self, timeframe_str, symbol=None):
+        self.step = bar_store.TIMEFRAME_SECONDS.get(timeframe_str, 900)
+        self.drop_weekend = (symbol or config.SYMBOL) == "XAUUSD"
+        self.origin = None      # Eerste bar: anker van het raster
+        self.last = None        # Laatste geldige bar (1-element array)
+        self.bars_in = 0
+        self.bars_out = 0
+        self._gaps = []
+
+    def feed(self, block):
+        """Eén blok ruwe bars (oplopend in tijd). Returns: opgeschoonde bars."""
+        block = bar_store.as_rates(block)
+        self.bars_in += len(block)
+        step = self.step
+        times = block['time']
+
+        keep = ~(np.isnan(block['open']) | np.isnan(block['high'])
+                 | np.isnan(block['low']) | np.isnan(block['close']))
+        if self.drop_weekend:
+            keep &= ((times // 86400) + 3) % 7 < 5   # 1970-01-01 was een donderdag
+        if self.origin is None:
+            if not keep.any():
+                return np.empty(0, dtype=bar_store.RATES_DTYPE)
+            self.origin = int(times[np.argmax(keep)])
+        keep &= (times - self.origin) % step == 0    # asfreq: alleen bars op het raster
+        bars = block[keep]
+
+        # Dubbele/terugspringende timestamps negeren
+        last_time = np.iinfo(np.int64).min if self.last is None else self.last['time'][0]
+        t = bars['time']
+        prev_max = np.maximum.accumulate(np.r_[last_time, t])[:-1]
+        bars = bars[t > prev_max]
+        if len(bars) == 0:
+            return bars
+
+        if self.last is None:
+            head, ext = bars[:1], bars
+        else:
+            head, ext = bars[:0], np.concatenate([self.last, bars])
+        self.last = bars[-1:].copy()
+
+        # Per bar in ext[1:]: aantal ontbrekende candles ervoor
+        missing = np.diff(ext['time']) // step - 1
+        fills = np.minimum(missing, FFILL_LIMIT)
+        gap_at = np.flatnonzero(missing > 0)
+        if len(gap_at) > 0:
+            gaps = np.empty(len(gap_at), dtype=GAP_DTYPE)
+            gaps['start'] = ext['time'][gap_at]
+            gaps['end'] = ext['time'][gap_at + 1]
+            gaps['missing'] = missing[gap_at]
+            gaps['filled'] = fills[gap_at]
+            gaps['large'] = missing[gap_at] + 1 > LARGE_GAP_FACTOR
+            self._gaps.append(gaps)
+
+        body = ext[1:]
+        total = int(fills.sum())
+        if total == 0:
+            out = np.concatenate([head, body])
+        else:
+            # Opgevulde candles = kopie van de voorganger op de volgende raster tijden
+            ends = np.cumsum(fills)
+            filled = np.repeat(ext[:-1], fills)
+            filled['time'] += (np.arange(total) - np.repeat(ends - fills, fills) + 1) * step
+            merged = np.empty(len(body) + total, dtype=bar_store.RATES_DTYPE)
+            is_body = np.zeros(len(merged), dtype=bool)
+            is_body[np.arange(len(body)) + ends] = True
+            merged[is_body] = body
+            merged[~is_body] = filled
+            out = np.concatenate([head, merged])
+
+        self.bars_out += len(out)
+        return out
+
+    def gaps(self):
+        """Alle gaps tot nu toe als GAP_DTYPE array."""
+        if not self._gaps:
+            return np.empty(0, dtype=GAP_DTYPE)
+        if len(self._gaps) > 1:
+            self._gaps = [np.concatenate(self._gaps)]
+        return self._gaps[0]
+
+def iter_blocks(rates, block_size=None):
+    """Opeenvolgende slices (views) van block_size bars."""
+    block_size = block_size or config.CLEAN_BLOCK_SIZE
+    for i in range(0, len(rates), block_size):
+        yield rates[i:i + block_size]
+
+def clean_rates(rates, timeframe_str, symbol=None, block_size=None):
+    """
+    Streaming variant van validate_and_clean_data op een rates array/memmap.
+    Returns: (opgeschoonde RATES_DTYPE array, GAP_DTYPE gap index)
+    """
+    prof = profiling.get_profiler()
+    prof.count('bars_loaded', len(rates))
+    cleaner = StreamingCleaner(timeframe_str, symbol)
+    with prof.stage('clean_stream'):
+        parts = [cleaner.feed(block) for block in iter_blocks(rates, block_size)]
+        out = np.concatenate(parts) if parts else np.empty(0, dtype=bar_store.RATES_DTYPE)
+    return out, cleaner.gaps()
+
+def clean_key(timeframe_str):
+    """Partitie naam voor opgeschoonde bars in de bar store."""
+    return f"{timeframe_str}_clean"
+
+def clean_to_store(store, symbol, timeframe_str, block_size=None):
+    """
+    Schoon de ruwe partitie (symbol, timeframe_str) blok voor blok op en
+    schrijf het resultaat in de store onder clean_key(timeframe_str); de
+    gap index komt ernaast als .gaps.npy. Geheugen: O(block_size).
+    Returns: (aantal geschreven bars, GAP_DTYPE gap index)
+    """
+    prof = profiling.get_profiler()
+    key = clean_key(timeframe_str)
+    raw = store.load(symbol, timeframe_str)
+    prof.count('bars_loaded', len(raw))
+    cleaner = StreamingCleaner(timeframe_str, symbol)
+
+    n = 0
+    with prof.stage('clean_stream'):
+        store.replace(symbol, key, np.empty(0, dtype=bar_store.RATES_DTYPE))
+        for block in iter_blocks(raw, block_size):
+            n += store.append(symbol, key, cleaner.feed(block))
+
+    gaps = cleaner.gaps()
+    np.save(os.path.join(store.root, symbol, f"{key}.gaps.npy"), gaps)
+    return n, gaps
+
+def load_gaps(store, symbol, timeframe_str):
+    """Gap index van de laatste clean_to_store (leeg array als die er niet is)."""
+    path = os.path.join(store.root, symbol, f"{clean_key(timeframe_str)}.gaps.npy")
+    if not os.path.exists(path):
+        return np.empty(0, dtype=GAP_DTYPE)
+    return np.load(path)
+
 def shutdown_mt5():
     """Sluit MT5 verbinding netjes af."""
     try:
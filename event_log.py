@@ -0,0 +1,128 @@
+﻿# =============================================================================
+# EVENT LOG — Pluggable event sinks (null / console / ring buffer / JSONL)
+# =============================================================================
+# Strategie en signaal code loggen via een sink i.p.v. print. Callers checken
+# eerst sink.enabled_for(level), zodat uitgeschakelde logging geen string
+# formatting of I/O kost. Sweeps en walk-forward gebruiken de NullSink.
+# =============================================================================
+import atexit
+import json
+from collections import deque
+from contextlib import contextmanager
+import config
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+class NullSink:
+    """Gooit alles weg. enabled_for() is altijd False."""
+
+    def enabled_for(self, level):
+        return False
+
+    def emit(self, level, event, message, **fields):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class ConsoleSink(NullSink):
+    """Print de message (zelfde output als de oude print-statements)."""
+
+    def __init__(self, level='debug'):
+        self.threshold = LEVELS[level]
+
+    def enabled_for(self, level):
+        return LEVELS[level] >= self.threshold
+
+    def emit(self, level, event, message, **fields):
+        if LEVELS[level] >= self.threshold:
+            print(message)
+
+class RingBufferSink(ConsoleSink):
+    """Houdt de laatste maxlen events in geheugen."""
+
+    def __init__(self, maxlen=10000, level='debug'):
+        super().__init__(level)
+        self.buffer = deque(maxlen=maxlen)
+
+    def emit(self, level, event, message, **fields):
+        if LEVELS[level] >= self.threshold:
+            self.buffer.append((level, event, message, fields))
+
+    def records(self):
+        """Returns: lijst met dicts (level, event, message + extra velden)."""
+        return [dict(fields, level=level, event=event, message=message)
+                for level, event, message, fields in self.buffer]
+
+    def clear(self):
+        self.buffer.clear()
+
+class JsonlFileSink(ConsoleSink):
+    """Schrijft events als JSON lines, gebatcht per batch_size records."""
+
+    def __init__(self, path, batch_size=1000, level='info'):
+        super().__init__(level)
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = []
+        atexit.register(self.flush)
+
+    def emit(self, level, event, message, **fields):
+        if LEVELS[level] >= self.threshold:
+            self.pending.append(dict(fields, level=level, event=event, message=message))
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        lines = [json.dumps(r, default=str, ensure_ascii=False) for r in self.pending]
+        self.pending = []
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+
+def make_sink(kind, **kwargs):
+    """Sink op naam: 'null', 'console', 'ring' of 'jsonl'."""
+    if kind == 'null':
+        return NullSink()
+    if kind == 'console':
+        return ConsoleSink(kwargs.get('level', config.LOG_LEVEL))
+    if kind == 'ring':
+        return RingBufferSink(kwargs.get('maxlen', 10000), kwargs.get('level', config.LOG_LEVEL))
+    if kind == 'jsonl':
+        return JsonlFileSink(kwargs.get('path', config.EVENT_LOG_FILE),
+                             kwargs.get('batch_size', 1000), kwargs.get('level', config.LOG_LEVEL))
+    raise ValueError(f"Onbekende sink: {kind}")
+
+_sink = None
+
+def get_sink():
+    """Huidige proces-brede sink (default uit config.LOG_SINK)."""
+    global _sink
+    if _sink is None:
+        _sink = make_sink(config.LOG_SINK)
+    return _sink
+
+def set_sink(sink):
+    """Vervang de proces-brede sink. Returns: de vorige sink."""
+    global _sink
+    previous = _sink
+    _sink = sink
+    return previous
+
+@contextmanager
+def use_sink(sink):
+    """Tijdelijk een andere sink (bv. NullSink tijdens een sweep)."""
+    previous = set_sink(sink)
+    try:
+        yield sink
+    finally:
+        sink.flush()
+        set_sink(previous)
@@ -0,0 +1,133 @@
+﻿# =============================================================================
+# INDICATOR CACHE — Memoization van indicator series (LRU + byte budget)
+# =============================================================================
+# Key: (fingerprint van de input bars, indicator naam, params).
+# Geheugen tier: LRU met byte budget. Optionele disk tier (.npy per key)
+# zodat meerdere processen (sweep workers) berekeningen delen.
+# =============================================================================
+import hashlib
+import os
+from collections import OrderedDict
+import numpy as np
+import config
+
+def fingerprint(*arrays):
+    """Korte hash over de ruwe bytes van één of meer arrays/Series/Index."""
+    h = hashlib.blake2b(digest_size=16)
+    for arr in arrays:
+        values = np.ascontiguousarray(getattr(arr, 'values', arr))
+        if values.dtype.kind == 'M':
+            values = values.view(np.int64)
+        h.update(str(values.dtype).encode())
+        h.update(str(values.shape).encode())
+        h.update(values.tobytes())
+    return h.hexdigest()
+
+def make_key(data_fp, name, params):
+    """Cache key; params als dict of tuple."""
+    if isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    return (data_fp, name, tuple(params))
+
+class IndicatorCache:
+    """
+    max_bytes: budget voor de geheugen tier (oudste entries eerst eruit)
+    disk_dir: map voor de disk tier (None = uit)
+    """
+
+    def __init__(self, max_bytes=None, disk_dir=None):
+        self.max_bytes = max_bytes if max_bytes is not None else config.INDICATOR_CACHE_MB * 1024 * 1024
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.disk_dir, key[1], f"{digest}.npy")
+
+    def get(self, key):
+        """Returns: opgeslagen array (read-only) of None."""
+        arr = self.entries.get(key)
+        if arr is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return arr
+
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    arr = np.load(path, allow_pickle=False)
+                except (OSError, ValueError):
+                    arr = None
+                if arr is not None:
+                    self.disk_hits += 1
+                    return self._store(key, arr)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, arr):
+        arr = self._store(key, arr)
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                np.save(f, arr, allow_pickle=False)
+            os.replace(tmp, path)
+        return arr
+
+    def _store(self, key, arr):
+        arr = np.array(arr, copy=True)
+        arr.flags.writeable = False
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key).nbytes
+        if arr.nbytes > self.max_bytes:
+            return arr  # Past nooit in het budget: niet in geheugen houden
+
+        self.entries[key] = arr
+        self.nbytes += arr.nbytes
+        while self.nbytes > self.max_bytes:
+            _, old = self.entries.popitem(last=False)
+            self.nbytes -= old.nbytes
+        return arr
+
+    def get_or_compute(self, key, compute):
+        """Cached waarde of compute() (resultaat wordt opgeslagen)."""
+        arr = self.get(key)
+        if arr is None:
+            arr = self.put(key, compute())
+        return arr
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'nbytes': self.nbytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+        }
+
+_cache = None
+
+def get_cache():
+    """Proces-brede cache (config.INDICATOR_CACHE_MB / INDICATOR_CACHE_DIR)."""
+    global _cache
+    if _cache is None:
+        _cache = IndicatorCache(disk_dir=config.INDICATOR_CACHE_DIR)
+    return _cache
+
+def set_cache(cache):
+    """Vervang de proces-brede cache. Returns: de vorige cache."""
+    global _cache
+    previous = _cache
+    _cache = cache
+    return previous
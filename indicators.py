@@ -0,0 +1,66 @@
+﻿# =============================================================================
+# INDICATORS — Indicator berekeningen via de indicator cache
+# =============================================================================
+# Elke indicator wordt gememoized op (fingerprint input, naam, params).
+# Een grid met 3 fast x 3 slow EMA's rekent zo maar 6 EMA's uit.
+# De fingerprint (hash over alle bars) wordt één keer per frame berekend en
+# doorgegeven; de ema_fast/ema_slow kolommen worden in df.attrs gemarkeerd
+# zodat generate_final_signals ze niet opnieuw opzoekt.
+# =============================================================================
+import pandas as pd
+import numpy as np
+import config
+import indicator_cache
+import profiling
+
+EMA_ATTR = 'ema_columns'    # df.attrs sleutel: (fast, slow, bars, eerste index)
+
+def series_fingerprint(series):
+    """Fingerprint van index + waarden van een Series (cache key input)."""
+    with profiling.get_profiler().stage('ema_fingerprint'):
+        return indicator_cache.fingerprint(series.index, series)
+
+def ema(series, span, data_fp=None):
+    """
+    EMA (adjust=False, zoals de strategie altijd deed) als Series.
+    data_fp: series_fingerprint(series) als de caller die al heeft
+    (meerdere EMA's op dezelfde close = één keer hashen)
+    """
+    cache = indicator_cache.get_cache()
+    prof = profiling.get_profiler()
+    if data_fp is None:
+        data_fp = series_fingerprint(series)
+    key = indicator_cache.make_key(data_fp, 'ema', {'span': span})
+    values = cache.get_or_compute(key, lambda: _ema_values(series, span, prof))
+    return pd.Series(values.copy(), index=series.index, name=series.name)
+
+def _ema_values(series, span, prof):
+    with prof.stage('ema_ewm'):
+        return series.ewm(span=span, adjust=False).mean().to_numpy(dtype=np.float64)
+
+def ema_columns_tag(df, ema_fast, ema_slow):
+    """Markering voor ema_fast/ema_slow kolommen met deze spans op deze bars."""
+    return (ema_fast, ema_slow, len(df), df.index[0] if len(df) else None)
+
+def has_ema_columns(df, ema_fast, ema_slow):
+    """True als df al ema_fast/ema_slow kolommen met deze spans heeft."""
+    return df.attrs.get(EMA_ATTR) == ema_columns_tag(df, ema_fast, ema_slow)
+
+def calculate_all_indicators(df, params=None):
+    """
+    Voeg alle indicator kolommen toe die de strategie nodig heeft.
+    params: ema_fast / ema_slow / use_trend_filter (defaults uit config)
+    """
+    params = params or {}
+    ema_fast = params.get('ema_fast', config.EMA_FAST_DEFAULT)
+    ema_slow = params.get('ema_slow', config.EMA_SLOW_DEFAULT)
+
+    close_fp = series_fingerprint(df['close'])
+    df['ema_fast'] = ema(df['close'], ema_fast, close_fp)
+    df['ema_slow'] = ema(df['close'], ema_slow, close_fp)
+    df.attrs[EMA_ATTR] = ema_columns_tag(df, ema_fast, ema_slow)
+
+    if params.get('use_trend_filter', config.USE_TREND_FILTER):
+        df['ema_trend'] = ema(df['close'], config.EMA_TREND_DEFAULT, close_fp)
+
+    return df
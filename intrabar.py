@@ -0,0 +1,195 @@
+﻿# =============================================================================
+# INTRABAR — SL/TP/trailing fills op M1 bars of ticks binnen een positie
+# =============================================================================
+# De bar engines zien per M15 bar alleen high/low/close: als SL en TP in
+# dezelfde bar geraakt worden wint altijd de SL. Deze engine gebruikt de M15
+# signalen voor entries, maar speelt voor bars MET open positie de fijnere
+# data (M1 bars uit de BarStore of MT5 ticks) in tijdsvolgorde af. Bars
+# zonder positie worden nooit uitgeklapt, dus de extra data blijft klein.
+# =============================================================================
+import numpy as np
+import pandas as pd
+import config
+import bar_store
+import records
+import strategy
+
+POINT = 0.00001
+
+# ----- BRONNEN -----
+
+class BarIntrabarSource:
+    """Fijnere bars (bv. M1) als RATES_DTYPE array of memmap."""
+
+    def __init__(self, rates):
+        self.rates = bar_store.as_rates(rates)
+        self.times = self.rates['time']
+
+    @classmethod
+    def from_store(cls, store, symbol, timeframe_str, start, end=None):
+        """Lees de sub-bars uit de lokale cache (memmap, geen kopie)."""
+        return cls(store.get_rates(symbol, timeframe_str, start, end))
+
+    def window(self, t0, t1, position):
+        """Returns: (open, high, low, close) lijsten voor t0 <= time < t1."""
+        lo = np.searchsorted(self.times, t0, 'left')
+        hi = np.searchsorted(self.times, t1, 'left')
+        r = self.rates[lo:hi]
+        return r['open'].tolist(), r['high'].tolist(), r['low'].tolist(), r['close'].tolist()
+
+class TickIntrabarSource:
+    """
+    MT5 ticks (copy_ticks_range formaat: time, bid, ask, ... time_msc).
+    Longs sluiten op de bid, shorts op de ask.
+    """
+
+    def __init__(self, ticks):
+        self.ticks = np.asarray(ticks)
+        names = self.ticks.dtype.names
+        if 'time_msc' in names:
+            self.times = self.ticks['time_msc'].astype(np.int64)
+            self.scale = 1000
+        else:
+            self.times = self.ticks['time'].astype(np.int64)
+            self.scale = 1
+
+    def window(self, t0, t1, position):
+        lo = np.searchsorted(self.times, t0 * self.scale, 'left')
+        hi = np.searchsorted(self.times, t1 * self.scale, 'left')
+        price = self.ticks['bid' if position == 1 else 'ask'][lo:hi].tolist()
+        return price, price, price, price
+
+def default_source(df, symbol=None, timeframe_str='M1', store=None):
+    """M1 bars uit de BarStore voor de periode van df."""
+    store = store or bar_store.BarStore()
+    start = bar_times(df.index[:1])[0]
+    end = bar_times(df.index[-1:])[0] + bar_store.TIMEFRAME_SECONDS[config.TIMEFRAME_MT5]
+    return BarIntrabarSource.from_store(store, symbol or config.SYMBOL, timeframe_str, start, end)
+
+def bar_times(index):
+    """DatetimeIndex (naive = UTC) → epoch seconds (int64 array)."""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return ((index - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+# ----- ENGINE -----
+
+def run_intrabar_loop(df, cap, source, timeframe_str=None):
+    """
+    Zelfde entries, lot sizing en kosten als _bar_loop_kernel; exits per
+    sub-bar: eerst stop/TP tegen het huidige niveau (gap → fill op de open),
+    daarna trailing bijwerken met de sub-bar close.
+    Bars zonder sub-data vallen terug op de M15 bar zelf.
+
+    Returns: (equity, trades, equity_df, stats)
+    """
+    import backtest_engine
+
+    bar_seconds = bar_store.TIMEFRAME_SECONDS[timeframe_str or config.TIMEFRAME_MT5]
+    starts = bar_times(df.index).tolist()
+    opens = df['open'].to_numpy(dtype=np.float64).tolist()
+    highs = df['high'].to_numpy(dtype=np.float64).tolist()
+    lows = df['low'].to_numpy(dtype=np.float64).tolist()
+    closes = df['close'].to_numpy(dtype=np.float64).tolist()
+    signals = df['signal'].to_numpy().tolist()
+    n = len(closes)
+
+    sl_dist = config.STOP_LOSS_POINTS * POINT
+    tp_dist = config.TAKE_PROFIT_POINTS * POINT
+    trail_on = config.TRAILING_STOP_ACTIVATION > 0
+    trail_activation = config.TRAILING_STOP_ACTIVATION
+    trail_dist = config.TRAILING_STOP_POINTS * POINT
+
+    equity = cap
+    position = 0
+    entry_price = 0.0
+    entry_i = 0
+    lot_size = config.LOT_SIZE_BASE
+    sl_price = tp_price = stop = 0.0
+    equity_arr = np.empty(n, dtype=np.float64)
+    trade_log = records.TradeLog()
+    stats = {'expanded_bars': 0, 'sub_bars': 0, 'fallback_bars': 0}
+
+    for i in range(n):
+        # 1. Exits: sub-bars van deze bar in tijdsvolgorde
+        if position != 0:
+            sub = source.window(starts[i], starts[i] + bar_seconds, position)
+            if sub[0]:
+                stats['expanded_bars'] += 1
+                stats['sub_bars'] += len(sub[0])
+            else:
+                stats['fallback_bars'] += 1
+                sub = ([opens[i]], [highs[i]], [lows[i]], [closes[i]])
+
+            for o, h, l, c in zip(*sub):
+                exit_price = None
+                if position == 1:
+                    if l <= stop:
+                        exit_price = min(o, stop)
+                        reason = 'SL' if stop == sl_price else 'TRAIL'
+                    elif h >= tp_price:
+                        exit_price = max(o, tp_price)
+                        reason = 'TP'
+                    elif trail_on and (c - entry_price) / POINT >= trail_activation:
+                        stop = max(stop, sl_price, c - trail_dist)
+                else:
+                    if h >= stop:
+                        exit_price = max(o, stop)
+                        reason = 'SL' if stop == sl_price else 'TRAIL'
+                    elif l <= tp_price:
+                        exit_price = min(o, tp_price)
+                        reason = 'TP'
+                    elif trail_on and (entry_price - c) / POINT >= trail_activation:
+                        stop = min(stop, sl_price, c + trail_dist)
+
+                if exit_price is not None:
+                    pnl = position * (exit_price - entry_price) * lot_size * 100
+                    equity += pnl
+                    trade_log.append(entry_i, i, position, entry_price, exit_price, lot_size, pnl, reason)
+                    position = 0
+                    break
+
+        # 2. Entry op de M15 close (zoals de bar engines)
+        sig = signals[i]
+        if sig != 0 and position == 0:
+            if equity <= 0:
+                equity = cap
+
+            lot_size = strategy.calculate_dynamic_lot_size(
+                equity, config.RISK_PER_TRADE_PCT,
+                config.STOP_LOSS_POINTS, config.SYMBOL
+            )
+            equity -= backtest_engine.calculate_trade_costs(
+                lot_size,
+                config.SPREAD_POINTS_AVG,
+                config.SLIPPAGE_POINTS_AVG,
+                config.COMMISSION_PER_LOT
+            )
+
+            position = sig
+            entry_price = closes[i]
+            entry_i = i
+            sl_price = entry_price - position * sl_dist
+            tp_price = entry_price + position * tp_dist
+            stop = sl_price
+
+        # 3. Equity
+        equity_arr[i] = equity
+
+    # Sluit open positie aan einde (market close)
+    if position != 0 and n > 0:
+        exit_price = closes[-1]
+        pnl = position * (exit_price - entry_price) * lot_size * 100
+        equity += pnl
+        trade_log.append(entry_i, n - 1, position, entry_price, exit_price, lot_size, pnl, 'END_OF_TEST')
+
+    trades = trade_log.to_dicts(df.index)
+
+    if n > 0:
+        equity_df = pd.DataFrame({'equity': equity_arr}, index=df.index.copy())
+        equity_df.index.name = 'time'
+    else:
+        equity_df = pd.DataFrame()
+
+    return equity, trades, equity_df, stats
@@ -0,0 +1,229 @@
+﻿# =============================================================================
+# INVERSE BATCH — Veel exit-configuraties in één pass over de bars
+# =============================================================================
+# Zelfde regels als InverseOptimizedV42Strategy (backtrader), maar N param
+# sets lopen lock-step over de bars met NumPy state arrays (één element per
+# param set). Support/resistance wordt één keer per lookback berekend.
+#
+# Fills zoals backtrader met market orders: beslissing op bar t (close),
+# uitvoering op de open van bar t+1. Stake, cash en commissie als in de V4.2
+# main. Net als de BackBroker wordt een LONG entry geweigerd (margin) als de
+# cash de aankoop niet dekt; de strategie denkt dan wel in positie te zijn.
+# Een positie die op de laatste bar nog bij de broker open staat (ook een exit
+# die pas na de laatste bar uitgevoerd zou worden) telt mee tegen de laatste
+# close, zoals broker.getvalue(): open_pnl, onderdeel van net_pnl.
+# =============================================================================
+import itertools
+import numpy as np
+import pandas as pd
+import signals
+
+PIP = 0.0001
+STAKE = 10000           # bt.sizers.FixedSize(stake=10000)
+COMMISSION = 0.0001     # cerebro.broker.setcommission(commission=0.0001)
+STARTING_CASH = 10000.0 # cerebro.broker.setcash(10000.0)
+
+# Zelfde defaults als InverseOptimizedV42Strategy.params
+DEFAULT_PARAMS = {
+    'lookback': 50,
+    'stop_loss_pips': 40,
+    'take_profit_pips': 90,
+    'max_candles': 28,
+    'trail_activation_pips': 45,
+    'trail_distance_pips': 22,
+}
+
+RESULT_COLUMNS = [
+    'signals', 'trades', 'wins', 'losses', 'win_rate', 'total_pnl',
+    'commission', 'open_pnl', 'net_pnl', 'sl_exits', 'tp_exits', 'time_exits', 'rejected', 'open_at_end'
+]
+
+def expand_param_grid(ranges):
+    """Alle combinaties; ontbrekende keys krijgen DEFAULT_PARAMS."""
+    keys = list(ranges.keys())
+    grid = []
+    for values in itertools.product(*(ranges[k] for k in keys)):
+        params = dict(DEFAULT_PARAMS)
+        params.update(zip(keys, values))
+        grid.append(params)
+    return grid
+
+breakout_levels = signals.breakout_levels
+
+def run_batch(open_, high, low, close, param_sets, signal_for=None):
+    """
+    Evalueer alle param_sets (lijst met dicts) in één pass per lookback.
+    signal_for: optioneel lookback → int8 signaal array (bv. uit een
+    signals.SignalStore); default wordt de breakout regel hier berekend.
+    Returns: DataFrame met params + RESULT_COLUMNS, in dezelfde volgorde
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    rows = [None] * len(param_sets)
+    by_lookback = {}
+    for i, params in enumerate(param_sets):
+        params = dict(DEFAULT_PARAMS, **params)
+        by_lookback.setdefault(params['lookback'], []).append((i, params))
+
+    for lookback, members in by_lookback.items():
+        if signal_for is not None:
+            signal = signal_for(lookback)
+        else:
+            resistance, support = breakout_levels(high, low, lookback)
+            signal = signals.breakout_values(close, resistance, support)
+        stats = _run_lockstep(open_, close, signal, lookback, [p for _, p in members])
+        for k, (i, params) in enumerate(members):
+            row = dict(params)
+            for col in RESULT_COLUMNS:
+                row[col] = stats[col][k]
+            rows[i] = row
+
+    return pd.DataFrame(rows)
+
+def run_batch_frame(df, param_sets):
+    """run_batch op een DataFrame / rates array met open/high/low/close."""
+    return run_batch(df['open'], df['high'], df['low'], df['close'], param_sets)
+
+def _run_lockstep(open_, close, entry_signal, start, param_sets):
+    """Kern: N posities tegelijk, één Python iteratie per bar."""
+    n_bars = len(close)
+    n = len(param_sets)
+
+    sl_dist = np.array([p['stop_loss_pips'] * PIP for p in param_sets])
+    tp_dist = np.array([p['take_profit_pips'] * PIP for p in param_sets])
+    max_candles = np.array([p['max_candles'] for p in param_sets])
+    trail_act = np.array([p['trail_activation_pips'] for p in param_sets], dtype=np.float64)
+    trail_dist = np.array([p['trail_distance_pips'] * PIP for p in param_sets])
+
+    # Positie state (side: 0 flat, 1 long, -1 short)
+    side = np.zeros(n, dtype=np.int64)
+    entry = np.zeros(n)
+    entry_fill = np.full(n, np.nan)
+    sl = np.zeros(n)
+    tp = np.zeros(n)
+    best = np.zeros(n)
+    counter = np.zeros(n, dtype=np.int64)
+    cash = np.full(n, STARTING_CASH)   # Cash zonder open positie
+
+    # Resultaten
+    signals = np.zeros(n, dtype=np.int64)
+    wins = np.zeros(n, dtype=np.int64)
+    losses = np.zeros(n, dtype=np.int64)
+    total_pnl = np.zeros(n)
+    commission = np.zeros(n)
+    rejected = np.zeros(n, dtype=np.int64)
+    exits = {'sl_exits': np.zeros(n, dtype=np.int64),
+             'tp_exits': np.zeros(n, dtype=np.int64),
+             'time_exits': np.zeros(n, dtype=np.int64)}
+
+    entry_signal = entry_signal.tolist()
+    opens = open_.tolist()
+    closes = close.tolist()
+
+    for t in range(start, n_bars):
+        c = closes[t]
+        next_open = opens[t + 1] if t + 1 < n_bars else None
+        in_pos = side != 0
+
+        if in_pos.any():
+            counter += in_pos
+            is_long = side == 1
+            is_short = side == -1
+
+            # Trailing stop (zelfde volgorde als update_trailing_stop)
+            long_unreal = (c - entry) / PIP
+            short_unreal = (entry - c) / PIP
+            upd = is_long & (long_unreal >= trail_act) & (c > best)
+            if upd.any():
+                best[upd] = c
+                new_sl = best - trail_dist
+                raise_sl = upd & (new_sl > sl)
+                sl[raise_sl] = new_sl[raise_sl]
+            upd = is_short & (short_unreal >= trail_act) & ((c < best) | (best == 0))
+            if upd.any():
+                best[upd] = c
+                new_sl = best + trail_dist
+                lower_sl = upd & (new_sl < sl)
+                sl[lower_sl] = new_sl[lower_sl]
+
+            hit_sl = (is_long & (c <= sl)) | (is_short & (c >= sl))
+            hit_tp = ~hit_sl & ((is_long & (c >= tp)) | (is_short & (c <= tp)))
+            hit_time = in_pos & ~hit_sl & ~hit_tp & (counter >= max_candles)
+            exiting = hit_sl | hit_tp | hit_time
+
+            if exiting.any():
+                exits['sl_exits'] += hit_sl
+                exits['tp_exits'] += hit_tp
+                exits['time_exits'] += hit_time
+                if next_open is not None:
+                    filled = exiting & ~np.isnan(entry_fill)
+                    pnl = side[filled] * STAKE * (next_open - entry_fill[filled])
+                    comm = STAKE * next_open * COMMISSION
+                    total_pnl[filled] += pnl
+                    wins[filled] += pnl > 0
+                    losses[filled] += pnl <= 0
+                    commission[filled] += comm
+                    cash[filled] += pnl - comm
+                if next_open is not None:
+                    side[exiting] = 0
+                    entry_fill[exiting] = np.nan
+                    counter[exiting] = 0
+                # Laatste bar: exit order wordt niet meer uitgevoerd, positie blijft open
+
+        # Entries alleen voor wie aan het begin van de bar flat was
+        new_side = entry_signal[t]
+        if new_side == 0:
+            continue
+        flat = ~in_pos
+        if not flat.any():
+            continue
+
+        side[flat] = new_side
+        entry[flat] = c
+        sl[flat] = c - new_side * sl_dist[flat]
+        tp[flat] = c + new_side * tp_dist[flat]
+        best[flat] = 0
+        counter[flat] = 0
+        signals[flat] += 1
+        if next_open is None:
+            continue
+
+        fills = flat
+        if new_side == 1:
+            # Cash check bij submit (creatie prijs) en bij uitvoering (open)
+            fills = flat & (cash - STAKE * c - STAKE * c * COMMISSION >= 0) & \
+                (cash - STAKE * next_open - STAKE * next_open * COMMISSION >= 0)
+            rejected += flat & ~fills
+        comm = STAKE * next_open * COMMISSION
+        entry_fill[fills] = next_open
+        commission[fills] += comm
+        cash[fills] -= comm
+
+    # Open posities tegen de laatste close (zoals broker.getvalue())
+    held = (side != 0) & ~np.isnan(entry_fill)
+    open_pnl = np.zeros(n)
+    if n_bars > 0:
+        open_pnl[held] = side[held] * STAKE * (closes[-1] - entry_fill[held])
+
+    trades = wins + losses
+    with np.errstate(invalid='ignore', divide='ignore'):
+        win_rate = np.where(trades > 0, wins / np.maximum(trades, 1), 0.0)
+
+    stats = {
+        'signals': signals,
+        'trades': trades,
+        'wins': wins,
+        'losses': losses,
+        'win_rate': win_rate,
+        'total_pnl': total_pnl,
+        'commission': commission,
+        'open_pnl': open_pnl,
+        'net_pnl': total_pnl + open_pnl - commission,
+        'rejected': rejected,
+        'open_at_end': side != 0,
+    }
+    stats.update(exits)
+    return stats
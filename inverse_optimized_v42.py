@@ -11,7 +11,45 @@
 import backtrader as bt
 from datetime import datetime
 import MetaTrader5 as mt5
-import pandas as pd
+import array
+import numpy as np
+import bar_store
+import event_log
+import records
+import rolling
+from rates_feed import NumpyRatesData
+
+class _RollingExtremumIndicator(bt.Indicator):
+    """Rolling max/min met monotone deque (O(1) per bar, ook met runonce=False)."""
+    params = (('period', 50),)
+    _mode = 'max'
+    
+    def __init__(self):
+        self.addminperiod(self.params.period)
+        self._extremum = rolling.RollingExtremum(self.params.period, self._mode)
+    
+    def prenext(self):
+        self._extremum.update(self.data[0])
+    
+    def next(self):
+        self.lines[0][0] = self._extremum.update(self.data[0])
+    
+    def once(self, start, end):
+        # Volledige input array in één keer (zonder kopie) door de deque
+        src = np.frombuffer(self.data.array, dtype=np.float64, count=end)
+        if self._mode == 'max':
+            values = rolling.rolling_max(src, self.params.period)
+        else:
+            values = rolling.rolling_min(src, self.params.period)
+        self.lines[0].array[start:end] = array.array('d', values[start:end])
+
+class RollingHighest(_RollingExtremumIndicator):
+    lines = ('highest',)
+    _mode = 'max'
+
+class RollingLowest(_RollingExtremumIndicator):
+    lines = ('lowest',)
+    _mode = 'min'
 
 class InverseOptimizedV42Strategy(bt.Strategy):
     params = (
@@ -21,11 +59,17 @@ class InverseOptimizedV42Strategy(bt.Strategy):
         ('max_candles', 28),          # 28 candles (i.p.v. 25)
         ('trail_activation_pips', 45), # Start trail bij 45 pips (i.p.v. 40)
         ('trail_distance_pips', 22),   # Trail afstand 22 pips (i.p.v. 20)
+        ('sink', None),                # Event sink (None = event_log.get_sink())
+        ('signals', None),             # Gecompileerde int8 entries per bar (signals.py), None = indicators
+        ('online_stats', None),        # online_stats.OnlineStats: equity per bar + trades (forward test)
     )
     
     def __init__(self):
-        self.resistance = bt.indicators.Highest(self.data.high(-1), period=self.params.lookback)
-        self.support = bt.indicators.Lowest(self.data.low(-1), period=self.params.lookback)
+        # Entries uit een gecompileerde signal array, anders zelf de levels bijhouden
+        self.entry_signal = self.params.signals
+        if self.entry_signal is None:
+            self.resistance = RollingHighest(self.data.high(-1), period=self.params.lookback)
+            self.support = RollingLowest(self.data.low(-1), period=self.params.lookback)
         
         # Stats
         self.trade_count = 0
@@ -33,33 +77,43 @@ class InverseOptimizedV42Strategy(bt.Strategy):
         self.loss_count = 0
         self.total_pnl = 0.0
         
-        # Position tracking
-        self.in_position = False
-        self.entry_price = 0
-        self.position_type = ''
-        self.sl_price = 0
-        self.tp_price = 0
-        self.candle_counter = 0
+        # Position tracking (entry, trailing, SL/TP, time exit)
+        self.open_pos = records.Position()
         self.order = None
         
-        # Trailing stop tracking
-        self.trailing_active = False
-        self.best_price = 0
-        self.current_sl = 0
+        # Gesloten trades (structured array) + info voor het volgende record
+        self.trade_log = records.TradeLog()
+        self._exit_reason = None
+        self._last_fill = None
+        
+        # Logging: flags één keer bepalen, callsites formatten alleen als nodig
+        self.sink = self.params.sink or event_log.get_sink()
+        self.online_stats = self.params.online_stats  # self.stats = backtrader observers
+        self._log_info = self.sink.enabled_for('info')
+        self._log_debug = self.sink.enabled_for('debug')
     
-    def log(self, txt, dt=None):
+    def log(self, txt, dt=None, level='info'):
+        if not self.sink.enabled_for(level):
+            return
         try:
             dt = dt or self.datas[0].datetime.date(0)
-            print(f'{dt.isoformat()} {txt}')
+            date = dt.isoformat()
         except:
-            print(f'{datetime.now().strftime("%Y-%m-%d")} {txt}')
+            date = datetime.now().strftime("%Y-%m-%d")
+        self.sink.emit(level, 'strategy', f'{date} {txt}', date=date)
+    
+    def _summary(self, txt):
+        self.sink.emit('info', 'summary', txt)
     
     def notify_order(self, order):
         if order.status in [order.Completed]:
+            self._last_fill = (order.executed.price, abs(order.executed.size))
             if order.isbuy():
-                self.log(f'BUY @ {order.executed.price:.5f}')
+                if self._log_info:
+                    self.log(f'BUY @ {order.executed.price:.5f}')
             else:
-                self.log(f'SELL @ {order.executed.price:.5f}')
+                if self._log_info:
+                    self.log(f'SELL @ {order.executed.price:.5f}')
             self.order = None
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
             self.order = None
@@ -70,190 +124,156 @@ class InverseOptimizedV42Strategy(bt.Strategy):
         
         pnl = trade.pnl
         self.total_pnl += pnl
+        if self.online_stats is not None:
+            self.online_stats.add_trade(pnl)
+        
+        exit_price, units = self._last_fill
+        self.trade_log.append(
+            trade.baropen - 1, trade.barclose - 1, 1 if trade.long else -1,
+            trade.price, exit_price, units / 100000, pnl, self._exit_reason or 'SIGNAL'
+        )
+        self._exit_reason = None
         
         if pnl > 0:
             self.win_count += 1
-            self.log(f'✅ WIN: ${pnl:.2f}')
+            if self._log_info:
+                self.log(f'✅ WIN: ${pnl:.2f}')
         else:
             self.loss_count += 1
-            self.log(f'❌ LOSS: ${pnl:.2f}')
+            if self._log_info:
+                self.log(f'❌ LOSS: ${pnl:.2f}')
     
     def update_trailing_stop(self, current_price):
         """Update trailing stop als winst groot genoeg is."""
-        if self.position_type == 'LONG':
-            unrealized_pips = (current_price - self.entry_price) / 0.0001
-            
-            if unrealized_pips >= self.params.trail_activation_pips:
-                self.trailing_active = True
-                
-                if current_price > self.best_price:
-                    self.best_price = current_price
-                    self.current_sl = self.best_price - (self.params.trail_distance_pips * 0.0001)
-                    
-                    if self.current_sl > self.sl_price:
-                        self.sl_price = self.current_sl
-                        self.log(f'   📈 Trailing SL → {self.sl_price:.5f}')
-        
-        elif self.position_type == 'SHORT':
-            unrealized_pips = (self.entry_price - current_price) / 0.0001
-            
-            if unrealized_pips >= self.params.trail_activation_pips:
-                self.trailing_active = True
-                
-                if current_price < self.best_price or self.best_price == 0:
-                    self.best_price = current_price
-                    self.current_sl = self.best_price + (self.params.trail_distance_pips * 0.0001)
-                    
-                    if self.current_sl < self.sl_price:
-                        self.sl_price = self.current_sl
-                        self.log(f'   📉 Trailing SL → {self.sl_price:.5f}')
+        pos = self.open_pos
+        moved = pos.trail(current_price, self.params.trail_activation_pips,
+                          self.params.trail_distance_pips * 0.0001, 0.0001)
+        if moved and self._log_debug:
+            arrow = '📈' if pos.side == 1 else '📉'
+            self.log(f'   {arrow} Trailing SL → {pos.sl_price:.5f}', level='debug')
     
     def _reset_position(self):
         """Reset ALLE positie variabelen na exit."""
-        self.in_position = False
-        self.entry_price = 0
-        self.position_type = ''
-        self.sl_price = 0
-        self.tp_price = 0
-        self.candle_counter = 0
+        self.open_pos.reset()
         self.order = None
-        self.trailing_active = False
-        self.best_price = 0
-        self.current_sl = 0
     
     def next(self):
-        if self.in_position:
-            self.candle_counter += 1
+        if self.online_stats is not None:
+            self.online_stats.update_bar(self.broker.getvalue())
+        pos = self.open_pos
+        if pos.is_open:
+            pos.bars_held += 1
             current_price = self.data.close[0]
             
             # Update trailing stop
             self.update_trailing_stop(current_price)
             
-            # Check Stop Loss
-            if self.position_type == 'LONG' and current_price <= self.sl_price:
-                self.log(f'❌ SL HIT (LONG) @ {current_price:.5f}')
-                self.close()
-                self._reset_position()
-                return
-            
-            elif self.position_type == 'SHORT' and current_price >= self.sl_price:
-                self.log(f'❌ SL HIT (SHORT) @ {current_price:.5f}')
-                self.close()
-                self._reset_position()
-                return
-            
-            # Check Take Profit
-            if self.position_type == 'LONG' and current_price >= self.tp_price:
-                self.log(f'✅ TP HIT (LONG) @ {current_price:.5f}')
-                self.close()
-                self._reset_position()
-                return
-            
-            elif self.position_type == 'SHORT' and current_price <= self.tp_price:
-                self.log(f'✅ TP HIT (SHORT) @ {current_price:.5f}')
-                self.close()
-                self._reset_position()
-                return
-            
-            # Backup: Exit na max_candles
-            if self.candle_counter >= self.params.max_candles:
-                self.log(f'⏰ TIME EXIT @ {current_price:.5f} ({self.candle_counter} candles)')
-                self.close()
-                self._reset_position()
+            # Stop Loss → Take Profit → backup exit na max_candles
+            reason = pos.check_exit(current_price, self.params.max_candles)
+            if reason is None:
                 return
             
+            if self._log_info:
+                if reason == 'SL':
+                    self.log(f'❌ SL HIT ({pos.type_name}) @ {current_price:.5f}')
+                elif reason == 'TP':
+                    self.log(f'✅ TP HIT ({pos.type_name}) @ {current_price:.5f}')
+                else:
+                    self.log(f'⏰ TIME EXIT @ {current_price:.5f} ({pos.bars_held} candles)')
+            self._exit_reason = reason
+            self.close()
+            self._reset_position()
             return
         
         if self.order:
             return
         
         current_price = self.data.close[0]
-        resistance = self.resistance[0]
-        support = self.support[0]
         
-        # SHORT: Prijs breekt BOVEN resistance
-        if current_price > resistance:
+        # SHORT: Prijs breekt BOVEN resistance, LONG: prijs breekt ONDER support
+        if self.entry_signal is not None:
+            side = int(self.entry_signal[len(self) - 1])
+        elif current_price > self.resistance[0]:
+            side = -1
+        elif current_price < self.support[0]:
+            side = 1
+        else:
+            side = 0
+        if side == -1:
             self.order = self.sell()
-            self.entry_price = current_price
-            self.position_type = 'SHORT'
-            self.sl_price = current_price + (self.params.stop_loss_pips * 0.0001)
-            self.tp_price = current_price - (self.params.take_profit_pips * 0.0001)
-            self.in_position = True
-            self.candle_counter = 0
-            self.trailing_active = False
-            self.best_price = 0
-            self.current_sl = self.sl_price
-            
-            self.trade_count += 1
-            self.log(f'📉 SHORT #{self.trade_count} @ {current_price:.5f}')
-            self.log(f'   SL: {self.sl_price:.5f} ({self.params.stop_loss_pips} pips)')
-            self.log(f'   TP: {self.tp_price:.5f} ({self.params.take_profit_pips} pips) | 1:{self.params.take_profit_pips/self.params.stop_loss_pips:.2f} RR')
-        
-        # LONG: Prijs breekt ONDER support
-        elif current_price < support:
+        elif side == 1:
             self.order = self.buy()
-            self.entry_price = current_price
-            self.position_type = 'LONG'
-            self.sl_price = current_price - (self.params.stop_loss_pips * 0.0001)
-            self.tp_price = current_price + (self.params.take_profit_pips * 0.0001)
-            self.in_position = True
-            self.candle_counter = 0
-            self.trailing_active = False
-            self.best_price = 0
-            self.current_sl = self.sl_price
-            
-            self.trade_count += 1
-            self.log(f'📈 LONG #{self.trade_count} @ {current_price:.5f}')
-            self.log(f'   SL: {self.sl_price:.5f} ({self.params.stop_loss_pips} pips)')
-            self.log(f'   TP: {self.tp_price:.5f} ({self.params.take_profit_pips} pips) | 1:{self.params.take_profit_pips/self.params.stop_loss_pips:.2f} RR')
+        else:
+            return
+        
+        pos.open(side, current_price,
+                 self.params.stop_loss_pips * 0.0001,
+                 self.params.take_profit_pips * 0.0001,
+                 entry_idx=len(self) - 1)
+        
+        self.trade_count += 1
+        if self._log_info:
+            arrow = '📉' if side == -1 else '📈'
+            self.log(f'{arrow} {pos.type_name} #{self.trade_count} @ {current_price:.5f}')
+        if self._log_debug:
+            self.log(f'   SL: {pos.sl_price:.5f} ({self.params.stop_loss_pips} pips)', level='debug')
+            self.log(f'   TP: {pos.tp_price:.5f} ({self.params.take_profit_pips} pips) | 1:{self.params.take_profit_pips/self.params.stop_loss_pips:.2f} RR', level='debug')
     
     def stop(self):
-        if self.in_position:
+        if self.open_pos.is_open:
             try:
                 self.close()
-                self.log(f'⚠️  Position closed at end')
+                if self._log_info:
+                    self.log(f'⚠️  Position closed at end')
             except:
-                print('⚠️  Position close skipped')
+                if self._log_info:
+                    self._summary('⚠️  Position close skipped')
+        
+        if not self._log_info:
+            return
         
-        print(f"\n{'='*70}")
-        print(f"📊 INVERSE OPTIMIZED V4.2 RESULTS")
-        print(f"{'='*70}")
-        print(f"Total Trades: {self.trade_count}")
-        print(f"Winning Trades: {self.win_count}")
-        print(f"Losing Trades: {self.loss_count}")
+        self._summary(f"\n{'='*70}")
+        self._summary(f"📊 INVERSE OPTIMIZED V4.2 RESULTS")
+        self._summary(f"{'='*70}")
+        self._summary(f"Total Trades: {self.trade_count}")
+        self._summary(f"Winning Trades: {self.win_count}")
+        self._summary(f"Losing Trades: {self.loss_count}")
+        if self.online_stats is not None:
+            self._summary(f"Max Drawdown: {self.online_stats.max_drawdown*100:.2f}% | "
+                          f"Rolling Sharpe: {self.online_stats.rolling_sharpe:.2f}")
         
         total_closed = self.win_count + self.loss_count
         if total_closed > 0:
             win_rate = (self.win_count / total_closed) * 100
-            print(f"Win Rate: {win_rate:.1f}%")
-            print(f"Total PnL: ${self.total_pnl:.2f}")
-            print(f"Average PnL per Trade: ${self.total_pnl / self.trade_count:.2f}")
+            self._summary(f"Win Rate: {win_rate:.1f}%")
+            self._summary(f"Total PnL: ${self.total_pnl:.2f}")
+            self._summary(f"Average PnL per Trade: ${self.total_pnl / self.trade_count:.2f}")
             
             if self.win_count > 0 and self.loss_count > 0:
                 avg_win = self.total_pnl / self.win_count
                 avg_loss = abs(self.total_pnl / self.loss_count)
-                print(f"\n📈 Risk/Reward Analyse:")
-                print(f"   Avg Win: ${avg_win:.2f}")
-                print(f"   Avg Loss: ${avg_loss:.2f}")
+                self._summary(f"\n📈 Risk/Reward Analyse:")
+                self._summary(f"   Avg Win: ${avg_win:.2f}")
+                self._summary(f"   Avg Loss: ${avg_loss:.2f}")
                 if avg_loss > 0:
-                    print(f"   Win/Loss Ratio: {avg_win/avg_loss:.2f}:1")
-                    print(f"   Target RR: 1:{self.params.take_profit_pips/self.params.stop_loss_pips:.2f}")
+                    self._summary(f"   Win/Loss Ratio: {avg_win/avg_loss:.2f}:1")
+                    self._summary(f"   Target RR: 1:{self.params.take_profit_pips/self.params.stop_loss_pips:.2f}")
                 
                 pf = (self.win_count * avg_win) / (self.loss_count * avg_loss)
-                print(f"   Profit Factor: {pf:.2f}")
+                self._summary(f"   Profit Factor: {pf:.2f}")
                 
                 # Vergelijk met V4.1
-                print(f"\n📊 Vergelijking met V4.1:")
-                print(f"   V4.1 PnL: +$1,798 | V4.2 PnL: ${self.total_pnl:.2f}")
-                print(f"   V4.1 Return: 15.09% | V4.2 Return: {((self.total_pnl/10000))*100:.2f}%")
+                self._summary(f"\n📊 Vergelijking met V4.1:")
+                self._summary(f"   V4.1 PnL: +$1,798 | V4.2 PnL: ${self.total_pnl:.2f}")
+                self._summary(f"   V4.1 Return: 15.09% | V4.2 Return: {((self.total_pnl/10000))*100:.2f}%")
                 
                 if self.total_pnl > 1798:
-                    print(f"   🏆 V4.2 is BETER dan V4.1!")
+                    self._summary(f"   🏆 V4.2 is BETER dan V4.1!")
                 elif self.total_pnl > 1500:
-                    print(f"   ✅ V4.2 is vergelijkbaar met V4.1")
+                    self._summary(f"   ✅ V4.2 is vergelijkbaar met V4.1")
                 else:
-                    print(f"   ⚠️  V4.1 is beter — gebruik V4.1 voor forward test")
-        print(f"{'='*70}")
+                    self._summary(f"   ⚠️  V4.1 is beter — gebruik V4.1 voor forward test")
+        self._summary(f"{'='*70}")
 
 # =============================================================================
 # MAIN
@@ -288,30 +308,23 @@ if __name__ == "__main__":
         exit()
     
     symbol = "EURUSD"
-    timeframe = mt5.TIMEFRAME_M15
     start = datetime(2024, 10, 1)
     end = datetime.now()
     
-    rates = mt5.copy_rates_range(symbol, timeframe, start, end)
+    # Lokale cache: alleen bars na de laatst gecachte timestamp van MT5
+    store = bar_store.BarStore(source=bar_store.MT5Source(mt5))
+    rates = store.get_rates(symbol, "M15", start, end)
     mt5.shutdown()
     
     if rates is None or len(rates) == 0:
         print("❌ No data")
         exit()
     
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    df.set_index('time', inplace=True)
-    df = df[['open', 'high', 'low', 'close', 'tick_volume']]
-    df.columns = ['open', 'high', 'low', 'close', 'volume']
-    df.to_csv("eurusd_m15_inverse_v42.csv")
-    print(f"✅ {len(df)} M15 candles")
+    print(f"✅ {len(rates)} M15 candles")
     
-    data = bt.feeds.GenericCSVData(
-        dataname="eurusd_m15_inverse_v42.csv",
-        dtformat='%Y-%m-%d %H:%M:%S',
-        datetime=0, open=1, high=2, low=3, close=4, volume=5,
-        openinterest=-1,
+    # Direct uit de rates array (geen CSV round-trip)
+    data = NumpyRatesData(
+        dataname=rates,
         timeframe=bt.TimeFrame.Minutes,
         compression=15,
     )
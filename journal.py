@@ -0,0 +1,137 @@
+﻿# =============================================================================
+# JOURNAL — Append-only resultaten journal (JSONL) voor lange sweeps
+# =============================================================================
+# Elke geëvalueerde combinatie wordt direct als één JSON regel weggeschreven,
+# met als sleutel de data versie (fingerprint van de bars) en een hash van de
+# params + instellingen die de uitkomst bepalen (kapitaal, engine, kosten uit
+# config) + een code versie (hash van de broncode van de engine modules).
+# Een afgebroken grid search of walk-forward leest het journal bij de start
+# en draait alleen wat nog ontbreekt. Een half geschreven laatste regel
+# (crash tijdens schrijven) wordt overgeslagen.
+# Opt-in: alleen met journal=True / pad. Ongeldig maken: elke wijziging in
+# CODE_MODULES gebeurt automatisch; verder config.JOURNAL_SALT ophogen of het
+# bestand verwijderen.
+# =============================================================================
+import hashlib
+import importlib.util
+import json
+import os
+import numpy as np
+import config
+import indicator_cache
+
+# Config waarden die run_backtest uitkomsten beïnvloeden (onderdeel van de sleutel)
+SETTINGS_KEYS = (
+    'SYMBOL', 'LOT_SIZE_BASE', 'RISK_PER_TRADE_PCT', 'STOP_LOSS_POINTS',
+    'TAKE_PROFIT_POINTS', 'TRAILING_STOP_ACTIVATION', 'TRAILING_STOP_POINTS',
+    'SPREAD_POINTS_AVG', 'SLIPPAGE_POINTS_AVG', 'COMMISSION_PER_LOT',
+    'EMA_TREND_DEFAULT', 'USE_TREND_FILTER', 'FVG_MIN_POINTS', 'FVG_LOOKBACK',
+)
+
+# Modules waarvan de broncode de resultaten bepaalt (onderdeel van de sleutel)
+CODE_MODULES = ('backtest_engine', 'strategy', 'indicators', 'signals', 'metrics',
+                'records', 'walkforward')
+
+_code_version = None
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Niet serialiseerbaar: {type(value)}")
+
+def settings():
+    """Huidige waarden van SETTINGS_KEYS."""
+    return {k: getattr(config, k) for k in SETTINGS_KEYS}
+
+def code_version():
+    """Hash over de broncode van CODE_MODULES + config.JOURNAL_SALT (één keer per proces)."""
+    global _code_version
+    if _code_version is None:
+        h = hashlib.blake2b(digest_size=8)
+        for name in CODE_MODULES:
+            spec = importlib.util.find_spec(name)
+            if spec is not None and spec.origin and os.path.exists(spec.origin):
+                with open(spec.origin, 'rb') as f:
+                    h.update(f.read())
+        h.update(str(config.JOURNAL_SALT).encode())
+        _code_version = h.hexdigest()
+    return _code_version
+
+def params_key(params, **context):
+    """Korte hash over params + context + settings + code versie."""
+    payload = json.dumps({'params': params, 'context': context, 'settings': settings(),
+                          'code': code_version()},
+                         sort_keys=True, default=_json_default)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+def data_version(df):
+    """Fingerprint van index + numerieke kolommen van een DataFrame (of rates array)."""
+    if hasattr(df, 'columns'):
+        columns = [c for c in df.columns if np.issubdtype(df[c].dtype, np.number)]
+        return indicator_cache.fingerprint(df.index, *(df[c] for c in columns))
+    return indicator_cache.fingerprint(df)
+
+def default_path():
+    return os.path.join(config.RESULTS_DIR, config.JOURNAL_FILE)
+
+class Journal:
+    """
+    path: JSONL bestand (wordt aangemaakt bij de eerste append)
+    Entries in geheugen per (data_version, key); latere regels winnen.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        self._entries = {}
+        self._partial = False   # Laatste regel zonder newline (crash tijdens schrijven)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        skipped = 0
+        line = '\n'
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._entries[(entry['data'], entry['key'])] = entry['result']
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1
+            self._partial = not line.endswith('\n')
+        if skipped:
+            print(f"⚠️  Journal {self.path}: {skipped} onleesbare regel(s) overgeslagen")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, version, key):
+        """Eerder resultaat of None."""
+        return self._entries.get((version, key))
+
+    def append(self, version, key, result, params=None):
+        """Schrijf één resultaat weg (flush per regel, dus overleeft een crash)."""
+        line = json.dumps({'data': version, 'key': key, 'params': params, 'result': result},
+                          default=_json_default)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if self._partial:
+                f.write('\n')
+                self._partial = False
+            f.write(line + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._entries[(version, key)] = json.loads(line)['result']
+
+def open_journal(journal):
+    """journal: Journal, pad, True (default pad) of None / False / '' (geen journal)."""
+    if journal is True:
+        journal = Journal()
+    elif not journal:
+        return None
+    elif not isinstance(journal, Journal):
+        journal = Journal(journal)
+    print(f"📒 Journal: {os.path.abspath(journal.path)} ({len(journal)} resultaten)")
+    return journal
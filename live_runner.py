@@ -0,0 +1,626 @@
+﻿# =============================================================================
+# LIVE RUNNER — Event-driven forward test tegen MT5 (of een gesimuleerde broker)
+# =============================================================================
+# Per gesloten bar: indicatoren incrementeel bijwerken (O(1)), inverse
+# breakout + EMA crossover evalueren, beslissing loggen naar FORWARD_LOG_FILE
+# en (optioneel) een order intent naar de broker sturen. Latency van bar close
+# tot order intent wordt gemeten en gerapporteerd.
+# SL/TP gaan mee met de order; trailing stop en time exit (max_candles) beheert
+# de runner zelf per gesloten bar, zoals InverseOptimizedV42Strategy.
+# De klok is de server klok van de broker (MT5 bar tijden zijn server tijd).
+# Equity per bar en pnl per gesloten trade gaan naar een OnlineStats, die na
+# elke bar naar FORWARD_STATS_FILE wordt geschreven en bij de start hersteld.
+# Equity komt van de broker (MT5 account_info, gesimuleerde fills); bij een
+# dry run houdt de runner zelf een papieren account bij op de close.
+# =============================================================================
+import sys
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+import config
+import bar_store
+import event_log
+import online_stats
+import records
+import rolling
+
+PIP = 0.0001
+POINT = 0.00001
+CONTRACT_SIZE = 100000      # Units per lot (EURUSD: pnl in USD = prijsverschil x lots x 100k)
+CLOCK_ROUNDING = 900        # Server offset afgerond op 15 min (tijdzones)
+CLOCK_RESYNC_SECONDS = 3600 # Offset opnieuw meten (zomertijd wissel)
+
+# ----- BROKERS -----
+
+class Broker(ABC):
+    """Interface die de runner nodig heeft (MT5 live of gesimuleerd)."""
+
+    @abstractmethod
+    def latest_bars(self, symbol, timeframe_str, count):
+        """Laatste count GESLOTEN bars (oud → nieuw) als rates array."""
+
+    @abstractmethod
+    def position(self, symbol):
+        """Huidige positie: 1 long, -1 short, 0 flat."""
+
+    @abstractmethod
+    def submit(self, intent):
+        """Verwerk een order intent (dict). Returns: dict met resultaat."""
+
+    @abstractmethod
+    def modify_stop(self, symbol, sl):
+        """Verschuif de SL van de open positie (trailing). Returns: dict met resultaat."""
+
+    @abstractmethod
+    def close_position(self, symbol, reason):
+        """Sluit de open positie (runner exit, bv. TIME). Returns: dict met resultaat."""
+
+    @abstractmethod
+    def account(self):
+        """(balance, equity) in account valuta, of None zonder echte posities (dry run)."""
+
+    def now(self):
+        """Huidige tijd in epoch seconds (zelfde klok als bar timestamps)."""
+        return time.time()
+
+class MT5Broker(Broker):
+    """
+    MetaTrader5 broker. dry_run=True (default) stuurt geen orders, alleen
+    intents naar het log — veilig voor forward testen.
+    """
+
+    def __init__(self, mt5_module=None, dry_run=True, deviation=10, magic=42042, clock_symbol=None):
+        if mt5_module is None:
+            import MetaTrader5 as mt5_module
+        self.mt5 = mt5_module
+        self.dry_run = dry_run
+        self.deviation = deviation
+        self.magic = magic
+        self.clock_symbol = clock_symbol or config.SYMBOL
+        self.server_offset = None
+        self._synced_at = None
+
+    def sync_clock(self):
+        """
+        Meet server tijd - lokale UTC tijd via de laatste tick (server klok),
+        afgerond op CLOCK_ROUNDING zodat een paar seconden/minuten oude tick
+        niet meetelt. Zonder tick (markt dicht) blijft de vorige offset staan.
+        """
+        tick = self.mt5.symbol_info_tick(self.clock_symbol)
+        if tick is not None:
+            offset = tick.time - time.time()
+            self.server_offset = round(offset / CLOCK_ROUNDING) * CLOCK_ROUNDING
+        elif self.server_offset is None:
+            print("⚠️  Geen tick voor server klok, latency gemeten in lokale UTC tijd")
+            self.server_offset = 0
+        self._synced_at = time.time()
+        return self.server_offset
+
+    def now(self):
+        """Server tijd in epoch seconds (zelfde klok als copy_rates bar tijden)."""
+        if self._synced_at is None or time.time() - self._synced_at > CLOCK_RESYNC_SECONDS:
+            self.sync_clock()
+        return time.time() + self.server_offset
+
+    def latest_bars(self, symbol, timeframe_str, count):
+        timeframe = getattr(self.mt5, f"TIMEFRAME_{timeframe_str}")
+        # Positie 0 is de bar in opbouw; vanaf 1 = laatst gesloten bar
+        rates = self.mt5.copy_rates_from_pos(symbol, timeframe, 1, count)
+        return bar_store.as_rates(rates)
+
+    def position(self, symbol):
+        positions = self.mt5.positions_get(symbol=symbol) or ()
+        size = 0
+        for p in positions:
+            size += 1 if p.type == self.mt5.POSITION_TYPE_BUY else -1
+        return int(np.sign(size))
+
+    def submit(self, intent):
+        if self.dry_run:
+            return {'status': 'dry_run'}
+        tick = self.mt5.symbol_info_tick(intent['symbol'])
+        is_buy = intent['side'] == 1
+        request = {
+            'action': self.mt5.TRADE_ACTION_DEAL,
+            'symbol': intent['symbol'],
+            'volume': intent['volume'],
+            'type': self.mt5.ORDER_TYPE_BUY if is_buy else self.mt5.ORDER_TYPE_SELL,
+            'price': tick.ask if is_buy else tick.bid,
+            'sl': intent['sl'],
+            'tp': intent['tp'],
+            'deviation': self.deviation,
+            'magic': self.magic,
+            'comment': intent['rule'],
+            'type_time': self.mt5.ORDER_TIME_GTC,
+            'type_filling': self.mt5.ORDER_FILLING_IOC,
+        }
+        return self._send(request)
+
+    def _send(self, request):
+        result = self.mt5.order_send(request)
+        if result is None:
+            return {'status': 'error', 'error': str(self.mt5.last_error())}
+        return {'status': 'sent', 'retcode': result.retcode, 'order': result.order}
+
+    def _own_positions(self, symbol):
+        return [p for p in (self.mt5.positions_get(symbol=symbol) or ()) if p.magic == self.magic]
+
+    def modify_stop(self, symbol, sl):
+        if self.dry_run:
+            return {'status': 'dry_run'}
+        results = [self._send({
+            'action': self.mt5.TRADE_ACTION_SLTP,
+            'symbol': symbol,
+            'position': p.ticket,
+            'sl': sl,
+            'tp': p.tp,
+            'magic': self.magic,
+        }) for p in self._own_positions(symbol)]
+        return results[-1] if results else {'status': 'no_position'}
+
+    def close_position(self, symbol, reason):
+        if self.dry_run:
+            return {'status': 'dry_run'}
+        tick = self.mt5.symbol_info_tick(symbol)
+        results = []
+        for p in self._own_positions(symbol):
+            is_buy = p.type == self.mt5.POSITION_TYPE_BUY
+            results.append(self._send({
+                'action': self.mt5.TRADE_ACTION_DEAL,
+                'symbol': symbol,
+                'position': p.ticket,
+                'volume': p.volume,
+                'type': self.mt5.ORDER_TYPE_SELL if is_buy else self.mt5.ORDER_TYPE_BUY,
+                'price': tick.bid if is_buy else tick.ask,
+                'deviation': self.deviation,
+                'magic': self.magic,
+                'comment': reason,
+                'type_time': self.mt5.ORDER_TIME_GTC,
+                'type_filling': self.mt5.ORDER_FILLING_IOC,
+            }))
+        return results[-1] if results else {'status': 'no_position'}
+
+    def account(self):
+        if self.dry_run:
+            return None
+        info = self.mt5.account_info()
+        if info is None:
+            return None
+        return float(info.balance), float(info.equity)
+
+class SimulatedBroker(Broker):
+    """
+    Speelt een rates array bar voor bar af. advance() sluit de volgende bar;
+    now() = sluittijd van die bar + echte verstreken tijd sinds advance().
+    Posities openen op de open van de volgende bar en sluiten op SL/TP (tegen
+    dat niveau) of via close_position (runner exits, tegen de laatste close).
+    Pnl = prijsverschil x volume x CONTRACT_SIZE, geen kosten.
+    """
+
+    def __init__(self, rates, timeframe_str='M15', start_index=0, initial_capital=None):
+        self.rates = bar_store.as_rates(rates)
+        self.bar_seconds = bar_store.TIMEFRAME_SECONDS[timeframe_str]
+        self.cursor = start_index       # Aantal gesloten bars
+        self._closed_at = time.perf_counter()
+        self.orders = []
+        self.pending = []
+        self.open_position = None
+        self.closes = []
+        self.balance = initial_capital or config.INITIAL_CAPITAL
+
+    def advance(self):
+        """Sluit de volgende bar. Returns: False als de data op is."""
+        if self.cursor >= len(self.rates):
+            return False
+        self.cursor += 1
+        self._closed_at = time.perf_counter()
+        self._fill_and_check(self.rates[self.cursor - 1])
+        return True
+
+    def _fill_and_check(self, bar):
+        for intent in self.pending:
+            if self.open_position is None:
+                self.open_position = dict(intent, fill_price=float(bar['open']))
+        self.pending = []
+
+        pos = self.open_position
+        if pos is None:
+            return
+        long_ = pos['side'] == 1
+        hit_sl = bar['low'] <= pos['sl'] if long_ else bar['high'] >= pos['sl']
+        hit_tp = bar['high'] >= pos['tp'] if long_ else bar['low'] <= pos['tp']
+        if hit_sl or hit_tp:
+            self._close(int(bar['time']), 'SL' if hit_sl else 'TP', pos['sl'] if hit_sl else pos['tp'])
+
+    def _close(self, bar_time, reason, price):
+        pos = self.open_position
+        pnl = pos['side'] * (price - pos['fill_price']) * pos['volume'] * CONTRACT_SIZE
+        self.balance += pnl
+        self.closes.append({'time': bar_time, 'reason': reason, 'price': float(price), 'pnl': pnl})
+        self.open_position = None
+
+    def latest_bars(self, symbol, timeframe_str, count):
+        start = max(0, self.cursor - count)
+        return self.rates[start:self.cursor]
+
+    def position(self, symbol):
+        if self.open_position is not None:
+            return self.open_position['side']
+        if self.pending:
+            return self.pending[-1]['side']
+        return 0
+
+    def submit(self, intent):
+        self.orders.append(intent)
+        self.pending.append(intent)
+        return {'status': 'accepted'}
+
+    def modify_stop(self, symbol, sl):
+        for order in [self.open_position] + self.pending:
+            if order is not None:
+                order['sl'] = sl
+        return {'status': 'modified'}
+
+    def close_position(self, symbol, reason):
+        if self.open_position is None and not self.pending:
+            return {'status': 'no_position'}
+        self.pending = []
+        if self.open_position is not None:
+            self._close(int(self.rates['time'][self.cursor - 1]), reason,
+                        float(self.rates['close'][self.cursor - 1]))
+        return {'status': 'closed'}
+
+    def account(self):
+        equity = self.balance
+        pos = self.open_position
+        if pos is not None:
+            close = float(self.rates['close'][self.cursor - 1])
+            equity += pos['side'] * (close - pos['fill_price']) * pos['volume'] * CONTRACT_SIZE
+        return self.balance, equity
+
+    def now(self):
+        if self.cursor == 0:
+            return float(self.rates['time'][0])
+        bar_close = float(self.rates['time'][self.cursor - 1]) + self.bar_seconds
+        return bar_close + (time.perf_counter() - self._closed_at)
+
+# ----- INCREMENTELE INDICATOREN -----
+
+class IncrementalEMA:
+    """EMA zoals ewm(span, adjust=False): eerste waarde = eerste input."""
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+class SignalState:
+    """
+    Houdt alle indicator state bij en evalueert beide regels per bar.
+    inverse_breakout: -1 als close > hoogste high van vorige lookback bars,
+                      +1 als close < laagste low (fade)
+    ema_cross: +1 / -1 op een crossover van ema_fast en ema_slow
+    """
+
+    def __init__(self, lookback=50, ema_fast=None, ema_slow=None):
+        self.resistance = rolling.RollingExtremum(lookback, 'max')
+        self.support = rolling.RollingExtremum(lookback, 'min')
+        self.ema_fast = IncrementalEMA(ema_fast or config.EMA_FAST_DEFAULT)
+        self.ema_slow = IncrementalEMA(ema_slow or config.EMA_SLOW_DEFAULT)
+        self.prev_fast = None
+        self.prev_slow = None
+        self.prev_high = np.nan
+        self.prev_low = np.nan
+        self.last_time = None
+
+    def update(self, bar):
+        """Verwerk één gesloten bar. Returns: dict met beide signalen."""
+        close = float(bar['close'])
+
+        # Levels over de VORIGE lookback bars (zoals high(-1) in de strategie)
+        resistance = self.resistance.update(self.prev_high)
+        support = self.support.update(self.prev_low)
+        breakout = 0
+        if close > resistance:
+            breakout = -1
+        elif close < support:
+            breakout = 1
+
+        fast = self.ema_fast.update(close)
+        slow = self.ema_slow.update(close)
+        cross = 0
+        if self.prev_fast is not None:
+            if fast > slow and self.prev_fast <= self.prev_slow:
+                cross = 1
+            elif fast < slow and self.prev_fast >= self.prev_slow:
+                cross = -1
+
+        self.prev_fast, self.prev_slow = fast, slow
+        self.prev_high, self.prev_low = float(bar['high']), float(bar['low'])
+        self.last_time = int(bar['time'])
+
+        return {
+            'inverse_breakout': breakout,
+            'ema_cross': cross,
+            'close': close,
+            'resistance': resistance,
+            'support': support,
+            'ema_fast': fast,
+            'ema_slow': slow,
+        }
+
+# ----- RUNNER -----
+
+class LiveRunner:
+    """
+    broker: Broker implementatie
+    trade_rule: regel waarvoor order intents worden gemaakt
+    ('inverse_breakout', 'ema_cross' of None = alleen loggen)
+    max_candles / trail_*_pips: exits van inverse_breakout (V4.2 defaults);
+    ema_cross trailt zoals de backtest engines (config, in points, geen time exit)
+    stats_path: OnlineStats snapshot (default config.FORWARD_STATS_FILE, '' = niet
+    opslaan); bestaat die al, dan gaan de statistieken daar verder
+    """
+
+    def __init__(self, broker, symbol=None, timeframe_str=None, trade_rule='inverse_breakout',
+                 lookback=50, stop_loss_pips=40, take_profit_pips=90, volume=None,
+                 ema_fast=None, ema_slow=None, log_path=None, sink=None,
+                 max_candles=28, trail_activation_pips=45, trail_distance_pips=22,
+                 stats_path=None):
+        self.broker = broker
+        self.symbol = symbol or config.SYMBOL
+        self.timeframe_str = timeframe_str or config.TIMEFRAME_MT5
+        self.bar_seconds = bar_store.TIMEFRAME_SECONDS[self.timeframe_str]
+        self.trade_rule = trade_rule
+        self.lookback = lookback
+        self.stop_loss_pips = stop_loss_pips
+        self.take_profit_pips = take_profit_pips
+        self.volume = volume or config.LOT_SIZE_BASE
+        self.max_candles = max_candles
+        self.trail_activation_pips = trail_activation_pips
+        self.trail_distance_pips = trail_distance_pips
+        self.ema_slow_span = ema_slow or config.EMA_SLOW_DEFAULT
+        self.state = SignalState(lookback, ema_fast, self.ema_slow_span)
+        self.open_pos = records.Position()   # Positie die deze runner geopend heeft
+        self.sink = sink or event_log.JsonlFileSink(log_path or config.FORWARD_LOG_FILE,
+                                                    batch_size=1, level='info')
+        self.latencies = []
+
+        self.stats_path = config.FORWARD_STATS_FILE if stats_path is None else stats_path
+        account = self.broker.account()
+        initial = account[1] if account is not None else config.INITIAL_CAPITAL
+        if self.stats_path:
+            self.stats = online_stats.OnlineStats.load(self.stats_path, initial_capital=initial,
+                                                       timeframe_str=self.timeframe_str)
+        else:
+            self.stats = online_stats.OnlineStats(initial, timeframe_str=self.timeframe_str)
+        self.paper_balance = self.stats.equity  # Dry run: papieren account (flat bij de start)
+        self._entry_balance = None
+
+    def warm_up(self, bars=None):
+        """Vul indicator state met historie (zonder beslissingen te loggen)."""
+        count = bars or max(self.lookback, self.ema_slow_span) * 10
+        history = self.broker.latest_bars(self.symbol, self.timeframe_str, count)
+        for bar in history:
+            self.state.update(bar)
+        return len(history)
+
+    def poll(self):
+        """
+        Check op nieuwe gesloten bars en verwerk ze op volgorde: ook bars die
+        na een gemiste poll (trage loop, herverbinding) nog niet gezien zijn,
+        zodat de incrementele state geen bars overslaat.
+        Returns: beslissing van de laatste nieuwe bar (dict) of None als er
+        geen nieuwe bar is.
+        """
+        count = 1
+        last_time = self.state.last_time
+        if last_time is not None:
+            # Bars sinds de sluiting van de laatst verwerkte bar (+1 marge)
+            missed = (self.broker.now() - (last_time + self.bar_seconds)) // self.bar_seconds
+            count = max(1, int(missed) + 2)
+        bars = self.broker.latest_bars(self.symbol, self.timeframe_str, count)
+        if last_time is not None:
+            bars = bars[bars['time'] > last_time]
+        decision = None
+        for bar in bars:
+            decision = self.on_bar(bar)
+        return decision
+
+    def on_bar(self, bar):
+        signals = self.state.update(bar)
+        bar_close = int(bar['time']) + self.bar_seconds
+
+        intent = None
+        result = None
+        exit_ = self._manage_position(signals['close'])
+        side = signals[self.trade_rule] if self.trade_rule else 0
+        if side != 0 and not self.open_pos.is_open and exit_ is None \
+                and self.broker.position(self.symbol) == 0:
+            intent = self._make_intent(side, signals['close'])
+            self.open_pos.open(side, signals['close'], abs(intent['ref_price'] - intent['sl']),
+                               abs(intent['tp'] - intent['ref_price']))
+        # Latency: bar close → beslissing/order intent klaar
+        latency = self.broker.now() - bar_close
+        self.latencies.append(latency)
+        if intent is not None:
+            self._entry_balance = self._account(signals['close'])[0]
+            result = self.broker.submit(intent)
+        equity = self._update_stats(signals['close'])
+
+        decision = {
+            'bar_time': int(bar['time']),
+            'symbol': self.symbol,
+            'signals': signals,
+            'intent': intent,
+            'result': result,
+            'exit': exit_,
+            'equity': equity,
+            'latency_ms': latency * 1000.0,
+        }
+        self.sink.emit('info', 'decision', f"{self.symbol} {self.timeframe_str} bar {decision['bar_time']}: signaal {side}",
+                       **decision)
+        return decision
+
+    def _exit_spec(self):
+        """(trail activation, trail afstand in prijs, unit, max bars) per regel."""
+        if self.trade_rule == 'inverse_breakout':
+            return (self.trail_activation_pips, self.trail_distance_pips * PIP, PIP,
+                    self.max_candles)
+        if config.TRAILING_STOP_ACTIVATION > 0:
+            return (config.TRAILING_STOP_ACTIVATION, config.TRAILING_STOP_POINTS * POINT, POINT, None)
+        return (None, None, POINT, None)
+
+    def _manage_position(self, close):
+        """
+        Trailing stop + time exit op de gesloten bar (zoals next() in de V4.2
+        strategie). SL/TP zelf liggen bij de broker; is de positie daar al
+        gesloten, dan wordt alleen de state gereset. Bij een dry run broker
+        (geen echte posities) bewaakt de runner ook SL/TP op de close.
+        Returns: dict met exit reden/resultaat of None
+        """
+        pos = self.open_pos
+        if not pos.is_open:
+            return None
+        if not getattr(self.broker, 'dry_run', False) and self.broker.position(self.symbol) == 0:
+            self._record_trade(close)
+            pos.reset()
+            return None
+
+        pos.bars_held += 1
+        activation, distance, unit, max_bars = self._exit_spec()
+        if activation is not None and pos.trail(close, activation, distance, unit):
+            self.broker.modify_stop(self.symbol, pos.sl_price)
+
+        reason = pos.check_exit(close, max_bars)
+        if reason is None:
+            return None
+        result = self.broker.close_position(self.symbol, reason)
+        self._record_trade(close)
+        pos.reset()
+        return {'reason': reason, 'result': result}
+
+    # ----- STATISTIEKEN -----
+
+    def _account(self, close):
+        """(balance, equity) van de broker; dry run: papieren account op de close."""
+        account = self.broker.account()
+        if account is not None:
+            return account
+        pos = self.open_pos
+        open_pnl = pos.side * (close - pos.entry_price) * self.volume * CONTRACT_SIZE if pos.is_open else 0.0
+        return self.paper_balance, self.paper_balance + open_pnl
+
+    def _record_trade(self, close):
+        """Gesloten trade naar de stats: balance verschil sinds de entry (dry run: op de close)."""
+        account = self.broker.account()
+        if account is None:
+            pos = self.open_pos
+            pnl = pos.side * (close - pos.entry_price) * self.volume * CONTRACT_SIZE
+            self.paper_balance += pnl
+        elif self._entry_balance is not None:
+            pnl = account[0] - self._entry_balance
+        else:
+            return  # Positie van voor een herstart: entry balance onbekend
+        self._entry_balance = None
+        self.stats.add_trade(pnl)
+
+    def _update_stats(self, close):
+        """Equity aan het eind van de bar naar de stats + snapshot. Returns: equity."""
+        equity = self._account(close)[1]
+        self.stats.update_bar(equity)
+        if self.stats_path:
+            self.stats.save(self.stats_path)
+        return equity
+
+    def _make_intent(self, side, price):
+        if self.trade_rule == 'inverse_breakout':
+            sl_dist = self.stop_loss_pips * PIP
+            tp_dist = self.take_profit_pips * PIP
+        else:
+            sl_dist = config.STOP_LOSS_POINTS * POINT
+            tp_dist = config.TAKE_PROFIT_POINTS * POINT
+        return {
+            'symbol': self.symbol,
+            'rule': self.trade_rule,
+            'side': side,
+            'volume': self.volume,
+            'ref_price': price,
+            'sl': price - side * sl_dist,
+            'tp': price + side * tp_dist,
+        }
+
+    def run(self, max_bars=None, poll_interval=1.0, close_delay=0.5):
+        """
+        Blocking loop: slaap tot de verwachte bar close (+ close_delay),
+        poll daarna elke poll_interval tot de nieuwe bar er is.
+        """
+        processed = 0
+        while max_bars is None or processed < max_bars:
+            now = self.broker.now()
+            next_close = (int(now) // self.bar_seconds + 1) * self.bar_seconds
+            time.sleep(max(0.0, next_close - now + close_delay))
+            while self.poll() is None:
+                time.sleep(poll_interval)
+            processed += 1
+        return self.latency_report()
+
+    def latency_report(self):
+        """Latency van bar close tot beslissing/order intent (ms)."""
+        if not self.latencies:
+            return {'bars': 0}
+        ms = np.asarray(self.latencies) * 1000.0
+        return {
+            'bars': len(ms),
+            'mean_ms': float(ms.mean()),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)),
+            'max_ms': float(ms.max()),
+        }
+
+def replay(rates, warm_up_bars=500, initial_capital=None, **runner_kwargs):
+    """Forward test op historische data met de SimulatedBroker (geen wachten)."""
+    broker = SimulatedBroker(rates, runner_kwargs.get('timeframe_str') or config.TIMEFRAME_MT5,
+                             start_index=min(warm_up_bars, len(rates)),
+                             initial_capital=initial_capital)
+    runner = LiveRunner(broker, **runner_kwargs)
+    runner.warm_up(warm_up_bars)
+    while broker.advance():
+        runner.poll()
+    runner.sink.flush()
+    return runner
+
+# =============================================================================
+# MAIN
+# =============================================================================
+if __name__ == "__main__":
+    if not config.FORWARD_TEST_MODE:
+        print("⚠️  FORWARD_TEST_MODE staat UIT in config.py")
+        sys.exit(0)
+
+    import MetaTrader5 as mt5
+    if not mt5.initialize():
+        print("❌ MT5 init failed")
+        sys.exit(1)
+
+    broker = MT5Broker(mt5, dry_run=True)
+    runner = LiveRunner(broker)
+    print(f"✅ Warm-up: {runner.warm_up()} bars, {config.SYMBOL} {config.TIMEFRAME_MT5}")
+    print(f"🕐 Server klok offset: {broker.sync_clock() / 3600:+.2f} uur")
+    print(f"📡 Forward test gestart, beslissingen → {config.FORWARD_LOG_FILE}")
+    print(f"📈 Stats ({runner.stats.bars} bars hersteld) → {config.FORWARD_STATS_FILE}")
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.sink.close()
+        mt5.shutdown()
+        print(f"⏱  Latency: {runner.latency_report()}")
+        print(f"📊 Stats: {runner.stats.summary()}")
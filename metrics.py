@@ -0,0 +1,99 @@
+﻿# =============================================================================
+# METRICS — Backtest statistieken direct uit arrays
+# =============================================================================
+# Input: een float64 equity array (één waarde per bar) en compacte trade
+# arrays (entry/exit bar index, pnl, lot size). Geen DataFrames of dicts per
+# bar/trade, dus goedkoop genoeg om per grid punt te draaien.
+# =============================================================================
+import numpy as np
+import config
+import bar_store
+
+TRADING_DAYS_PER_YEAR = 260  # Forex: 24/5
+
+def periods_per_year(timeframe_str=None):
+    """Aantal bars per jaar voor annualisatie van Sharpe/Sortino."""
+    seconds = bar_store.TIMEFRAME_SECONDS[timeframe_str or config.TIMEFRAME_MT5]
+    return TRADING_DAYS_PER_YEAR * 86400 / seconds
+
+def trade_arrays(trade_log):
+    """
+    records.TradeLog (of TRADE_DTYPE array) → kolommen voor de metrics.
+    Returns: dict met entry_idx, exit_idx (int64), pnl en lot_size (float64)
+    """
+    r = getattr(trade_log, 'records', trade_log)
+    return {
+        'entry_idx': r['entry_idx'],
+        'exit_idx': r['exit_idx'],
+        'pnl': r['pnl'],
+        'lot_size': r['lot_size'],
+    }
+
+def drawdown_series(equity):
+    """(equity - running peak) / running peak per bar."""
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity)
+    return (equity - peak) / peak
+
+def equity_metrics(equity, timeframe_str=None):
+    """max_drawdown, sharpe en sortino (geannualiseerd, per-bar rendementen)."""
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return {'max_drawdown': 0, 'sharpe': 0.0, 'sortino': 0.0}
+
+    max_drawdown = drawdown_series(equity).min()
+
+    sharpe = sortino = 0.0
+    if len(equity) > 2:
+        returns = np.diff(equity) / equity[:-1]
+        scale = np.sqrt(periods_per_year(timeframe_str))
+        mean = returns.mean()
+        std = returns.std(ddof=1)
+        if std > 0:
+            sharpe = float(mean / std * scale)
+        downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+        if downside > 0:
+            sortino = float(mean / downside * scale)
+
+    return {'max_drawdown': max_drawdown, 'sharpe': sharpe, 'sortino': sortino}
+
+def trade_metrics(pnl, entry_idx=None, exit_idx=None, n_bars=0):
+    """
+    Win rate, gemiddelde winst/verlies, profit factor, expectancy en exposure.
+    Zelfde conventies als de originele backtest: pnl <= 0 telt als verlies,
+    profit factor 999 zonder verliezen, alles 0 zonder trades.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    n = len(pnl)
+    if n == 0:
+        return {'win_rate': 0, 'avg_win': 0, 'avg_loss': 0, 'profit_factor': 0,
+                'expectancy': 0.0, 'exposure': 0.0}
+
+    is_win = pnl > 0
+    n_wins = int(is_win.sum())
+    wins = pnl[is_win]
+    losses = pnl[~is_win]
+    gross_wins = wins.sum()
+    gross_losses = abs(losses.sum())
+
+    exposure = 0.0
+    if entry_idx is not None and n_bars > 0:
+        exposure = float(np.sum(np.asarray(exit_idx) - np.asarray(entry_idx)) / n_bars)
+
+    return {
+        'win_rate': n_wins / n,
+        'avg_win': wins.mean() if n_wins > 0 else 0,
+        'avg_loss': losses.mean() if n_wins < n else 0,
+        'profit_factor': gross_wins / gross_losses if gross_losses > 0 else 999,
+        'expectancy': float(pnl.mean()),
+        'exposure': exposure,
+    }
+
+def compute(equity, trades, timeframe_str=None):
+    """
+    Alle metrics in één call.
+    equity: float64 array per bar; trades: dict uit trade_arrays()
+    """
+    results = equity_metrics(equity, timeframe_str)
+    results.update(trade_metrics(trades['pnl'], trades['entry_idx'], trades['exit_idx'], len(equity)))
+    return results
@@ -0,0 +1,149 @@
+﻿# =============================================================================
+# MONTE CARLO — Robuustheid van de trade volgorde (gevectoriseerd)
+# =============================================================================
+# Eén backtest is één pad. Hier wordt de trade PnL reeks 100k+ keer opnieuw
+# gerangschikt (shuffle) of met teruglegging getrokken (bootstrap). Elke chunk
+# is één (paden x trades) matrix: cumsum → equity, running max → drawdown.
+# Chunks zijn begrensd in geheugen (MC_CHUNK_MB) en hebben elk een eigen
+# seed uit één SeedSequence, dus het resultaat hangt niet af van het aantal
+# workers. Optioneel over een process pool verdeeld.
+# =============================================================================
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import config
+
+METHODS = ('shuffle', 'bootstrap')
+
+def trade_pnl(source):
+    """
+    PnL per trade als float64 array. source: run_backtest resultaat (kosten
+    worden gelijk over de trades verdeeld), lijst met trade dicts,
+    records.TradeLog / TRADE_DTYPE array of een gewone array.
+    """
+    if isinstance(source, dict):
+        trades = source.get('trades')
+        if trades is None:
+            raise ValueError("Resultaat zonder trades (scalars_only); draai run_backtest zonder scalars_only")
+        pnl = trade_pnl(trades)
+        if len(pnl) > 0:
+            pnl = pnl - source.get('total_costs', 0.0) / len(pnl)
+        return pnl
+    if isinstance(source, list):
+        return np.array([t['pnl'] for t in source], dtype=np.float64)
+    records = getattr(source, 'records', source)
+    if getattr(records, 'dtype', None) is not None and records.dtype.names:
+        return np.asarray(records['pnl'], dtype=np.float64)
+    return np.asarray(source, dtype=np.float64)
+
+def _chunk_rows(n_trades, chunk_mb):
+    """Paden per chunk zodat de tijdelijke matrices binnen chunk_mb blijven."""
+    per_row = max(n_trades, 1) * 8 * 3   # Paden, equity, running peak
+    return max(1, int(chunk_mb * 2 ** 20 // per_row))
+
+def _simulate_chunk(pnl, n_paths, method, initial_capital, ruin_equity, seed_seq):
+    """Returns: (max drawdown, eind rendement, ruined) per pad."""
+    rng = np.random.default_rng(seed_seq)
+    if method == 'shuffle':
+        paths = rng.permuted(np.broadcast_to(pnl, (n_paths, len(pnl))), axis=1)
+    else:
+        paths = pnl[rng.integers(0, len(pnl), size=(n_paths, len(pnl)))]
+
+    equity = np.cumsum(paths, axis=1, out=paths)
+    equity += initial_capital
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, initial_capital, out=peak)
+    max_drawdown = ((equity - peak) / peak).min(axis=1)
+    ruined = equity.min(axis=1) <= ruin_equity
+    final_return = equity[:, -1] / initial_capital - 1
+    return max_drawdown, final_return, ruined
+
+def simulate(pnl, initial_capital=None, n_sims=None, method=None, ruin_level=None,
+             chunk_mb=None, seed=None, n_workers=1):
+    """
+    pnl: trade PnL (zie trade_pnl); n_workers > 1 verdeelt chunks over processen.
+
+    Returns: dict met per pad max_drawdown (<= 0), final_return en ruined
+    (bool), plus n_sims/method/ruin_level
+    """
+    pnl = trade_pnl(pnl)
+    cap = initial_capital or config.INITIAL_CAPITAL
+    n_sims = n_sims or config.MC_SIMULATIONS
+    method = method or config.MC_METHOD
+    ruin_level = config.MC_RUIN_LEVEL if ruin_level is None else ruin_level
+    seed = config.MC_SEED if seed is None else seed
+    if method not in METHODS:
+        raise ValueError(f"Onbekende methode: {method}")
+
+    if len(pnl) == 0:
+        return {
+            'max_drawdown': np.zeros(n_sims), 'final_return': np.zeros(n_sims),
+            'ruined': np.zeros(n_sims, dtype=bool), 'n_sims': n_sims,
+            'method': method, 'ruin_level': ruin_level,
+        }
+
+    rows = _chunk_rows(len(pnl), chunk_mb or config.MC_CHUNK_MB)
+    sizes = [min(rows, n_sims - i) for i in range(0, n_sims, rows)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    ruin_equity = cap * (1 - ruin_level)
+    args = [(pnl, size, method, cap, ruin_equity, s) for size, s in zip(sizes, seeds)]
+
+    n_workers = min(n_workers or os.cpu_count() or 1, len(args))
+    if n_workers <= 1:
+        parts = [_simulate_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            parts = list(pool.map(_simulate_chunk, *zip(*args)))
+
+    return {
+        'max_drawdown': np.concatenate([p[0] for p in parts]),
+        'final_return': np.concatenate([p[1] for p in parts]),
+        'ruined': np.concatenate([p[2] for p in parts]),
+        'n_sims': n_sims,
+        'method': method,
+        'ruin_level': ruin_level,
+    }
+
+def summarize(sim, percentiles=(5, 25, 50, 75, 95)):
+    """Verdelingen samengevat: percentielen drawdown/rendement + ruin kans."""
+    dd = np.percentile(sim['max_drawdown'], percentiles)
+    ret = np.percentile(sim['final_return'], percentiles)
+    return {
+        'n_sims': sim['n_sims'],
+        'method': sim['method'],
+        'ruin_probability': float(sim['ruined'].mean()),
+        'max_drawdown': {f"p{p}": float(v) for p, v in zip(percentiles, dd)},
+        'final_return': {f"p{p}": float(v) for p, v in zip(percentiles, ret)},
+        'prob_loss': float((sim['final_return'] < 0).mean()),
+    }
+
+# =============================================================================
+# MAIN
+# =============================================================================
+if __name__ == "__main__":
+    import sys
+    import time
+    import data_handler
+    import event_log
+    import backtest_engine
+
+    if not data_handler.initialize_mt5():
+        sys.exit(1)
+    df = data_handler.get_data(config.SYMBOL, config.TIMEFRAME_MT5, config.START_DATE, config.END_DATE)
+    data_handler.shutdown_mt5()
+    if df is None:
+        sys.exit(1)
+
+    with event_log.use_sink(event_log.NullSink()):
+        results = backtest_engine.run_backtest(df, {'ema_fast': config.EMA_FAST_DEFAULT,
+                                                    'ema_slow': config.EMA_SLOW_DEFAULT})
+    pnl = trade_pnl(results)
+    print(f"\n🎲 Monte Carlo: {config.MC_SIMULATIONS:,} x {config.MC_METHOD} op {len(pnl)} trades...")
+    t0 = time.perf_counter()
+    summary = summarize(simulate(pnl, n_workers=None))
+    print(f"✅ Klaar in {time.perf_counter() - t0:.1f}s")
+    print(f"   Ruin kans (-{config.MC_RUIN_LEVEL*100:.0f}%): {summary['ruin_probability']*100:.2f}%")
+    print(f"   Kans op verlies: {summary['prob_loss']*100:.2f}%")
+    for key in ('max_drawdown', 'final_return'):
+        row = ' | '.join(f"{p}: {v*100:.2f}%" for p, v in summary[key].items())
+        print(f"   {key}: {row}")
@@ -0,0 +1,217 @@
+﻿# =============================================================================
+# ONLINE STATS — Equity/drawdown/trade statistieken met O(1) updates
+# =============================================================================
+# Voor forward tests die maanden draaien: per bar (equity) en per trade (pnl)
+# een update van een paar floats, in plaats van achteraf cummax over de hele
+# equity curve. Rolling Sharpe via een ring buffer met lopende sommen.
+# snapshot()/restore() zijn kleine JSON-dicts, dus een herstart hoeft geen
+# historie opnieuw af te spelen.
+# Conventies als metrics.py: pnl <= 0 telt als verlies, profit factor 999
+# zonder verliezen, drawdown als (equity - peak) / peak (<= 0).
+# =============================================================================
+import json
+import math
+import os
+import numpy as np
+import config
+import metrics
+
+class OnlineStats:
+    """
+    initial_capital: start equity (en start peak)
+    window: aantal bars voor de rolling Sharpe
+    timeframe_str: voor annualisatie (default config.TIMEFRAME_MT5)
+    """
+    __slots__ = ('initial_capital', 'window', 'timeframe_str', 'equity', 'peak',
+                 'max_drawdown', 'bars', 'trades', 'wins', 'losses', 'gross_win',
+                 'gross_loss', '_returns', '_pos', '_count', '_sum', '_sum_sq')
+
+    def __init__(self, initial_capital=None, window=None, timeframe_str=None):
+        self.initial_capital = initial_capital or config.INITIAL_CAPITAL
+        self.window = window or config.ONLINE_SHARPE_WINDOW
+        self.timeframe_str = timeframe_str or config.TIMEFRAME_MT5
+        self.equity = self.initial_capital
+        self.peak = self.initial_capital
+        self.max_drawdown = 0.0
+        self.bars = 0
+        self.trades = 0
+        self.wins = 0
+        self.losses = 0
+        self.gross_win = 0.0
+        self.gross_loss = 0.0
+        self._returns = [0.0] * self.window   # Ring buffer met per-bar rendementen
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    # ----- UPDATES -----
+
+    def update_bar(self, equity):
+        """Equity aan het eind van een bar."""
+        prev = self.equity
+        self.equity = equity
+        self.bars += 1
+        if equity > self.peak:
+            self.peak = equity
+        else:
+            dd = (equity - self.peak) / self.peak
+            if dd < self.max_drawdown:
+                self.max_drawdown = dd
+        self._push_return((equity - prev) / prev if prev else 0.0)
+
+    def add_trade(self, pnl):
+        """Gesloten trade (pnl in account valuta)."""
+        self.trades += 1
+        if pnl > 0:
+            self.wins += 1
+            self.gross_win += pnl
+        else:
+            self.losses += 1
+            self.gross_loss -= pnl
+
+    def extend(self, equity, trade_pnl=()):
+        """
+        Bulk update (backtest engines): equity per bar + pnl per trade.
+        Zelfde eindstate als update_bar/add_trade per element, maar met
+        NumPy over de arrays.
+        """
+        equity = np.asarray(equity, dtype=np.float64)
+        if len(equity) > 0:
+            peaks = np.maximum.accumulate(np.r_[self.peak, equity])[1:]
+            dd = float(((equity - peaks) / peaks).min())
+            self.max_drawdown = min(self.max_drawdown, dd)
+            self.peak = float(peaks[-1])
+
+            prev = np.r_[self.equity, equity[:-1]]
+            returns = np.divide(equity - prev, prev, out=np.zeros(len(equity)), where=prev != 0)
+            for r in returns[-self.window:].tolist():
+                self._push_return(r)
+            self.equity = float(equity[-1])
+            self.bars += len(equity)
+
+        pnl = np.asarray(trade_pnl, dtype=np.float64)
+        if len(pnl) > 0:
+            is_win = pnl > 0
+            self.trades += len(pnl)
+            self.wins += int(is_win.sum())
+            self.losses += int((~is_win).sum())
+            self.gross_win += float(pnl[is_win].sum())
+            self.gross_loss -= float(pnl[~is_win].sum())
+
+    def _push_return(self, r):
+        old = self._returns[self._pos]
+        self._returns[self._pos] = r
+        self._pos = (self._pos + 1) % self.window
+        if self._count < self.window:
+            self._count += 1
+        else:
+            self._sum -= old
+            self._sum_sq -= old * old
+        self._sum += r
+        self._sum_sq += r * r
+        if self._pos == 0:
+            # Eén keer per window opnieuw optellen: geen drift in de lopende sommen
+            values = self._returns[:self._count]
+            self._sum = math.fsum(values)
+            self._sum_sq = math.fsum(v * v for v in values)
+
+    # ----- STATISTIEKEN -----
+
+    @property
+    def drawdown(self):
+        """Huidige drawdown t.o.v. de running peak (<= 0)."""
+        return (self.equity - self.peak) / self.peak
+
+    @property
+    def net_profit(self):
+        return self.equity - self.initial_capital
+
+    @property
+    def win_rate(self):
+        return self.wins / self.trades if self.trades else 0
+
+    @property
+    def profit_factor(self):
+        if self.trades == 0:
+            return 0
+        return self.gross_win / self.gross_loss if self.gross_loss > 0 else 999
+
+    @property
+    def rolling_sharpe(self):
+        """Geannualiseerde Sharpe over de laatste window bars (0 bij < 3 bars)."""
+        n = self._count
+        if n < 3:
+            return 0.0
+        mean = self._sum / n
+        var = (self._sum_sq - n * mean * mean) / (n - 1)
+        if var <= 0:
+            return 0.0
+        return float(mean / math.sqrt(var) * math.sqrt(metrics.periods_per_year(self.timeframe_str)))
+
+    def summary(self):
+        return {
+            'equity': self.equity,
+            'net_profit': self.net_profit,
+            'peak': self.peak,
+            'drawdown': self.drawdown,
+            'max_drawdown': self.max_drawdown,
+            'bars': self.bars,
+            'trades': self.trades,
+            'wins': self.wins,
+            'losses': self.losses,
+            'win_rate': self.win_rate,
+            'profit_factor': self.profit_factor,
+            'rolling_sharpe': self.rolling_sharpe,
+        }
+
+    # ----- SNAPSHOT / RESTORE -----
+
+    def snapshot(self):
+        """Volledige state als JSON-baar dict (ring buffer op volgorde, oud → nieuw)."""
+        if self._count == self.window:
+            returns = self._returns[self._pos:] + self._returns[:self._pos]
+        else:
+            returns = self._returns[:self._count]
+        return {
+            'initial_capital': self.initial_capital,
+            'window': self.window,
+            'timeframe_str': self.timeframe_str,
+            'equity': self.equity,
+            'peak': self.peak,
+            'max_drawdown': self.max_drawdown,
+            'bars': self.bars,
+            'trades': self.trades,
+            'wins': self.wins,
+            'losses': self.losses,
+            'gross_win': self.gross_win,
+            'gross_loss': self.gross_loss,
+            'returns': returns,
+        }
+
+    @classmethod
+    def restore(cls, snap):
+        stats = cls(snap['initial_capital'], snap['window'], snap['timeframe_str'])
+        for key in ('equity', 'peak', 'max_drawdown', 'bars', 'trades', 'wins', 'losses',
+                    'gross_win', 'gross_loss'):
+            setattr(stats, key, snap[key])
+        for r in snap['returns']:
+            stats._push_return(r)
+        return stats
+
+    def save(self, path):
+        """Snapshot atomisch naar JSON (tmp + replace)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Restore uit path; bestaat die niet, dan een nieuwe OnlineStats(**kwargs)."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls.restore(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return cls(**kwargs)
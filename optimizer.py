@@ -0,0 +1,239 @@
+﻿# =============================================================================
+# OPTIMIZER — Parallelle grid search over config.OPTIMIZE_RANGES
+# =============================================================================
+# Elke combinatie is een volledige run_backtest. De OHLC data wordt één keer
+# in shared memory gezet; workers lezen die zonder per-task pickling.
+# Optioneel gaan resultaten per combinatie naar het journal (journal.py); een
+# afgebroken sweep draait bij een herstart alleen de ontbrekende combinaties.
+# =============================================================================
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import pandas as pd
+import numpy as np
+import config
+import backtest_engine
+import event_log
+import journal as results_journal
+import profiling
+
+# Metrics uit run_backtest die in de ranking DataFrame komen
+METRIC_COLUMNS = [
+    'net_profit', 'final_equity', 'total_trades', 'win_rate', 'profit_factor',
+    'max_drawdown', 'total_costs', 'avg_win', 'avg_loss', 'sharpe', 'sortino',
+    'expectancy', 'exposure', 'aborted'
+]
+
+# Worker state (gezet door _init_worker)
+_worker_df = None
+_worker_shm = []
+
+def expand_grid(ranges=None):
+    """
+    Alle parameter combinaties uit OPTIMIZE_RANGES.
+    Combinaties met ema_fast >= ema_slow worden overgeslagen.
+    """
+    ranges = ranges or config.OPTIMIZE_RANGES
+    keys = list(ranges.keys())
+
+    grid = []
+    for values in itertools.product(*(ranges[k] for k in keys)):
+        params = dict(zip(keys, values))
+        if 'ema_fast' in params and 'ema_slow' in params and params['ema_fast'] >= params['ema_slow']:
+            continue
+        grid.append(params)
+    return grid
+
+# ----- SHARED MEMORY -----
+
+def share_frame(df):
+    """
+    Zet een OHLC DataFrame in shared memory.
+    Returns: (spec voor workers, lijst met SharedMemory blocks om op te ruimen)
+    """
+    columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    values = np.ascontiguousarray(df[columns].to_numpy(dtype=np.float64))
+    times = np.ascontiguousarray(df.index.to_numpy(dtype='datetime64[ns]').view(np.int64))
+
+    blocks = []
+    spec = {'columns': columns, 'shape': values.shape, 'index_name': df.index.name}
+    for key, arr in (('values', values), ('times', times)):
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        spec[key] = shm.name
+        blocks.append(shm)
+    return spec, blocks
+
+def attach_frame(spec):
+    """
+    Bouw een DataFrame bovenop de shared memory blocks (zonder kopie).
+    Returns: (DataFrame, lijst met SharedMemory blocks die open moeten blijven)
+    """
+    values_shm = shared_memory.SharedMemory(name=spec['values'])
+    times_shm = shared_memory.SharedMemory(name=spec['times'])
+
+    n_rows, n_cols = spec['shape']
+    values = np.ndarray((n_rows, n_cols), dtype=np.float64, buffer=values_shm.buf)
+    times = np.ndarray((n_rows,), dtype=np.int64, buffer=times_shm.buf)
+
+    index = pd.DatetimeIndex(times.view('datetime64[ns]'), name=spec['index_name'])
+    df = pd.DataFrame(values, index=index, columns=spec['columns'], copy=False)
+    return df, [values_shm, times_shm]
+
+def release_frame(blocks):
+    """Sluit en verwijder de shared memory blocks (alleen in de parent)."""
+    for shm in blocks:
+        try:
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+# ----- WORKERS -----
+
+def _init_worker(spec, sink, profile_cfg=None):
+    global _worker_df, _worker_shm
+    event_log.set_sink(sink)
+    profiling.init_worker(profile_cfg)
+    _worker_df, _worker_shm = attach_frame(spec)
+
+def _evaluate(params, initial_capital, engine, abort_drawdown):
+    """Eén grid punt. Geeft alleen scalars terug (geen equity/trades pickling)."""
+    profiling.begin_task()
+    t0 = time.perf_counter()
+    results = backtest_engine.run_backtest(
+        _worker_df, params, initial_capital,
+        engine=engine, abort_drawdown=abort_drawdown, scalars_only=True
+    )
+    row = dict(params)
+    for key in METRIC_COLUMNS:
+        row[key] = results.get(key)
+    row['runtime_sec'] = time.perf_counter() - t0
+    row['_profile'] = profiling.end_task()
+    return row
+
+# ----- GRID SEARCH -----
+
+def run_grid_search(df, ranges=None, initial_capital=None, n_workers=None,
+                    abort_drawdown=None, engine='numpy', sort_by='net_profit', sink=None,
+                    profiler=None, journal=None):
+    """
+    Draai alle combinaties uit ranges (default config.OPTIMIZE_RANGES).
+
+    n_workers: aantal processen (default os.cpu_count(); 1 = in-process)
+    abort_drawdown: combo's stoppen zodra drawdown dieper gaat dan deze fractie
+    sink: event sink tijdens de sweep (default NullSink)
+    profiler: profiling.Profiler die stage timers/counters van alle workers
+    verzamelt (default profiling.get_profiler(); uit = NullProfiler)
+    journal: journal.Journal, pad of True (RESULTS_DIR/JOURNAL_FILE), default
+    None = geen journal; combinaties die er al in staan worden niet opnieuw gedraaid
+
+    Returns: DataFrame met params + metrics, gerankt op sort_by (aflopend).
+    Afgebroken combo's staan altijd onderaan.
+    """
+    global _worker_df
+    grid = expand_grid(ranges)
+    if not grid:
+        return pd.DataFrame()
+
+    sink = sink or event_log.NullSink()
+    profiler = profiler or profiling.get_profiler()
+    if profiler.enabled:
+        profiler.clear_cprofile_dumps()
+    rows = []
+
+    # Journal: eerder geëvalueerde combinaties overnemen, de rest per stuk wegschrijven
+    jrnl = results_journal.open_journal(journal)
+    keys = [None] * len(grid)
+    if jrnl is not None:
+        version = results_journal.data_version(df)
+        cap = initial_capital or config.INITIAL_CAPITAL
+        todo = []
+        for params in grid:
+            key = results_journal.params_key(params, initial_capital=cap, engine=engine,
+                                             abort_drawdown=abort_drawdown)
+            hit = jrnl.get(version, key)
+            if hit is not None:
+                rows.append(dict(hit))
+            else:
+                todo.append((params, key))
+        if rows:
+            print(f"🔁 Journal: {len(rows)}/{len(grid)} combinaties al geëvalueerd")
+        grid = [params for params, _ in todo]
+        keys = [key for _, key in todo]
+
+    def record(i, row):
+        if jrnl is not None:
+            jrnl.append(version, keys[i], {k: v for k, v in row.items() if k != '_profile'}, grid[i])
+        rows.append(row)
+
+    n_workers = n_workers or os.cpu_count() or 1
+    n_workers = min(n_workers, len(grid))
+
+    if n_workers == 1:
+        _worker_df = df
+        try:
+            with event_log.use_sink(sink), profiling.use_profiler(profiler):
+                for i, params in enumerate(grid):
+                    record(i, _evaluate(params, initial_capital, engine, abort_drawdown))
+        finally:
+            _worker_df = None
+    elif n_workers > 1:
+        spec, blocks = share_frame(df)
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(spec, sink, profiling.worker_config(profiler))) as pool:
+                futures = {
+                    pool.submit(_evaluate, params, initial_capital, engine, abort_drawdown): i
+                    for i, params in enumerate(grid)
+                }
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+        finally:
+            release_frame(blocks)
+
+    for row in rows:
+        profiler.merge(row.pop('_profile', None))
+    return rank_results(pd.DataFrame(rows), sort_by)
+
+def rank_results(results_df, sort_by='net_profit'):
+    """Sorteer: niet-afgebroken eerst, dan sort_by aflopend. Voegt 'rank' toe."""
+    if len(results_df) == 0:
+        return results_df
+
+    results_df = results_df.sort_values(['aborted', sort_by], ascending=[True, False])
+    results_df = results_df.reset_index(drop=True)
+    results_df.insert(0, 'rank', np.arange(1, len(results_df) + 1))
+    return results_df
+
+# =============================================================================
+# MAIN
+# =============================================================================
+if __name__ == "__main__":
+    import data_handler
+
+    if not data_handler.initialize_mt5():
+        sys.exit(1)
+    df = data_handler.get_data(config.SYMBOL, config.TIMEFRAME_MT5, config.START_DATE, config.END_DATE)
+    data_handler.shutdown_mt5()
+
+    if df is None:
+        sys.exit(1)
+
+    grid = expand_grid()
+    print(f"\n🔄 Grid search: {len(grid)} combinaties op {os.cpu_count()} cores...")
+    t0 = time.perf_counter()
+    ranked = run_grid_search(df, abort_drawdown=0.5, journal=config.JOURNAL_RESUME)
+    print(f"✅ Klaar in {time.perf_counter() - t0:.1f}s\n")
+    print(ranked.head(10).to_string(index=False))
+    if config.PROFILING:
+        print(profiling.get_profiler().report())
+
+    if config.SAVE_RESULTS:
+        os.makedirs(config.RESULTS_DIR, exist_ok=True)
+        path = os.path.join(config.RESULTS_DIR, f"grid_search_{config.SYMBOL}_{config.TIMEFRAME_MT5}.csv")
+        ranked.to_csv(path, index=False)
+        print(f"\n💾 Resultaten opgeslagen: {path}")
@@ -0,0 +1,281 @@
+﻿# =============================================================================
+# PORTFOLIO — Multi-symbol backtest op één gedeelde klok
+# =============================================================================
+# N symbolen worden uitgelijnd op de unie van hun timestamps en in één pass
+# afgespeeld met één gedeelde equity. Per bar worden alleen symbolen met een
+# event bekeken (open positie of signaal); de rest kost niets. Point, point
+# value en kosten komen per symbool uit config.SYMBOL_SPECS; PnL, lot sizing
+# en kosten rekenen allemaal via point_value (USD per point per 0.1 lot).
+# =============================================================================
+import numpy as np
+import pandas as pd
+import config
+import indicators
+import records
+import strategy
+from backtest_engine import calculate_trade_costs
+
+def symbol_spec(symbol, specs=None):
+    """Spec voor een symbool; onbekende symbolen krijgen de EURUSD/config waarden."""
+    specs = specs if specs is not None else config.SYMBOL_SPECS
+    spec = {
+        'point': 0.00001,
+        'point_value': 0.10,
+        'contract_size': 100000,
+        'spread_points': config.SPREAD_POINTS_AVG,
+        'slippage_points': config.SLIPPAGE_POINTS_AVG,
+        'commission_per_lot': config.COMMISSION_PER_LOT,
+    }
+    spec.update(specs.get(symbol, {}))
+    return spec
+
+def prepare_signals(frames, params):
+    """Indicatoren + signalen per symbool (EMA's via de indicator cache)."""
+    prepared = {}
+    for symbol, df in frames.items():
+        df = indicators.calculate_all_indicators(df.copy(), params=params)
+        prepared[symbol] = strategy.generate_final_signals(df, params)
+    return prepared
+
+def align_frames(frames, columns=('high', 'low', 'close', 'signal')):
+    """
+    Lijn alle symbolen uit op de unie van hun indices.
+    Returns: (index, {kolom: 2D array [bars, symbolen]}); ontbrekende bars = NaN
+    (signal = 0)
+    """
+    symbols = list(frames)
+    index = frames[symbols[0]].index
+    for symbol in symbols[1:]:
+        index = index.union(frames[symbol].index)
+
+    aligned = {}
+    for col in columns:
+        fill = 0 if col == 'signal' else np.nan
+        mat = np.full((len(index), len(symbols)), fill, dtype=np.float64)
+        for j, symbol in enumerate(symbols):
+            df = frames[symbol]
+            pos = index.get_indexer(df.index)
+            mat[pos, j] = df[col].to_numpy(dtype=np.float64)
+        aligned[col] = mat
+    return index, aligned
+
+def run_portfolio(frames, params=None, initial_capital=None, specs=None):
+    """
+    frames: {symbool: OHLC DataFrame}
+    Returns: dict met portfolio metrics, equity_curve, trades en per_symbol
+    """
+    params = params or {}
+    cap = initial_capital or config.INITIAL_CAPITAL
+    symbols = list(frames)
+    prepared = prepare_signals(frames, params)
+    index, aligned = align_frames(prepared)
+    equity_arr, trade_log, equity = _portfolio_kernel(
+        aligned['high'], aligned['low'], aligned['close'], aligned['signal'],
+        [symbol_spec(s, specs) for s in symbols], cap
+    )
+
+    trades = trade_log.to_dicts(index)
+    for trade, j in zip(trades, trade_log.column('symbol').tolist()):
+        trade['symbol'] = symbols[j]
+
+    equity_df = pd.DataFrame({'equity': equity_arr}, index=index.copy())
+    equity_df.index.name = 'time'
+    if len(equity_df) > 0:
+        peak = np.maximum.accumulate(equity_arr)
+        max_drawdown = float(((equity_arr - peak) / peak).min())
+    else:
+        max_drawdown = 0
+
+    pnls = {symbol: [] for symbol in symbols}
+    for t in trades:
+        pnls[t['symbol']].append(t['pnl'])
+    per_symbol = {}
+    for symbol, values in pnls.items():
+        wins = sum(1 for p in values if p > 0)
+        per_symbol[symbol] = {
+            'trades': len(values),
+            'gross_pnl': float(sum(values)),
+            'win_rate': wins / len(values) if values else 0,
+        }
+
+    return {
+        'params': params,
+        'symbols': symbols,
+        'net_profit': equity - cap,
+        'final_equity': equity,
+        'total_trades': len(trades),
+        'max_drawdown': max_drawdown,
+        'per_symbol': per_symbol,
+        'equity_curve': equity_df,
+        'trades': trades,
+    }
+
+def _portfolio_kernel(high, low, close, signal, specs, cap):
+    """
+    Per symbool dezelfde state machine als backtest_engine._bar_loop_kernel,
+    maar met point/point value/kosten uit de spec en één gedeelde equity.
+    Volgorde per bar: eerst exits van open posities, dan entries (in
+    symbool volgorde, lot sizing op de equity van dat moment).
+
+    Returns: (equity per bar, records.TradeLog met symbool index, eind equity)
+    """
+    n, m = close.shape
+    equity_arr = np.empty(n, dtype=np.float64)
+    trade_log = records.TradeLog()
+
+    # Per symbool lijsten (kolommen) voor snelle scalar toegang
+    highs = high.T.tolist()
+    lows = low.T.tolist()
+    closes = close.T.tolist()
+
+    # Event index: per bar de symbolen met een signaal
+    sig_bars, sig_syms = np.nonzero(signal)
+    sig_vals = signal[sig_bars, sig_syms].astype(np.int64).tolist()
+    events = {}
+    for t, j, v in zip(sig_bars.tolist(), sig_syms.tolist(), sig_vals):
+        events.setdefault(t, []).append((j, v))
+
+    sl_dist = [config.STOP_LOSS_POINTS * s['point'] for s in specs]
+    tp_dist = [config.TAKE_PROFIT_POINTS * s['point'] for s in specs]
+    trail_dist = [config.TRAILING_STOP_POINTS * s['point'] for s in specs]
+    points = [s['point'] for s in specs]
+    point_values = [s['point_value'] for s in specs]   # USD per point per 0.1 lot (als sizing/kosten)
+    trail_on = config.TRAILING_STOP_ACTIVATION > 0
+    trail_activation = config.TRAILING_STOP_ACTIVATION
+    entry_sl_dist = config.STOP_LOSS_POINTS * 0.01  # Zelfde initiele SL als de bar engines
+
+    equity = cap
+    # Open posities: symbool_idx → [position, entry_price, entry_i, lot_size, current_sl]
+    open_pos = {}
+    last_valid = [-1] * m
+
+    for i in range(n):
+        todo = events.get(i)
+        if not open_pos and todo is None:
+            equity_arr[i] = equity
+            continue
+
+        # 1. Exits
+        for j in list(open_pos):
+            c = closes[j][i]
+            if c != c:   # Geen bar voor dit symbool (NaN)
+                continue
+            last_valid[j] = i
+            hi = highs[j][i]
+            lo = lows[j][i]
+            position, entry_price, entry_i, lot_size, current_sl = open_pos[j]
+
+            if position == 1:
+                if trail_on and (c - entry_price) / points[j] >= trail_activation:
+                    trailed_sl = max(entry_price - sl_dist[j], c - trail_dist[j])
+                    current_sl = max(current_sl, trailed_sl)
+
+                sl_price = entry_price - sl_dist[j]
+                if lo <= sl_price:
+                    exit_reason, exit_price = 'SL', sl_price
+                elif hi >= entry_price + tp_dist[j]:
+                    exit_reason, exit_price = 'TP', entry_price + tp_dist[j]
+                else:
+                    exit_reason, exit_price = 'CONTINUE', None
+                hit = exit_reason != 'CONTINUE' or lo <= current_sl
+            else:
+                if trail_on and (entry_price - c) / points[j] >= trail_activation:
+                    trailed_sl = min(entry_price + sl_dist[j], c + trail_dist[j])
+                    current_sl = min(current_sl, trailed_sl)
+
+                sl_price = entry_price + sl_dist[j]
+                if hi >= sl_price:
+                    exit_reason, exit_price = 'SL', sl_price
+                elif lo <= entry_price - tp_dist[j]:
+                    exit_reason, exit_price = 'TP', entry_price - tp_dist[j]
+                else:
+                    exit_reason, exit_price = 'CONTINUE', None
+                hit = exit_reason != 'CONTINUE' or hi >= current_sl
+
+            if hit:
+                if exit_price is not None:
+                    diff = exit_price - entry_price if position == 1 else entry_price - exit_price
+                    pnl = (diff / points[j]) * point_values[j] * (lot_size / 0.1)
+                else:
+                    pnl = 0  # Safety fallback (trailing SL zonder exit prijs)
+
+                equity += pnl
+                trade_log.append(
+                    entry_i, i, position, entry_price, exit_price, lot_size, pnl,
+                    exit_reason if exit_reason in ('SL', 'TP') else 'SIGNAL', j
+                )
+                del open_pos[j]
+            else:
+                open_pos[j][4] = current_sl
+
+        # 2. Entries
+        if todo is not None:
+            for j, sig in todo:
+                if j in open_pos:
+                    continue
+                if equity <= 0:
+                    equity = cap
+
+                spec = specs[j]
+                lot_size = strategy.calculate_dynamic_lot_size(
+                    equity, config.RISK_PER_TRADE_PCT,
+                    config.STOP_LOSS_POINTS, config.SYMBOL,
+                    spec['point_value']
+                )
+                equity -= calculate_trade_costs(
+                    lot_size,
+                    spec['spread_points'],
+                    spec['slippage_points'],
+                    spec['commission_per_lot'],
+                    spec['point_value']
+                )
+
+                entry_price = closes[j][i]
+                current_sl = entry_price - entry_sl_dist if sig == 1 else \
+                            entry_price + entry_sl_dist
+                open_pos[j] = [sig, entry_price, i, lot_size, current_sl]
+                last_valid[j] = i
+
+        # 3. Equity
+        equity_arr[i] = equity
+
+    # Sluit open posities aan einde (laatste bar van elk symbool)
+    for j, (position, entry_price, entry_i, lot_size, _) in open_pos.items():
+        col = closes[j]
+        k = n - 1
+        while k > last_valid[j] and col[k] != col[k]:
+            k -= 1
+        exit_price = col[k]
+        diff = exit_price - entry_price if position == 1 else entry_price - exit_price
+        pnl = (diff / points[j]) * point_values[j] * (lot_size / 0.1)
+        equity += pnl
+        trade_log.append(entry_i, k, position, entry_price, exit_price, lot_size, pnl, 'END_OF_TEST', j)
+
+    return equity_arr, trade_log, equity
+
+# =============================================================================
+# MAIN
+# =============================================================================
+if __name__ == "__main__":
+    import data_handler
+    import event_log
+
+    if not data_handler.initialize_mt5():
+        raise SystemExit(1)
+
+    frames = {}
+    for symbol in config.SYMBOLS:
+        df = data_handler.get_data(symbol, config.TIMEFRAME_MT5, config.START_DATE, config.END_DATE)
+        if df is not None:
+            frames[symbol] = df
+    data_handler.shutdown_mt5()
+
+    with event_log.use_sink(event_log.NullSink()):
+        result = run_portfolio(frames, {'ema_fast': config.EMA_FAST_DEFAULT,
+                                        'ema_slow': config.EMA_SLOW_DEFAULT})
+
+    print(f"\n💼 Portfolio: {len(frames)} symbolen, {result['total_trades']} trades")
+    print(f"   Net profit: ${result['net_profit']:.2f} | Max DD: {result['max_drawdown']*100:.2f}%")
+    for symbol, stats in result['per_symbol'].items():
+        print(f"   {symbol}: {stats['trades']} trades, PnL ${stats['gross_pnl']:.2f}, "
+              f"win rate {stats['win_rate']*100:.1f}%")
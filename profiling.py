@@ -0,0 +1,208 @@
+﻿# =============================================================================
+# PROFILING — Opt-in stage timers, counters en cProfile hook
+# =============================================================================
+# Zelfde patroon als event_log: één proces-brede profiler. Default is de
+# NullProfiler (stage() geeft een gedeelde no-op context, count() doet niets),
+# dus uitgeschakeld kost instrumentatie vrijwel niets.
+# Workers geven hun snapshot() terug met het resultaat; de parent merget die
+# tot één rapport. cProfile stats per worker gaan naar PROFILE_CPROFILE_DIR.
+# =============================================================================
+import cProfile
+import glob
+import io
+import os
+import pstats
+import time
+from contextlib import contextmanager, nullcontext
+import config
+
+_NULL_STAGE = nullcontext()
+
+class NullProfiler:
+    """Profiling uit: alle hooks zijn no-ops."""
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def count(self, name, n=1):
+        pass
+
+    def snapshot(self):
+        return None
+
+    def drain(self):
+        return None
+
+    def merge(self, snapshot):
+        pass
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 't0')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        entry = self.profiler.stages.get(self.name)
+        if entry is None:
+            self.profiler.stages[self.name] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+        return False
+
+class Profiler(NullProfiler):
+    """
+    stages: naam → [aantal calls, totale seconden] (geneste stages tellen
+    ook mee in de omliggende stage)
+    counters: naam → totaal
+    cprofile_dir: map voor cProfile dumps (None = geen cProfile)
+    """
+    enabled = True
+
+    def __init__(self, cprofile_dir=None):
+        self.stages = {}
+        self.counters = {}
+        self.cprofile_dir = cprofile_dir
+        self._cprofile = None
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def start_cprofile(self):
+        """(Her)start cProfile; stats lopen door over meerdere tasks."""
+        if self.cprofile_dir is None:
+            return
+        if self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+        self._cprofile.enable()
+
+    def stop_cprofile(self):
+        """Pauzeer cProfile en schrijf de stats tot nu toe naar cprofile_dir (één bestand per pid)."""
+        if self._cprofile is None:
+            return None
+        self._cprofile.disable()
+        os.makedirs(self.cprofile_dir, exist_ok=True)
+        path = os.path.join(self.cprofile_dir, f"yave-{os.getpid()}.prof")
+        self._cprofile.dump_stats(path)
+        return path
+
+    def clear_cprofile_dumps(self):
+        """Verwijder dumps van een vorige run (voor een nieuwe sweep)."""
+        if self.cprofile_dir is None:
+            return
+        for path in glob.glob(os.path.join(self.cprofile_dir, 'yave-*.prof')):
+            os.remove(path)
+
+    def snapshot(self):
+        """Kopie van stages + counters (picklebaar, voor over process grenzen)."""
+        return {
+            'stages': {k: list(v) for k, v in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+    def drain(self):
+        """snapshot() en daarna leegmaken (per worker task)."""
+        snap = self.snapshot()
+        self.reset()
+        return snap
+
+    def merge(self, snapshot):
+        if not snapshot:
+            return
+        for name, (calls, seconds) in snapshot['stages'].items():
+            entry = self.stages.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+        for name, n in snapshot['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+
+    def report(self, top=20):
+        """Leesbaar rapport: stages op totale tijd, counters, cProfile top."""
+        lines = ["⏱  Stage timing (totaal over alle processen):"]
+        for name, (calls, seconds) in sorted(self.stages.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"   {name:<22} {seconds*1000:>10.1f} ms  {calls:>8} calls  "
+                         f"{seconds/calls*1000:>8.3f} ms/call")
+        if self.counters:
+            lines.append("🔢 Counters:")
+            for name, n in sorted(self.counters.items()):
+                lines.append(f"   {name:<22} {n:>12,}")
+        stats = self.cprofile_stats()
+        if stats is not None:
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(top)
+            lines.append(f"🔬 cProfile (top {top}):")
+            lines.append(out.getvalue())
+        return '\n'.join(lines)
+
+    def cprofile_stats(self):
+        """Alle cProfile dumps in cprofile_dir samengevoegd (of None)."""
+        if self.cprofile_dir is None:
+            return None
+        paths = sorted(glob.glob(os.path.join(self.cprofile_dir, 'yave-*.prof')))
+        if not paths:
+            return None
+        return pstats.Stats(*paths)
+
+_profiler = None
+
+def get_profiler():
+    """Huidige proces-brede profiler (default uit config.PROFILING)."""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(config.PROFILE_CPROFILE_DIR) if config.PROFILING else NullProfiler()
+    return _profiler
+
+def set_profiler(profiler):
+    """Vervang de proces-brede profiler. Returns: de vorige profiler."""
+    global _profiler
+    previous = _profiler
+    _profiler = profiler
+    return previous
+
+# ----- WORKERS -----
+
+def worker_config(profiler):
+    """Picklebare config voor workers (None = profiling uit)."""
+    return {'cprofile_dir': profiler.cprofile_dir} if profiler.enabled else None
+
+def init_worker(worker_cfg):
+    """In de worker initializer: eigen profiler van hetzelfde soort."""
+    set_profiler(Profiler(**worker_cfg) if worker_cfg else NullProfiler())
+
+def begin_task():
+    prof = get_profiler()
+    if prof.enabled:
+        prof.start_cprofile()
+
+def end_task():
+    """Returns: snapshot van deze task (profiler daarna leeg) of None."""
+    prof = get_profiler()
+    if not prof.enabled:
+        return None
+    prof.stop_cprofile()
+    return prof.drain()
+
+@contextmanager
+def use_profiler(profiler):
+    """Tijdelijk een andere profiler (bv. Profiler() rond één sweep)."""
+    previous = set_profiler(profiler)
+    try:
+        yield profiler
+    finally:
+        set_profiler(previous)
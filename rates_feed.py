@@ -0,0 +1,58 @@
+﻿# =============================================================================
+# RATES FEED — Backtrader data feed direct op een NumPy rates array
+# =============================================================================
+# Leest records in het copy_rates_range formaat (bar_store.RATES_DTYPE),
+# in-memory of als memmap uit de bar store. Geen CSV schrijven/parsen:
+# timestamps worden één keer vectorized omgezet naar backtrader date nums.
+# Werkt met preload=True/False en runonce=True/False.
+# =============================================================================
+import backtrader as bt
+import numpy as np
+
+# bt.date2num(datetime(1970, 1, 1))
+EPOCH_DATENUM = 719163.0
+
+def epoch_to_datenum(seconds):
+    """Epoch seconds (array) → backtrader float date nums (naive, zoals de CSV feed)."""
+    return np.asarray(seconds, dtype=np.float64) / 86400.0 + EPOCH_DATENUM
+
+class NumpyRatesData(bt.feed.DataBase):
+    """
+    dataname: structured array met time/open/high/low/close + volume veld.
+
+    Voorbeeld:
+        rates = store.get_rates("EURUSD", "M15", start, end)
+        data = NumpyRatesData(dataname=rates, timeframe=bt.TimeFrame.Minutes, compression=15)
+    """
+    params = (
+        ('volume_field', 'tick_volume'),
+    )
+
+    def start(self):
+        super(NumpyRatesData, self).start()
+        rates = self.p.dataname
+        # Kolom views (geen kopie), alleen de datetime kolom wordt omgerekend
+        self._datenum = epoch_to_datenum(rates['time'])
+        self._open = rates['open']
+        self._high = rates['high']
+        self._low = rates['low']
+        self._close = rates['close']
+        self._volume = rates[self.p.volume_field]
+        self._n = len(rates)
+        self._idx = -1
+
+    def _load(self):
+        self._idx += 1
+        i = self._idx
+        if i >= self._n:
+            return False
+
+        lines = self.lines
+        lines.datetime[0] = float(self._datenum[i])
+        lines.open[0] = float(self._open[i])
+        lines.high[0] = float(self._high[i])
+        lines.low[0] = float(self._low[i])
+        lines.close[0] = float(self._close[i])
+        lines.volume[0] = float(self._volume[i])
+        lines.openinterest[0] = 0.0
+        return True
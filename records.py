@@ -0,0 +1,211 @@
+﻿# =============================================================================
+# RECORDS — Gedeeld Position/Trade datamodel
+# =============================================================================
+# Position: positie lifecycle (entry, trailing, SL/TP, time exit) als één
+# __slots__ object, voor de bar-voor-bar paden (backtrader, live).
+# TradeLog: trades als NumPy structured array (TRADE_DTYPE) voor de batch
+# engines; kolommen zijn direct bruikbaar voor metrics en export.
+# =============================================================================
+import numpy as np
+import pandas as pd
+
+REASONS = ('SL', 'TP', 'SIGNAL', 'END_OF_TEST', 'TRAIL', 'TIME')
+REASON_CODES = {reason: code for code, reason in enumerate(REASONS)}
+
+TRADE_DTYPE = np.dtype([
+    ('symbol', '<i4'),        # Symbool index (portfolio), anders 0
+    ('side', 'i1'),           # 1 long, -1 short
+    ('reason', 'u1'),         # Index in REASONS
+    ('entry_idx', '<i8'),
+    ('exit_idx', '<i8'),
+    ('entry_price', '<f8'),
+    ('exit_price', '<f8'),    # NaN = geen exit prijs
+    ('lot_size', '<f8'),
+    ('pnl', '<f8'),
+])
+
+class Trade:
+    """Eén gesloten trade (live pad); zie TradeLog voor opslag in bulk."""
+    __slots__ = ('entry_idx', 'exit_idx', 'side', 'entry_price', 'exit_price',
+                 'lot_size', 'pnl', 'reason', 'symbol')
+
+    def __init__(self, entry_idx, exit_idx, side, entry_price, exit_price, lot_size, pnl,
+                 reason, symbol=0):
+        self.entry_idx = entry_idx
+        self.exit_idx = exit_idx
+        self.side = side
+        self.entry_price = entry_price
+        self.exit_price = exit_price
+        self.lot_size = lot_size
+        self.pnl = pnl
+        self.reason = reason
+        self.symbol = symbol
+
+    def as_dict(self, index=None):
+        """Zelfde 7-key dict als run_backtest (tijden via index, anders bar index)."""
+        return {
+            'entry_time': index[self.entry_idx] if index is not None else self.entry_idx,
+            'exit_time': index[self.exit_idx] if index is not None else self.exit_idx,
+            'entry_price': self.entry_price,
+            'exit_price': self.exit_price,
+            'lot_size': self.lot_size,
+            'pnl': self.pnl,
+            'exit_reason': self.reason
+        }
+
+class Position:
+    """
+    Open positie. side 0 = flat.
+    stop: huidig stop niveau (start op sl_price, trailing schuift het op)
+    """
+    __slots__ = ('side', 'entry_price', 'entry_idx', 'lot_size', 'sl_price', 'tp_price',
+                 'stop', 'best_price', 'bars_held', 'trailing_active')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Terug naar flat (alle velden in één keer)."""
+        self.side = 0
+        self.entry_price = 0
+        self.entry_idx = 0
+        self.lot_size = 0
+        self.sl_price = 0
+        self.tp_price = 0
+        self.stop = 0
+        self.best_price = 0
+        self.bars_held = 0
+        self.trailing_active = False
+
+    @property
+    def is_open(self):
+        return self.side != 0
+
+    @property
+    def type_name(self):
+        return 'LONG' if self.side == 1 else 'SHORT' if self.side == -1 else ''
+
+    def open(self, side, entry_price, sl_dist, tp_dist, entry_idx=0, lot_size=0):
+        self.side = side
+        self.entry_price = entry_price
+        self.entry_idx = entry_idx
+        self.lot_size = lot_size
+        self.sl_price = entry_price - side * sl_dist
+        self.tp_price = entry_price + side * tp_dist
+        self.stop = self.sl_price
+        self.best_price = 0
+        self.bars_held = 0
+        self.trailing_active = False
+
+    def trail(self, price, activation, distance, unit):
+        """
+        Trailing stop zoals InverseOptimizedV42Strategy: actief vanaf
+        activation (in units winst), stop = beste prijs -/+ distance.
+        Returns: True als sl_price verschoven is.
+        """
+        if self.side == 1:
+            if (price - self.entry_price) / unit < activation:
+                return False
+            self.trailing_active = True
+            if price > self.best_price:
+                self.best_price = price
+                self.stop = price - distance
+                if self.stop > self.sl_price:
+                    self.sl_price = self.stop
+                    return True
+        elif self.side == -1:
+            if (self.entry_price - price) / unit < activation:
+                return False
+            self.trailing_active = True
+            if price < self.best_price or self.best_price == 0:
+                self.best_price = price
+                self.stop = price + distance
+                if self.stop < self.sl_price:
+                    self.sl_price = self.stop
+                    return True
+        return False
+
+    def check_exit(self, price, max_bars=None):
+        """Exit op close: 'SL', 'TP', 'TIME' of None (SL gaat voor TP)."""
+        if self.side == 1:
+            if price <= self.sl_price:
+                return 'SL'
+            if price >= self.tp_price:
+                return 'TP'
+        elif self.side == -1:
+            if price >= self.sl_price:
+                return 'SL'
+            if price <= self.tp_price:
+                return 'TP'
+        if max_bars is not None and self.bars_held >= max_bars:
+            return 'TIME'
+        return None
+
+class TradeLog:
+    """Groeiende structured array met trades (TRADE_DTYPE)."""
+
+    def __init__(self, capacity=64):
+        self._buf = np.empty(capacity, dtype=TRADE_DTYPE)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def append(self, entry_idx, exit_idx, side, entry_price, exit_price, lot_size, pnl,
+               reason, symbol=0):
+        if self._n == len(self._buf):
+            self._buf = np.resize(self._buf, 2 * len(self._buf))
+        self._buf[self._n] = (
+            symbol, side, REASON_CODES[reason], entry_idx, exit_idx, entry_price,
+            np.nan if exit_price is None else exit_price, lot_size, pnl
+        )
+        self._n += 1
+
+    def add(self, trade):
+        """Voeg een Trade object toe."""
+        self.append(trade.entry_idx, trade.exit_idx, trade.side, trade.entry_price,
+                    trade.exit_price, trade.lot_size, trade.pnl, trade.reason, trade.symbol)
+
+    @property
+    def records(self):
+        """View op de gevulde records (geen kopie)."""
+        return self._buf[:self._n]
+
+    def column(self, name):
+        return self.records[name]
+
+    def reasons(self):
+        return [REASONS[code] for code in self.records['reason'].tolist()]
+
+    def to_dicts(self, index=None):
+        """Lijst met 7-key dicts (run_backtest formaat); NaN exit prijs → None."""
+        r = self.records
+        if index is not None:
+            entry_times = index[r['entry_idx']]
+            exit_times = index[r['exit_idx']]
+        else:
+            entry_times = r['entry_idx'].tolist()
+            exit_times = r['exit_idx'].tolist()
+        trades = []
+        for entry_time, exit_time, entry_price, exit_price, lot_size, pnl, reason in zip(
+                entry_times, exit_times, r['entry_price'].tolist(), r['exit_price'].tolist(),
+                r['lot_size'].tolist(), r['pnl'].tolist(), self.reasons()):
+            trades.append({
+                'entry_time': entry_time,
+                'exit_time': exit_time,
+                'entry_price': entry_price,
+                'exit_price': None if exit_price != exit_price else exit_price,
+                'lot_size': lot_size,
+                'pnl': pnl,
+                'exit_reason': reason
+            })
+        return trades
+
+    def to_frame(self, index=None):
+        """Kolommen als DataFrame (export); met index ook entry/exit tijden."""
+        df = pd.DataFrame(self.records)
+        df['reason'] = pd.Categorical.from_codes(df['reason'], categories=list(REASONS))
+        if index is not None:
+            df.insert(0, 'entry_time', index[df['entry_idx'].to_numpy()])
+            df.insert(1, 'exit_time', index[df['exit_idx'].to_numpy()])
+        return df
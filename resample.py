@@ -0,0 +1,194 @@
+﻿# =============================================================================
+# RESAMPLE — Elke timeframe uit één M1 (of tick) basis in de bar store
+# =============================================================================
+# In plaats van per timeframe een aparte MT5 download wordt alles afgeleid
+# van één gecachte M1 partitie. Een bucket index (eerste base bar per HTF
+# bucket) maakt van elke view één pass met np.*.reduceat; de views worden per
+# (symbool, timeframe) gecached en bij nieuwe M1 bars alleen vanaf de laatste
+# (nog open) bucket bijgewerkt.
+# Buckets zijn uitgelijnd op UTC epoch veelvouden (H4: 00/04/08..., D1: 00:00).
+# =============================================================================
+import numpy as np
+import pandas as pd
+import config
+import bar_store
+import indicators
+
+BASE_TIMEFRAME = 'M1'
+
+def bucket_index(times, timeframe_str):
+    """
+    times: oplopende epoch seconds van de base bars
+    Returns: (bucket start tijden, index van de eerste base bar per bucket)
+    """
+    step = bar_store.TIMEFRAME_SECONDS[timeframe_str]
+    times = np.asarray(times, dtype=np.int64)
+    if len(times) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    buckets = times - times % step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    return buckets[starts], starts
+
+def resample_rates(rates, timeframe_str, index=None):
+    """
+    Bars → bars van een hogere timeframe (RATES_DTYPE).
+    open = eerste, close = laatste, high/low = extremen, volumes opgeteld,
+    spread = minimum in de bucket (zoals MT5 het voor hogere timeframes rapporteert).
+    index: vooraf berekende bucket_index (optioneel)
+    """
+    rates = bar_store.as_rates(rates)
+    bucket_times, starts = index if index is not None else bucket_index(rates['time'], timeframe_str)
+    out = np.empty(len(starts), dtype=bar_store.RATES_DTYPE)
+    if len(starts) == 0:
+        return out
+    ends = np.r_[starts[1:], len(rates)] - 1
+
+    out['time'] = bucket_times
+    out['open'] = rates['open'][starts]
+    out['high'] = np.maximum.reduceat(rates['high'], starts)
+    out['low'] = np.minimum.reduceat(rates['low'], starts)
+    out['close'] = rates['close'][ends]
+    out['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+    out['spread'] = np.minimum.reduceat(rates['spread'], starts)
+    out['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+    return out
+
+def ticks_to_rates(ticks, timeframe_str, point=0.00001):
+    """
+    MT5 ticks (time/time_msc, bid, ask) → bars op de bid (zoals MT5 charts).
+    tick_volume = aantal ticks, spread = kleinste spread in points.
+    """
+    ticks = np.asarray(ticks)
+    if 'time_msc' in ticks.dtype.names:
+        times = ticks['time_msc'].astype(np.int64) // 1000
+    else:
+        times = ticks['time'].astype(np.int64)
+    bucket_times, starts = bucket_index(times, timeframe_str)
+    out = np.zeros(len(starts), dtype=bar_store.RATES_DTYPE)
+    if len(starts) == 0:
+        return out
+    ends = np.r_[starts[1:], len(ticks)] - 1
+    bid = ticks['bid'].astype(np.float64)
+    spread = np.rint((ticks['ask'] - ticks['bid']) / point).astype(np.int32)
+
+    out['time'] = bucket_times
+    out['open'] = bid[starts]
+    out['high'] = np.maximum.reduceat(bid, starts)
+    out['low'] = np.minimum.reduceat(bid, starts)
+    out['close'] = bid[ends]
+    out['tick_volume'] = np.diff(np.r_[starts, len(ticks)])
+    out['spread'] = np.minimum.reduceat(spread, starts)
+    return out
+
+# ----- GECACHTE VIEWS -----
+
+class ResampledStore:
+    """
+    Hogere timeframes uit de base partitie van een BarStore.
+    Cache per (symbool, timeframe): (aantal base bars, eerste base tijd,
+    laatste base record, bars, base index van de laatste bucket). Groeit de
+    base partitie alleen aan het eind, of is de laatste base bar in opbouw
+    overschreven, dan wordt vanaf de laatste bucket opnieuw gerekend.
+    """
+
+    def __init__(self, store=None, base_timeframe=BASE_TIMEFRAME):
+        self.store = store or bar_store.BarStore()
+        self.base_timeframe = base_timeframe
+        self._views = {}
+
+    def clear(self):
+        self._views = {}
+
+    def view(self, symbol, timeframe_str):
+        """Alle bars van timeframe_str (de laatste bucket kan nog in opbouw zijn)."""
+        if timeframe_str == self.base_timeframe:
+            return self.store.load(symbol, timeframe_str)
+
+        base = self.store.load(symbol, self.base_timeframe)
+        n = len(base)
+        if n == 0:
+            return np.empty(0, dtype=bar_store.RATES_DTYPE)
+        first_time = int(base['time'][0])
+        last_record = base[-1:].tobytes()
+        key = (symbol, timeframe_str)
+        cached = self._views.get(key)
+
+        if cached is not None and cached[1] == first_time and cached[0] <= n:
+            n_cached, _, cached_last, bars, last_start = cached
+            if n_cached == n and cached_last == last_record:
+                return bars
+            # Alleen de (mogelijk onvolledige) laatste bucket + nieuwe bars
+            tail = resample_rates(base[last_start:], timeframe_str)
+            bars = np.concatenate([bars[:-1], tail])
+            last_start += int(bucket_index(base['time'][last_start:], timeframe_str)[1][-1])
+        else:
+            index = bucket_index(base['time'], timeframe_str)
+            bars = resample_rates(base, timeframe_str, index)
+            last_start = int(index[1][-1])
+
+        self._views[key] = (n, first_time, last_record, bars, last_start)
+        return bars
+
+    def get_rates(self, symbol, timeframe_str, start, end=None, refresh=True):
+        """Zelfde interface als BarStore.get_rates; refresh haalt alleen base bars op."""
+        if refresh:
+            try:
+                self.store.refresh(symbol, self.base_timeframe, start, end)
+            except Exception as e:
+                print(f"⚠️  Cache refresh mislukt, gebruik lokale data: {str(e)}")
+
+        rates = self.view(symbol, timeframe_str)
+        times = rates['time']
+        i0 = np.searchsorted(times, bar_store.to_timestamp(start), side='left')
+        i1 = len(rates) if end is None else np.searchsorted(times, bar_store.to_timestamp(end), side='right')
+        return rates[i0:i1]
+
+# ----- MULTI-TIMEFRAME -----
+
+def align_htf(htf_times, htf_values, ltf_times, htf_timeframe, ltf_timeframe=None):
+    """
+    Waarde van de laatst GESLOTEN HTF bar per LTF bar (geen look-ahead):
+    een LTF bar die sluit op t ziet alleen HTF bars met close tijd <= t.
+    Returns: float64 array met len(ltf_times) (NaN vóór de eerste HTF close)
+    """
+    htf_step = bar_store.TIMEFRAME_SECONDS[htf_timeframe]
+    ltf_step = bar_store.TIMEFRAME_SECONDS[ltf_timeframe or config.TIMEFRAME_MT5]
+    htf_close = np.asarray(htf_times, dtype=np.int64) + htf_step
+    ltf_close = np.asarray(ltf_times, dtype=np.int64) + ltf_step
+    pos = np.searchsorted(htf_close, ltf_close, side='right') - 1
+
+    values = np.asarray(htf_values, dtype=np.float64)
+    out = np.full(len(ltf_close), np.nan)
+    valid = pos >= 0
+    out[valid] = values[pos[valid]]
+    return out
+
+def add_htf_trend(df, htf_rates, htf_timeframe, period=None, ltf_timeframe=None):
+    """
+    df['ema_trend'] = EMA(period) op de HTF closes, uitgelijnd op df
+    (bv. H1 trend filter op M15 entries, zonder extra MT5 download).
+    """
+    period = period or config.EMA_TREND_DEFAULT
+    htf_rates = bar_store.as_rates(htf_rates)
+    htf_ema = indicators.ema(pd.Series(htf_rates['close']), period)
+    ltf_times = df.index.values.astype('datetime64[s]').astype(np.int64)
+    df['ema_trend'] = align_htf(htf_rates['time'], htf_ema, ltf_times, htf_timeframe, ltf_timeframe)
+    return df
+
+# =============================================================================
+# MAIN
+# =============================================================================
+if __name__ == "__main__":
+    from datetime import datetime, timedelta
+    import data_handler
+
+    if not data_handler.initialize_mt5():
+        raise SystemExit(1)
+
+    store = ResampledStore(bar_store.BarStore(source=bar_store.MT5Source(data_handler.mt5)))
+    start = datetime.now() - timedelta(days=30)
+    for tf in ('M15', 'H1', 'H4', 'D1'):
+        rates = store.get_rates(config.SYMBOL, tf, start, refresh=(tf == 'M15'))
+        print(f"✅ {config.SYMBOL} {tf}: {len(rates)} bars uit {BASE_TIMEFRAME}")
+    data_handler.shutdown_mt5()
@@ -0,0 +1,62 @@
+﻿# =============================================================================
+# ROLLING — Rolling max/min met monotone deque (amortized O(1) per bar)
+# =============================================================================
+# Kosten per bar zijn onafhankelijk van de window lengte: elke waarde gaat
+# hooguit één keer de deque in en één keer eruit. Bruikbaar als streaming
+# object (backtrader indicator / live runner) en als NumPy functie.
+# NaN in het window geeft NaN (zoals pandas rolling), warm-up ook NaN.
+# =============================================================================
+from collections import deque
+import math
+import numpy as np
+
+class RollingExtremum:
+    """Streaming rolling max (mode='max') of min (mode='min') over period waarden."""
+
+    def __init__(self, period, mode='max'):
+        if period < 1:
+            raise ValueError("period moet >= 1 zijn")
+        if mode not in ('max', 'min'):
+            raise ValueError(f"Onbekende mode: {mode}")
+        self.period = period
+        self.is_max = mode == 'max'
+        self.window = deque()   # (index, waarde), monotoon
+        self.count = 0
+        self.last_nan = -period
+
+    def update(self, value):
+        """Voeg een waarde toe. Returns: extremum over de laatste period waarden."""
+        i = self.count
+        self.count += 1
+        window = self.window
+
+        if value != value:  # NaN
+            self.last_nan = i
+        elif self.is_max:
+            while window and window[-1][1] <= value:
+                window.pop()
+            window.append((i, value))
+        else:
+            while window and window[-1][1] >= value:
+                window.pop()
+            window.append((i, value))
+
+        if window and window[0][0] <= i - self.period:
+            window.popleft()
+
+        if self.count < self.period or i - self.last_nan < self.period or not window:
+            return math.nan
+        return window[0][1]
+
+def _rolling(values, period, mode):
+    values = np.asarray(values, dtype=np.float64)
+    update = RollingExtremum(period, mode).update
+    return np.array([update(v) for v in values.tolist()], dtype=np.float64)
+
+def rolling_max(values, period):
+    """Rolling max over period waarden (NaN tijdens warm-up)."""
+    return _rolling(values, period, 'max')
+
+def rolling_min(values, period):
+    """Rolling min over period waarden (NaN tijdens warm-up)."""
+    return _rolling(values, period, 'min')
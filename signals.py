@@ -0,0 +1,158 @@
+﻿# =============================================================================
+# SIGNALS — Geregistreerde entry regels, gecompileerd naar int8 arrays
+# =============================================================================
+# Elke regel is een functie (bars, **params) → int8 array (+1 long, -1 short,
+# 0 niets) over alle bars. Dezelfde kern functies gebruiken strategy.py (EMA
+# cross), inverse_batch.py en de backtrader strategie (breakout), zodat de
+# condities maar op één plek staan.
+# SignalStore bewaart gecompileerde signalen naast de bars in de BarStore
+# (<root>/<SYMBOL>/signals/) met de data_version van de bars: één keer
+# compileren per data versie, daarna alleen laden.
+# =============================================================================
+import os
+import numpy as np
+import pandas as pd
+import config
+import bar_store
+import indicators
+import rolling
+
+RULES = {}
+
+def register_rule(name, **defaults):
+    """Decorator: voeg een regel toe aan RULES met default params."""
+    def wrap(func):
+        RULES[name] = (func, defaults)
+        return func
+    return wrap
+
+# ----- KERN CONDITIES (gedeeld met de engines) -----
+
+def ema_cross_values(fast, slow):
+    """+1 als fast boven slow kruist, -1 als fast onder slow kruist (int8)."""
+    fast = np.asarray(fast, dtype=np.float64)
+    slow = np.asarray(slow, dtype=np.float64)
+    prev_fast = np.r_[np.nan, fast[:-1]]
+    prev_slow = np.r_[np.nan, slow[:-1]]
+    out = np.zeros(len(fast), dtype=np.int8)
+    out[(fast > slow) & (prev_fast <= prev_slow)] = 1
+    out[(fast < slow) & (prev_fast >= prev_slow)] = -1
+    return out
+
+def breakout_levels(high, low, lookback):
+    """Resistance/support zoals Highest(high(-1)) / Lowest(low(-1)) in de strategie."""
+    prev_high = np.r_[np.nan, np.asarray(high, dtype=np.float64)[:-1]]
+    prev_low = np.r_[np.nan, np.asarray(low, dtype=np.float64)[:-1]]
+    return rolling.rolling_max(prev_high, lookback), rolling.rolling_min(prev_low, lookback)
+
+def breakout_values(close, resistance, support):
+    """Fade: -1 als close boven resistance sluit, anders +1 onder support (int8)."""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.zeros(len(close), dtype=np.int8)
+    out[close < support] = 1
+    out[close > resistance] = -1   # Short gaat voor (zelfde volgorde als next())
+    return out
+
+# ----- REGELS -----
+
+def _column(bars, name):
+    return np.asarray(bars[name], dtype=np.float64)
+
+@register_rule('ema_cross', ema_fast=config.EMA_FAST_DEFAULT, ema_slow=config.EMA_SLOW_DEFAULT)
+def ema_cross(bars, ema_fast, ema_slow):
+    close = pd.Series(_column(bars, 'close'))
+    close_fp = indicators.series_fingerprint(close)
+    fast = indicators.ema(close, ema_fast, close_fp).to_numpy()
+    slow = indicators.ema(close, ema_slow, close_fp).to_numpy()
+    return ema_cross_values(fast, slow)
+
+@register_rule('inverse_breakout', lookback=50)
+def inverse_breakout(bars, lookback):
+    resistance, support = breakout_levels(_column(bars, 'high'), _column(bars, 'low'), lookback)
+    return breakout_values(_column(bars, 'close'), resistance, support)
+
+# ----- COMPILATIE -----
+
+class CompiledSignals:
+    """signal: int8 per bar; events: bar indices met signal != 0 (int64)."""
+    __slots__ = ('rule', 'params', 'signal', 'events', 'data_version')
+
+    def __init__(self, rule, params, signal, events=None, data_version=None):
+        self.rule = rule
+        self.params = params
+        self.signal = signal
+        self.events = np.flatnonzero(signal) if events is None else events
+        self.data_version = data_version
+
+    def __len__(self):
+        return len(self.signal)
+
+    def sides(self):
+        """Signaal waarde per event (zelfde volgorde als events)."""
+        return self.signal[self.events]
+
+def rule_params(rule, params=None):
+    """Default params van de regel, aangevuld/overschreven met params (alleen bekende keys)."""
+    if rule not in RULES:
+        raise ValueError(f"Onbekende regel: {rule}")
+    defaults = RULES[rule][1]
+    params = params or {}
+    return {k: params.get(k, v) for k, v in defaults.items()}
+
+def compile_rule(bars, rule, params=None, data_version=None):
+    """bars: rates array of DataFrame met OHLC kolommen."""
+    params = rule_params(rule, params)
+    signal = RULES[rule][0](bars, **params).astype(np.int8, copy=False)
+    return CompiledSignals(rule, params, signal, data_version=data_version)
+
+# ----- OPSLAG NAAST DE BARS -----
+
+class SignalStore:
+    """
+    Gecompileerde signalen per (symbool, timeframe, regel, params), op disk
+    als .npz in <store.root>/<SYMBOL>/signals/. Geldig zolang de data_version
+    van de bar partitie gelijk is; anders opnieuw gecompileerd.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or bar_store.BarStore()
+        self._memory = {}
+
+    def path(self, symbol, timeframe_str, rule, params):
+        tag = '_'.join(f"{k}{v}" for k, v in sorted(params.items()))
+        return os.path.join(self.store.root, symbol, 'signals', f"{timeframe_str}.{rule}.{tag}.npz")
+
+    def get(self, symbol, timeframe_str, rule, params=None):
+        params = rule_params(rule, params)
+        version = self.store.data_version(symbol, timeframe_str)
+        key = (symbol, timeframe_str, rule, tuple(sorted(params.items())))
+
+        compiled = self._memory.get(key)
+        if compiled is not None and compiled.data_version == version:
+            return compiled
+
+        path = self.path(symbol, timeframe_str, rule, params)
+        compiled = self._read(path, rule, params, version)
+        if compiled is None:
+            compiled = compile_rule(self.store.load(symbol, timeframe_str), rule, params, version)
+            self._write(path, compiled)
+        self._memory[key] = compiled
+        return compiled
+
+    def _read(self, path, rule, params, version):
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if str(data['data_version']) != version:
+                    return None
+                return CompiledSignals(rule, params, data['signal'], data['events'], version)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, path, compiled):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, signal=compiled.signal, events=compiled.events,
+                 data_version=np.array(compiled.data_version))
+        os.replace(tmp, path)
@@ -7,6 +7,10 @@
 import pandas as pd
 import numpy as np
 import config
+import event_log
+import indicators
+import profiling
+import signals
 
 def generate_final_signals(df, params):
     """
@@ -15,6 +19,10 @@ def generate_final_signals(df, params):
     LONG: EMA fast kruist boven EMA slow
     SHORT: EMA fast kruist onder EMA slow
     """
+    with profiling.get_profiler().stage('signals'):
+        return _generate_final_signals(df, params)
+
+def _generate_final_signals(df, params):
     df = df.copy()
     df['signal'] = 0
     
@@ -22,43 +30,41 @@ def generate_final_signals(df, params):
     ema_fast = params.get('ema_fast', config.EMA_FAST_DEFAULT)
     ema_slow = params.get('ema_slow', config.EMA_SLOW_DEFAULT)
     
-    df['ema_fast'] = df['close'].ewm(span=ema_fast, adjust=False).mean()
-    df['ema_slow'] = df['close'].ewm(span=ema_slow, adjust=False).mean()
-    
-    # Crossover detectie
-    # LONG: EMA fast kruist boven EMA slow
-    df.loc[
-        (df['ema_fast'] > df['ema_slow']) & 
-        (df['ema_fast'].shift(1) <= df['ema_slow'].shift(1)), 
-        'signal'
-    ] = 1
+    # Kolommen van calculate_all_indicators hergebruiken; anders via de
+    # indicator cache (herhaalde spans in een grid worden niet herberekend)
+    if not indicators.has_ema_columns(df, ema_fast, ema_slow):
+        close_fp = indicators.series_fingerprint(df['close'])
+        df['ema_fast'] = indicators.ema(df['close'], ema_fast, close_fp)
+        df['ema_slow'] = indicators.ema(df['close'], ema_slow, close_fp)
+        df.attrs[indicators.EMA_ATTR] = indicators.ema_columns_tag(df, ema_fast, ema_slow)
     
-    # SHORT: EMA fast kruist onder EMA slow
-    df.loc[
-        (df['ema_fast'] < df['ema_slow']) & 
-        (df['ema_fast'].shift(1) >= df['ema_slow'].shift(1)), 
-        'signal'
-    ] = -1
+    # Crossover detectie (zelfde regel als signals.ema_cross)
+    # LONG: EMA fast kruist boven EMA slow, SHORT: kruist onder
+    df['signal'] = signals.ema_cross_values(df['ema_fast'], df['ema_slow']).astype(np.int64)
     
     # Positie (houd tot tegenovergesteld signaal)
     df['position'] = df['signal'].replace(0, np.nan).ffill().fillna(0)
     
-    # Debug info
-    total_signals = (df['signal'] != 0).sum()
-    long_signals = (df['signal'] == 1).sum()
-    short_signals = (df['signal'] == -1).sum()
-    print(f"   📊 Signal debug: {total_signals} signalen gegenereerd")
-    print(f"   📊 Long signalen: {long_signals}")
-    print(f"   📊 Short signalen: {short_signals}")
+    # Debug info (alleen als de sink debug events wil)
+    sink = event_log.get_sink()
+    if sink.enabled_for('debug'):
+        total_signals = (df['signal'] != 0).sum()
+        long_signals = (df['signal'] == 1).sum()
+        short_signals = (df['signal'] == -1).sum()
+        sink.emit('debug', 'signals', f"   📊 Signal debug: {total_signals} signalen gegenereerd", total=int(total_signals))
+        sink.emit('debug', 'signals', f"   📊 Long signalen: {long_signals}", long=int(long_signals))
+        sink.emit('debug', 'signals', f"   📊 Short signalen: {short_signals}", short=int(short_signals))
     
     return df
 
-def calculate_dynamic_lot_size(equity, risk_pct, stop_loss_points, symbol='EURUSD'):
+def calculate_dynamic_lot_size(equity, risk_pct, stop_loss_points, symbol='EURUSD',
+                               point_value_per_01lot=None):
     """
     Bereken lot size op basis van risk %.
     
     Voor EURUSD: 1 pip = $10 per standaard lot, $1 per 0.1 lot
     1 point = 0.1 pip = $1 per standaard lot, $0.10 per 0.1 lot
+    point_value_per_01lot: andere symbolen (default EURUSD waarde)
     """
     if equity is None or equity <= 0:
         equity = config.INITIAL_CAPITAL
@@ -67,7 +73,7 @@ def calculate_dynamic_lot_size(equity, risk_pct, stop_loss_points, symbol='EURUS
         stop_loss_points = config.STOP_LOSS_POINTS
     
     # EURUSD: 1 point = 0.00001 = $0.10 per 0.1 lot
-    pip_value_per_01lot = 0.10
+    pip_value_per_01lot = point_value_per_01lot or 0.10
     risk_amount = equity * (risk_pct / 100)
     sl_cost_per_01lot = stop_loss_points * pip_value_per_01lot
     
@@ -0,0 +1,56 @@
+﻿# =============================================================================
+# TEST SETUP — Repo root op sys.path, stille event sink, synthetische data
+# =============================================================================
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+import event_log
+
+@pytest.fixture(autouse=True)
+def null_sink():
+    """Geen console output van de engines tijdens tests."""
+    with event_log.use_sink(event_log.NullSink()):
+        yield
+
+@pytest.fixture(scope='session')
+def rates():
+    """Synthetische EURUSD M15 bars (deterministisch)."""
+    return benchmark.synthetic_rates(4000, 'M15', seed=7)
+
+@pytest.fixture(scope='session')
+def df(rates):
+    return benchmark.rates_to_frame(rates)
+
+@pytest.fixture(scope='session')
+def run_v42(rates):
+    """
+    InverseOptimizedV42Strategy in backtrader met de broker instellingen van
+    inverse_batch (cash, commissie, stake). Returns: functie(data=None,
+    **params) → (eind waarde, strategie); data default de rates fixture
+    """
+    bt = pytest.importorskip('backtrader')
+    pytest.importorskip('MetaTrader5')
+    import contextlib
+    import io
+    import inverse_batch
+    import inverse_optimized_v42
+    from rates_feed import NumpyRatesData
+
+    def run(data=None, **params):
+        cerebro = bt.Cerebro()
+        cerebro.addstrategy(inverse_optimized_v42.InverseOptimizedV42Strategy,
+                            sink=event_log.NullSink(), **params)
+        cerebro.adddata(NumpyRatesData(dataname=rates if data is None else data, timeframe=bt.TimeFrame.Minutes,
+                                       compression=15))
+        cerebro.broker.setcash(inverse_batch.STARTING_CASH)
+        cerebro.broker.setcommission(commission=inverse_batch.COMMISSION)
+        cerebro.addsizer(bt.sizers.FixedSize, stake=inverse_batch.STAKE)
+        with contextlib.redirect_stdout(io.StringIO()):
+            strat = cerebro.run()[0]
+        return cerebro.broker.getvalue(), strat
+    return run
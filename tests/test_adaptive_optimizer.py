@@ -0,0 +1,38 @@
+﻿# =============================================================================
+# ADAPTIVE OPTIMIZER — ranking incl. open posities, oude state niet hervatten
+# =============================================================================
+import json
+
+import adaptive_optimizer
+import inverse_batch
+
+SPACE = {'lookback': [30, 50], 'stop_loss_pips': [35, 45], 'max_candles': [20, 28]}
+
+def _run(rates, state_path=''):
+    return adaptive_optimizer.run_successive_halving(
+        rates, space=SPACE, budget=8, eta=2, min_fraction=0.5, min_bars=500,
+        state_path=state_path)
+
+def test_ranking_includes_open_positions(rates):
+    ranked = _run(rates)['ranked']
+    grid = inverse_batch.expand_param_grid(SPACE)
+    ref = inverse_batch.run_batch_frame(rates, [grid[c] for c in ranked['candidate']])
+    assert ranked['net_pnl'].tolist() == ref['net_pnl'].tolist()
+    assert (ranked['net_pnl'].diff().dropna() <= 0).all()
+    assert 'open_pnl' in ranked.columns
+
+def test_state_from_older_format_is_not_resumed(rates, tmp_path):
+    path = str(tmp_path / 'state.json')
+    ref = _run(rates, path)
+
+    # State van voor open_pnl: zelfde instellingen, zonder format, met valse rows
+    with open(path, encoding='utf-8') as f:
+        state = json.load(f)
+    del state['key']['format']
+    for rung in state['rungs']:
+        for row in rung['rows']:
+            row['net_pnl'] = -row['candidate']
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+    assert _run(rates, path)['ranked']['net_pnl'].tolist() == ref['ranked']['net_pnl'].tolist()
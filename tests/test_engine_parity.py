@@ -0,0 +1,26 @@
+﻿# =============================================================================
+# ENGINE PARITEIT — numpy/sparse kernels tegen de iterrows referentie
+# =============================================================================
+import pytest
+
+import backtest_engine
+
+PARAMS = [
+    {'ema_fast': 5, 'ema_slow': 20},
+    {'ema_fast': 9, 'ema_slow': 22},
+]
+
+@pytest.mark.parametrize('engine', ['numpy', 'sparse'])
+@pytest.mark.parametrize('params', PARAMS)
+def test_engine_matches_iterrows(df, params, engine):
+    assert backtest_engine.compare_engines(df, params, engine=engine) == []
+
+@pytest.mark.parametrize('params', PARAMS)
+def test_sparse_matches_numpy_with_abort(df, params):
+    full = backtest_engine.run_backtest(df, params, engine='numpy', scalars_only=True)
+    abort = abs(full['max_drawdown']) / 2
+    aborted = backtest_engine.run_backtest(df, params, engine='numpy', abort_drawdown=abort,
+                                           scalars_only=True)
+    assert aborted['aborted']
+    assert backtest_engine.compare_engines(df, params, engine='sparse', reference='numpy',
+                                           abort_drawdown=abort) == []
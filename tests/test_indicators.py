@@ -0,0 +1,51 @@
+﻿# =============================================================================
+# INDICATORS — één fingerprint per frame, EMA kolommen hergebruikt
+# =============================================================================
+import pandas as pd
+import pytest
+
+import backtest_engine
+import indicator_cache
+import indicators
+import strategy
+
+@pytest.fixture
+def fingerprints(monkeypatch):
+    calls = []
+    original = indicator_cache.fingerprint
+
+    def counting(*arrays):
+        calls.append(len(arrays))
+        return original(*arrays)
+
+    monkeypatch.setattr(indicator_cache, 'fingerprint', counting)
+    previous = indicator_cache.set_cache(indicator_cache.IndicatorCache())
+    yield calls
+    indicator_cache.set_cache(previous)
+
+def test_run_backtest_hashes_the_bars_once(df, fingerprints):
+    backtest_engine.run_backtest(df, {'ema_fast': 5, 'ema_slow': 20, 'use_trend_filter': True},
+                                 scalars_only=True)
+    assert len(fingerprints) == 1
+
+def test_signals_reuse_matching_ema_columns(df, fingerprints):
+    params = {'ema_fast': 9, 'ema_slow': 22}
+    with_indicators = indicators.calculate_all_indicators(df.copy(), params)
+    reused = strategy.generate_final_signals(with_indicators, params)
+    assert len(fingerprints) == 1
+
+    fresh = strategy.generate_final_signals(df.copy(), params)
+    pd.testing.assert_frame_equal(reused[fresh.columns], fresh)
+
+@pytest.mark.parametrize('change', ['spans', 'slice'])
+def test_signals_recompute_stale_ema_columns(df, change):
+    params = {'ema_fast': 9, 'ema_slow': 22}
+    with_indicators = indicators.calculate_all_indicators(df.copy(), {'ema_fast': 5, 'ema_slow': 20})
+    if change == 'slice':
+        params = {'ema_fast': 5, 'ema_slow': 20}
+        with_indicators = with_indicators.iloc[500:]
+    result = strategy.generate_final_signals(with_indicators, params)
+    fresh = strategy.generate_final_signals(df.iloc[500:].copy() if change == 'slice' else df.copy(),
+                                            params)
+    pd.testing.assert_series_equal(result['ema_fast'], fresh['ema_fast'])
+    pd.testing.assert_series_equal(result['signal'], fresh['signal'])
@@ -0,0 +1,85 @@
+﻿# =============================================================================
+# INTRABAR PARITEIT — bronnen onderling en terugval op de bar zelf
+# =============================================================================
+# Exits volgen bewust andere regels dan de bar engines (gap fill op de open,
+# trailing na de stop check), dus de referentie is de intrabar engine zelf:
+# zonder sub-data valt elke bar terug op zijn eigen OHLC; dat moet identiek
+# zijn aan een bron die precies die bars als sub-bars levert.
+# Volgorde van SL/TP binnen één bar: handgemaakte M1 paden.
+# =============================================================================
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest_engine
+import bar_store
+import benchmark
+import config
+import intrabar
+import resample
+
+PARAMS = {'ema_fast': 5, 'ema_slow': 20}
+
+def _run(df, source):
+    return backtest_engine.run_backtest(df, PARAMS, engine='intrabar', intrabar_source=source)
+
+def test_fallback_matches_self_source(df, rates):
+    fallback = _run(df, intrabar.BarIntrabarSource(None))
+    own = _run(df, intrabar.BarIntrabarSource(rates))
+    assert fallback['intrabar']['expanded_bars'] == 0
+    assert own['intrabar']['fallback_bars'] == 0
+    assert fallback['trades'] == own['trades']
+    assert fallback['equity_curve'].equals(own['equity_curve'])
+
+def test_store_source_matches_memory_source(tmp_path):
+    m1 = benchmark.synthetic_rates(15 * 1500, 'M1', seed=11, missing_prob=0.0)
+    df = benchmark.rates_to_frame(resample.resample_rates(m1, 'M15'))
+    store = bar_store.BarStore(str(tmp_path), bar_store.ArraySource({(config.SYMBOL, 'M1'): m1}))
+
+    memory = _run(df, intrabar.BarIntrabarSource(m1))
+    stored = _run(df, intrabar.default_source(df, store=store))
+    assert memory['intrabar']['sub_bars'] > 0
+    assert memory['trades'] == stored['trades']
+    assert np.array_equal(memory['equity_curve']['equity'], stored['equity_curve']['equity'])
+
+# ----- SL/TP VOLGORDE BINNEN EEN BAR -----
+
+ENTRY = 1.10000
+T0 = 1_700_000_100 // 900 * 900
+
+def _sl_tp_case(tp_first):
+    """
+    Long op de close van bar 0; bar 1 raakt zowel SL als TP. Het M1 pad van
+    bar 1 gaat eerst naar TP (tp_first) of eerst naar SL, daarna de andere kant.
+    """
+    sl = ENTRY - config.STOP_LOSS_POINTS * intrabar.POINT
+    tp = ENTRY + config.TAKE_PROFIT_POINTS * intrabar.POINT
+    up = (ENTRY, tp + 0.0002, ENTRY - 0.0001, ENTRY + 0.0001)
+    down = (ENTRY, ENTRY + 0.0001, sl - 0.0002, ENTRY - 0.0001)
+    flat = (ENTRY, ENTRY + 0.0001, ENTRY - 0.0001, ENTRY)
+    path = [up, down] if tp_first else [down, up]
+    path += [flat] * 13
+
+    m1 = np.zeros(len(path), dtype=bar_store.RATES_DTYPE)
+    m1['time'] = T0 + 900 + 60 * np.arange(len(path))
+    m1['open'], m1['high'], m1['low'], m1['close'] = np.array(path).T
+
+    bars = [flat, (ENTRY, m1['high'].max(), m1['low'].min(), ENTRY), flat]
+    df = pd.DataFrame(bars, columns=['open', 'high', 'low', 'close'],
+                      index=pd.to_datetime(T0 + 900 * np.arange(3), unit='s'))
+    df['signal'] = [1, 0, 0]
+    return df, m1, sl, tp
+
+@pytest.mark.parametrize('tp_first', [True, False])
+def test_sl_tp_order_inside_bar(tp_first):
+    df, m1, sl, tp = _sl_tp_case(tp_first)
+    bar_level = backtest_engine.run_backtest_on_signals(df, PARAMS, engine='numpy')
+    assert bar_level['trades'][0]['exit_reason'] == 'SL'  # Bar engine: SL wint altijd
+
+    result = backtest_engine.run_backtest_on_signals(
+        df, PARAMS, engine='intrabar', intrabar_source=intrabar.BarIntrabarSource(m1))
+    trade = result['trades'][0]
+    assert result['intrabar']['expanded_bars'] == 1
+    assert trade['exit_reason'] == ('TP' if tp_first else 'SL')
+    assert trade['exit_price'] == pytest.approx(tp if tp_first else sl, abs=1e-12)
+    assert trade['exit_time'] == df.index[1]
@@ -0,0 +1,34 @@
+﻿# =============================================================================
+# INVERSE BATCH PARITEIT — lock-step batch tegen de backtrader strategie
+# =============================================================================
+import pytest
+
+import benchmark
+import inverse_batch
+
+PARAM_SETS = [
+    {},
+    {'lookback': 30, 'max_candles': 20},
+    {'stop_loss_pips': 30, 'take_profit_pips': 70, 'trail_activation_pips': 35,
+     'trail_distance_pips': 18},
+]
+
+@pytest.mark.parametrize('params', PARAM_SETS)
+def test_batch_matches_backtrader(rates, run_v42, params):
+    value, strat = run_v42(**params)
+    row = inverse_batch.run_batch_frame(rates, [params]).iloc[0]
+    assert row['net_pnl'] == pytest.approx(value - inverse_batch.STARTING_CASH, rel=1e-9, abs=1e-6)
+    assert row['signals'] == strat.trade_count
+
+def test_batch_is_order_independent(rates):
+    single = [inverse_batch.run_batch_frame(rates, [p]).iloc[0]['net_pnl'] for p in PARAM_SETS]
+    batch = inverse_batch.run_batch_frame(rates, PARAM_SETS)['net_pnl'].tolist()
+    assert batch == single
+
+@pytest.mark.parametrize('seed,n_bars', [(4, 3000), (8, 3001), (0, 3017)])
+def test_open_position_at_end_is_marked_to_market(run_v42, seed, n_bars):
+    rates = benchmark.synthetic_rates(n_bars, 'M15', seed=seed)
+    row = inverse_batch.run_batch_frame(rates, [{}]).iloc[0]
+    assert row['open_at_end'] and row['open_pnl'] != 0
+    value, _ = run_v42(data=rates)
+    assert row['net_pnl'] == pytest.approx(value - inverse_batch.STARTING_CASH, rel=1e-9, abs=1e-6)
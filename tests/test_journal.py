@@ -0,0 +1,36 @@
+﻿# =============================================================================
+# JOURNAL — opt-in, hervatten na een afgebroken sweep, code versie in de key
+# =============================================================================
+import os
+
+import journal
+import optimizer
+
+RANGES = {'ema_fast': [5, 9], 'ema_slow': [20, 22]}
+METRICS = ['ema_fast', 'ema_slow', 'net_profit', 'total_trades', 'max_drawdown', 'aborted']
+
+def test_journal_is_opt_in(df, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    optimizer.run_grid_search(df, RANGES, n_workers=1)
+    assert not os.path.exists(journal.default_path())
+
+def test_resume_after_interrupt(df, tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    ref = optimizer.run_grid_search(df, RANGES, n_workers=1)
+    optimizer.run_grid_search(df, RANGES, n_workers=1, journal=path)
+
+    # Crash na twee resultaten, midden in de derde regel
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines[:2]) + '\n' + lines[2][:20])
+
+    resumed = optimizer.run_grid_search(df, RANGES, n_workers=1, journal=path)
+    assert resumed[METRICS].equals(ref[METRICS])
+    assert len(journal.Journal(path)) == len(ref)
+
+def test_salt_invalidates_entries(monkeypatch):
+    key = journal.params_key({'ema_fast': 5})
+    monkeypatch.setattr(journal, '_code_version', None)
+    monkeypatch.setattr(journal.config, 'JOURNAL_SALT', 'v2')
+    assert journal.params_key({'ema_fast': 5}) != key
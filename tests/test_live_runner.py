@@ -0,0 +1,102 @@
+﻿# =============================================================================
+# LIVE RUNNER — forward test stats (OnlineStats) tegen een batch berekening
+# =============================================================================
+import pytest
+
+import event_log
+import live_runner
+import online_stats
+
+WARM_UP = 500
+
+def _replay(rates, stats_path):
+    """Replay met de SimulatedBroker; equity per bar zoals de broker die rapporteert."""
+    broker = live_runner.SimulatedBroker(rates, 'M15', start_index=WARM_UP)
+    runner = live_runner.LiveRunner(broker, timeframe_str='M15', sink=event_log.NullSink(),
+                                    stats_path=stats_path)
+    runner.warm_up(WARM_UP)
+    equity = []
+    while broker.advance():
+        runner.poll()
+        equity.append(broker.account()[1])
+    return runner, broker, equity
+
+def test_stats_match_batch(rates, tmp_path):
+    runner, broker, equity = _replay(rates, '')
+    assert len(broker.closes) > 10
+
+    batch = online_stats.OnlineStats(timeframe_str='M15')
+    batch.extend(equity, [c['pnl'] for c in broker.closes])
+    live, ref = runner.stats.summary(), batch.summary()
+    assert live.keys() == ref.keys()
+    for key in ref:
+        assert live[key] == pytest.approx(ref[key], rel=1e-9, abs=1e-9), key
+
+def test_stats_saved_per_bar_and_restored(rates, tmp_path):
+    path = str(tmp_path / 'forward_stats.json')
+    runner, _, equity = _replay(rates[:1500], path)
+    saved = online_stats.OnlineStats.load(path)
+    assert saved.snapshot() == runner.stats.snapshot()
+    assert saved.bars == len(equity)
+
+    # Herstart: stats gaan verder vanaf de snapshot
+    broker = live_runner.SimulatedBroker(rates, 'M15', start_index=1500)
+    restarted = live_runner.LiveRunner(broker, timeframe_str='M15', sink=event_log.NullSink(),
+                                       stats_path=path)
+    assert restarted.stats.snapshot() == runner.stats.snapshot()
+    restarted.warm_up(WARM_UP)
+    broker.advance()
+    restarted.poll()
+    assert online_stats.OnlineStats.load(path).bars == len(equity) + 1
+
+def test_dry_run_keeps_a_paper_account(rates):
+    class DryRunBroker(live_runner.SimulatedBroker):
+        dry_run = True
+
+        def account(self):
+            return None
+
+    broker = DryRunBroker(rates, 'M15', start_index=WARM_UP)
+    runner = live_runner.LiveRunner(broker, timeframe_str='M15', sink=event_log.NullSink(),
+                                    stats_path='')
+    runner.warm_up(WARM_UP)
+    while broker.advance():
+        runner.poll()
+    stats = runner.stats
+    assert stats.trades > 0 and stats.bars == len(rates) - WARM_UP
+    assert runner.paper_balance == pytest.approx(stats.initial_capital + stats.gross_win - stats.gross_loss)
+
+# ----- POLL / WARM-UP -----
+
+def _runner(rates, **kwargs):
+    broker = live_runner.SimulatedBroker(rates, 'M15', start_index=WARM_UP)
+    runner = live_runner.LiveRunner(broker, timeframe_str='M15', sink=event_log.NullSink(),
+                                    stats_path='', **kwargs)
+    runner.warm_up(WARM_UP)
+    return broker, runner
+
+def test_skipped_poll_processes_missed_bars(rates):
+    data = rates[:WARM_UP + 300]
+    every_bar, skipping = _runner(data), _runner(data)
+    decisions = []
+    for step in range(300):
+        every_bar[0].advance()
+        every_bar[1].poll()
+        skipping[0].advance()
+        if step % 3 != 0:    # Elke derde poll gemist: volgende poll haalt beide bars
+            decisions.append(skipping[1].poll())
+    decisions.append(skipping[1].poll())
+
+    assert skipping[1].state.last_time == int(data['time'][-1])
+    assert len(skipping[1].latencies) == len(every_bar[1].latencies) == 300
+    assert skipping[1].state.update(data[-1]) == every_bar[1].state.update(data[-1])
+    assert skipping[0].orders == every_bar[0].orders
+    # Runner exits worden later uitgevoerd (broker prijs van nu), maar dezelfde exits
+    assert [c['reason'] for c in skipping[0].closes] == [c['reason'] for c in every_bar[0].closes]
+    assert decisions[-1] is None    # Niets nieuws meer
+
+def test_warm_up_sized_from_own_ema_slow(rates):
+    broker = live_runner.SimulatedBroker(rates, 'M15', start_index=len(rates))
+    runner = live_runner.LiveRunner(broker, timeframe_str='M15', sink=event_log.NullSink(),
+                                    stats_path='', lookback=50, ema_slow=300)
+    assert runner.warm_up() == 3000
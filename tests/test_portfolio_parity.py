@@ -0,0 +1,52 @@
+﻿# =============================================================================
+# PORTFOLIO PARITEIT — trade timing tegen de numpy engine, PnL in USD
+# =============================================================================
+# Eén symbool in de portfolio kernel geeft dezelfde entries/exits als de
+# numpy engine (zelfde SL/TP/trailing afstanden). De PnL verschilt bewust:
+# de portfolio rekent via point_value (USD), de bar engines met een vaste
+# factor. Daarom wordt de PnL apart tegen point_value gecontroleerd.
+# =============================================================================
+import pytest
+
+import backtest_engine
+import benchmark
+import config
+import portfolio
+
+PARAMS = {'ema_fast': 5, 'ema_slow': 20}
+TIMING_KEYS = ('entry_time', 'exit_time', 'entry_price', 'exit_price', 'exit_reason')
+
+def _timing(trades):
+    return [tuple(t[k] for k in TIMING_KEYS) for t in trades]
+
+def test_single_symbol_matches_numpy_timing(df):
+    ref = backtest_engine.run_backtest(df, PARAMS, engine='numpy')
+    result = portfolio.run_portfolio({'EURUSD': df}, PARAMS)
+    assert ref['total_trades'] > 0
+    assert _timing(result['trades']) == _timing(ref['trades'])
+
+@pytest.mark.parametrize('symbol,scale', [('EURUSD', 1.0), ('USDJPY', 140.0), ('USDCAD', 1.25)])
+def test_pnl_in_account_currency(symbol, scale):
+    df = benchmark.rates_to_frame(benchmark.synthetic_rates(3000, 'M15', seed=5))
+    df[['open', 'high', 'low', 'close']] *= scale
+    result = portfolio.run_portfolio({symbol: df}, PARAMS)
+    spec = portfolio.symbol_spec(symbol)
+    assert result['total_trades'] > 0
+    for t in result['trades']:
+        if t['exit_price'] is None:   # Trailing SL zonder exit prijs (zoals de bar engines)
+            assert t['pnl'] == 0
+            continue
+        expected = abs(t['exit_price'] - t['entry_price']) / spec['point'] \
+            * spec['point_value'] * (t['lot_size'] / 0.1)
+        assert abs(t['pnl']) == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+def test_usdjpy_stop_loss_is_bounded_by_risk():
+    df = benchmark.rates_to_frame(benchmark.synthetic_rates(3000, 'M15', seed=5))
+    df[['open', 'high', 'low', 'close']] *= 140.0
+    result = portfolio.run_portfolio({'USDJPY': df}, PARAMS)
+    spec = portfolio.symbol_spec('USDJPY')
+    losses = [t for t in result['trades'] if t['exit_reason'] == 'SL']
+    assert losses
+    for t in losses:
+        max_loss = config.STOP_LOSS_POINTS * spec['point_value'] * (t['lot_size'] / 0.1)
+        assert -t['pnl'] == pytest.approx(max_loss, rel=1e-6)
@@ -0,0 +1,47 @@
+﻿# =============================================================================
+# SIGNALS PARITEIT — gecompileerde regels tegen de engines die ze vervangen
+# =============================================================================
+import numpy as np
+import pytest
+
+import backtest_engine
+import bar_store
+import inverse_batch
+import signals
+
+PARAMS = {'ema_fast': 5, 'ema_slow': 20}
+
+def test_ema_cross_matches_strategy_signals(df):
+    ref = backtest_engine.run_backtest(df, PARAMS, engine='numpy')
+    compiled = signals.compile_rule(df, 'ema_cross', PARAMS)
+    assert np.array_equal(compiled.signal, ref['df_with_signals']['signal'].to_numpy())
+
+@pytest.mark.parametrize('engine', ['numpy', 'sparse'])
+def test_compiled_signal_backtest_matches(df, engine):
+    ref = backtest_engine.run_backtest(df, PARAMS, engine=engine)
+    frame = df.copy()
+    frame['signal'] = signals.compile_rule(df, 'ema_cross', PARAMS).signal
+    new = backtest_engine.run_backtest_on_signals(frame, PARAMS, engine=engine)
+    assert new['trades'] == ref['trades']
+    assert new['final_equity'] == ref['final_equity']
+
+def test_batch_with_signal_store_matches_default(rates, tmp_path):
+    store = bar_store.BarStore(str(tmp_path))
+    store.append('EURUSD', 'M15', rates)
+    signal_store = signals.SignalStore(store)
+    param_sets = [{'lookback': 30}, {'lookback': 50}, {'lookback': 50, 'max_candles': 20}]
+
+    def signal_for(lookback):
+        return signal_store.get('EURUSD', 'M15', 'inverse_breakout', {'lookback': lookback}).signal
+
+    ref = inverse_batch.run_batch_frame(rates, param_sets)
+    new = inverse_batch.run_batch(rates['open'], rates['high'], rates['low'], rates['close'],
+                                  param_sets, signal_for=signal_for)
+    assert new.equals(ref)
+
+@pytest.mark.parametrize('lookback', [30, 50])
+def test_compiled_breakout_in_backtrader(rates, run_v42, lookback):
+    value, _ = run_v42(lookback=lookback)
+    compiled = signals.compile_rule(rates, 'inverse_breakout', {'lookback': lookback})
+    value_compiled, _ = run_v42(lookback=lookback, signals=compiled.signal)
+    assert value_compiled == value
@@ -0,0 +1,307 @@
+﻿# =============================================================================
+# WALK-FORWARD — Rolling train/test windows (WF_TRAIN_MONTHS / WF_TEST_MONTHS)
+# =============================================================================
+# Per window: optimaliseer op train, evalueer beste params op de test periode.
+# Indicatoren/signalen worden één keer per param combinatie over de volledige
+# historie berekend (EMA state loopt door), windows slicen alleen.
+# Optioneel gaan afgeronde windows naar het journal (journal.py); een herstart
+# draait dan alleen de windows die nog ontbreken.
+# =============================================================================
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import numpy as np
+import config
+import indicators
+import strategy
+import backtest_engine
+import event_log
+import journal as results_journal
+import optimizer
+import profiling
+
+OHLC_COLUMNS = ['open', 'high', 'low', 'close']
+
+# Worker state (gezet door _init_worker)
+_worker_df = None
+_worker_shm = []
+
+def build_windows(index, train_months=None, test_months=None,
+                  min_train_candles=None, min_test_candles=None):
+    """
+    Rolling windows over een DatetimeIndex.
+    Train: [start, start + train_months), test: de test_months daarna.
+    Windows schuiven op met test_months.
+
+    Returns: lijst met dicts (positie slices + tijdstempels)
+    """
+    train_months = train_months or config.WF_TRAIN_MONTHS
+    test_months = test_months or config.WF_TEST_MONTHS
+    min_train = config.WF_MIN_TRAIN_CANDLES if min_train_candles is None else min_train_candles
+    min_test = config.WF_MIN_TEST_CANDLES if min_test_candles is None else min_test_candles
+
+    windows = []
+    if len(index) == 0:
+        return windows
+
+    start = index[0]
+    last = index[-1]
+    while True:
+        train_end = start + pd.DateOffset(months=train_months)
+        test_end = train_end + pd.DateOffset(months=test_months)
+        if train_end > last:
+            break
+
+        i0, i1, i2 = index.searchsorted([start, train_end, test_end])
+        if i1 - i0 >= min_train and i2 - i1 >= min_test:
+            windows.append({
+                'window': len(windows),
+                'train_slice': (int(i0), int(i1)),
+                'test_slice': (int(i1), int(i2)),
+                'train_start': index[i0],
+                'test_start': index[i1],
+                'test_end': index[i2 - 1],
+            })
+        start = start + pd.DateOffset(months=test_months)
+    return windows
+
+def precompute_signals(df, grid):
+    """
+    Signalen voor elke param combinatie, één keer op de volledige historie.
+    Returns: DataFrame met OHLC + kolommen signal_0 .. signal_{n-1}
+    """
+    frame = df[OHLC_COLUMNS].copy()
+    signal_columns = {}
+    for j, params in enumerate(grid):
+        with_indicators = indicators.calculate_all_indicators(df.copy(), params=params)
+        signals = strategy.generate_final_signals(with_indicators, params)['signal']
+        signal_columns[f'signal_{j}'] = signals.to_numpy(dtype=np.float64)
+    return pd.concat([frame, pd.DataFrame(signal_columns, index=frame.index)], axis=1)
+
+def _init_worker(spec, sink, profile_cfg=None):
+    global _worker_df, _worker_shm
+    event_log.set_sink(sink)
+    profiling.init_worker(profile_cfg)
+    _worker_df, _worker_shm = optimizer.attach_frame(spec)
+
+def _window_frame(frame, j, start, stop):
+    """OHLC slice met de signalen van combinatie j als 'signal' kolom."""
+    sub = frame.iloc[start:stop][OHLC_COLUMNS].copy()
+    sub['signal'] = frame[f'signal_{j}'].to_numpy()[start:stop]
+    return sub
+
+def _run_window(window, grid, initial_capital, sort_by, abort_drawdown):
+    """Optimaliseer op train slice, evalueer beste params op test slice."""
+    frame = _worker_df
+    cap = initial_capital or config.INITIAL_CAPITAL
+    profiling.begin_task()
+
+    t0 = time.perf_counter()
+    best_j, best_score = None, None
+    for j, params in enumerate(grid):
+        results = backtest_engine.run_backtest_on_signals(
+            _window_frame(frame, j, *window['train_slice']), params, cap,
+            engine='numpy', abort_drawdown=abort_drawdown, scalars_only=True
+        )
+        if results['aborted']:
+            continue
+        if best_score is None or results[sort_by] > best_score:
+            best_j, best_score = j, results[sort_by]
+    train_sec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if best_j is None:
+        best_j = 0  # Alles afgebroken: val terug op eerste combinatie
+    test = backtest_engine.run_backtest_on_signals(
+        _window_frame(frame, best_j, *window['test_slice']), grid[best_j], cap, engine='numpy'
+    )
+    test_sec = time.perf_counter() - t0
+
+    stats = dict(window)
+    stats.update({
+        'best_params': grid[best_j],
+        'train_score': best_score,
+        'train_candles': window['train_slice'][1] - window['train_slice'][0],
+        'test_candles': window['test_slice'][1] - window['test_slice'][0],
+        'test_net_profit': test['net_profit'],
+        'test_trades': test['total_trades'],
+        'test_win_rate': test['win_rate'],
+        'test_max_drawdown': test['max_drawdown'],
+        'train_sec': train_sec,
+        'test_sec': test_sec,
+        'worker_pid': os.getpid(),
+        '_profile': profiling.end_task(),
+    })
+    return stats, test['equity_curve']['equity']
+
+# Window velden die _run_window zelf berekent (de rest komt uit build_windows)
+JOURNAL_FIELDS = ['best_params', 'train_score', 'train_candles', 'test_candles', 'test_net_profit',
+                  'test_trades', 'test_win_rate', 'test_max_drawdown', 'train_sec', 'test_sec',
+                  'worker_pid']
+
+def _to_journal(output):
+    """(stats, test equity) → JSON-baar dict voor het journal."""
+    stats, equity = output
+    entry = {k: stats[k] for k in JOURNAL_FIELDS}
+    entry['equity'] = np.asarray(equity, dtype=np.float64).tolist()
+    return entry
+
+def _from_journal(window, entry, index):
+    """Journal entry → (stats, test equity) zoals _run_window die teruggeeft."""
+    stats = dict(window)
+    stats.update({k: entry[k] for k in JOURNAL_FIELDS})
+    start, stop = window['test_slice']
+    equity = pd.Series(entry['equity'], index=index[start:stop], name='equity', dtype=np.float64)
+    return stats, equity
+
+def stitch_equity(test_curves, initial_capital=None):
+    """
+    Plak de out-of-sample equity curves aan elkaar. Elke test window start
+    met initial_capital; we schalen op rendement zodat window k verder gaat
+    waar window k-1 eindigde.
+    """
+    cap = initial_capital or config.INITIAL_CAPITAL
+    pieces = []
+    level = cap
+    for curve in test_curves:
+        if len(curve) == 0:
+            continue
+        scaled = curve / cap * level
+        pieces.append(scaled)
+        level = scaled.iloc[-1]
+    if not pieces:
+        return pd.Series(dtype=np.float64, name='equity')
+    stitched = pd.concat(pieces)
+    stitched.name = 'equity'
+    return stitched
+
+def run_walk_forward(df, ranges=None, initial_capital=None, n_workers=None,
+                     sort_by='net_profit', abort_drawdown=None, sink=None, profiler=None,
+                     journal=None, **window_kwargs):
+    """
+    Volledige walk-forward run.
+
+    sink: event sink tijdens precompute en windows (default NullSink)
+    profiler: verzamelt stage timers/counters van alle windows (zie profiling.py)
+    journal: journal.Journal, pad of True (RESULTS_DIR/JOURNAL_FILE), default
+    None = geen journal; windows die er al in staan worden niet opnieuw gedraaid
+
+    Returns: dict met
+    - 'windows': DataFrame met per window best params, OOS metrics en timing
+    - 'equity_curve': gestitchte out-of-sample equity (Series)
+    - 'precompute_sec' / 'total_sec': timing van de gedeelde stappen
+    """
+    global _worker_df
+    t_start = time.perf_counter()
+    grid = optimizer.expand_grid(ranges)
+    windows = build_windows(df.index, **window_kwargs)
+    if not windows or not grid:
+        print("⚠️  Geen walk-forward windows (te weinig data?)")
+        return {'windows': pd.DataFrame(), 'equity_curve': pd.Series(dtype=np.float64),
+                'precompute_sec': 0.0, 'total_sec': 0.0}
+
+    sink = sink or event_log.NullSink()
+    profiler = profiler or profiling.get_profiler()
+    if profiler.enabled:
+        profiler.clear_cprofile_dumps()
+    t0 = time.perf_counter()
+    with event_log.use_sink(sink), profiling.use_profiler(profiler):
+        with profiler.stage('precompute_signals'):
+            frame = precompute_signals(df, grid)
+    precompute_sec = time.perf_counter() - t0
+
+    args = (grid, initial_capital, sort_by, abort_drawdown)
+    outputs = [None] * len(windows)
+
+    # Journal: afgeronde windows overnemen (sleutel = window grenzen + grid + instellingen)
+    jrnl = results_journal.open_journal(journal)
+    keys = [None] * len(windows)
+    if jrnl is not None:
+        version = results_journal.data_version(df)
+        cap = initial_capital or config.INITIAL_CAPITAL
+        for k, w in enumerate(windows):
+            keys[k] = results_journal.params_key(
+                {'grid': grid, 'window': w}, kind='walk_forward', initial_capital=cap,
+                sort_by=sort_by, abort_drawdown=abort_drawdown
+            )
+            hit = jrnl.get(version, keys[k])
+            if hit is not None:
+                outputs[k] = _from_journal(w, hit, frame.index)
+        n_hits = sum(o is not None for o in outputs)
+        if n_hits:
+            print(f"🔁 Journal: {n_hits}/{len(windows)} windows al geëvalueerd")
+
+    def record(k, output):
+        if jrnl is not None:
+            jrnl.append(version, keys[k], _to_journal(output), {'window': windows[k]['window']})
+        outputs[k] = output
+
+    todo = [k for k, o in enumerate(outputs) if o is None]
+    n_workers = n_workers or os.cpu_count() or 1
+    n_workers = min(n_workers, len(todo))
+
+    if n_workers == 1:
+        _worker_df = frame
+        try:
+            with event_log.use_sink(sink), profiling.use_profiler(profiler):
+                for k in todo:
+                    record(k, _run_window(windows[k], *args))
+        finally:
+            _worker_df = None
+    elif n_workers > 1:
+        spec, blocks = optimizer.share_frame(frame)
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(spec, sink, profiling.worker_config(profiler))) as pool:
+                futures = {pool.submit(_run_window, windows[k], *args): k for k in todo}
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+        finally:
+            optimizer.release_frame(blocks)
+
+    for window_stats, _ in outputs:
+        profiler.merge(window_stats.pop('_profile', None))
+    stats = pd.DataFrame([o[0] for o in outputs])
+    equity = stitch_equity([o[1] for o in outputs], initial_capital)
+
+    return {
+        'windows': stats,
+        'equity_curve': equity,
+        'precompute_sec': precompute_sec,
+        'total_sec': time.perf_counter() - t_start,
+    }
+
+# =============================================================================
+# MAIN
+# =============================================================================
+if __name__ == "__main__":
+    import data_handler
+
+    if not data_handler.initialize_mt5():
+        sys.exit(1)
+    df = data_handler.get_data(config.SYMBOL, config.TIMEFRAME_MT5, config.START_DATE, config.END_DATE)
+    data_handler.shutdown_mt5()
+
+    if df is None:
+        sys.exit(1)
+
+    print(f"\n🔄 Walk-forward: {config.WF_TRAIN_MONTHS}m train / {config.WF_TEST_MONTHS}m test...")
+    wf = run_walk_forward(df, journal=config.JOURNAL_RESUME)
+    windows = wf['windows']
+    if len(windows) == 0:
+        sys.exit(0)
+
+    print(windows[['window', 'test_start', 'best_params', 'test_net_profit', 'test_trades',
+                   'train_sec', 'test_sec']].to_string(index=False))
+    print(f"\n⏱  Precompute: {wf['precompute_sec']:.2f}s | Totaal: {wf['total_sec']:.2f}s")
+    if config.PROFILING:
+        print(profiling.get_profiler().report())
+    if len(wf['equity_curve']) > 0:
+        print(f"💰 OOS eind equity: ${wf['equity_curve'].iloc[-1]:.2f}")
+
+    if config.SAVE_RESULTS:
+        os.makedirs(config.RESULTS_DIR, exist_ok=True)
+        windows.to_csv(os.path.join(config.RESULTS_DIR, f"walk_forward_{config.SYMBOL}.csv"), index=False)
+        wf['equity_curve'].to_csv(os.path.join(config.RESULTS_DIR, f"walk_forward_equity_{config.SYMBOL}.csv"))